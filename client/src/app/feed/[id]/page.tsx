@@ -78,6 +78,7 @@ export default function FeedPage() {
 
   useEffect(() => {
   let timer: ReturnType<typeof setTimeout> | undefined;
+    let source: EventSource | undefined;
     async function fetchFeed() {
       try {
         // Use reports endpoint, but alias exists at /api/feeds/<id>
@@ -93,8 +94,55 @@ export default function FeedPage() {
         setError(msg);
       }
     }
-    fetchFeed();
-    return () => timer && clearTimeout(timer);
+    // Push updates over server-sent events; fall back to polling if the stream cannot be opened
+    if (typeof EventSource === "undefined") {
+      fetchFeed();
+      return () => timer && clearTimeout(timer);
+    }
+    let opened = false;
+    source = new EventSource(api.url(`/api/feeds/${params.id}/events?guest_id=${encodeURIComponent(guest_id)}`));
+    source.addEventListener("snapshot", (e) => {
+      opened = true;
+      const snapshot = JSON.parse((e as MessageEvent).data) as FeedRes;
+      setData(snapshot);
+      // The server ends the stream for finished feeds; stop EventSource from reconnecting
+      if (snapshot.status === "complete" || snapshot.status === "failed") source?.close();
+    });
+    source.addEventListener("step", (e) => {
+      const step = JSON.parse((e as MessageEvent).data) as FeedRes["steps"][number];
+      setData((prev) => {
+        if (!prev) return prev;
+        const steps = [...prev.steps];
+        const i = steps.findIndex((s) => s.step_name === step.step_name && s.status === "running");
+        if (i >= 0) steps[i] = step; else steps.push(step);
+        return { ...prev, steps };
+      });
+    });
+    source.addEventListener("suggestion", (e) => {
+      const sug = JSON.parse((e as MessageEvent).data) as Suggestion;
+      setData((prev) => (prev && !prev.suggestions.some((s) => s.id === sug.id)
+        ? { ...prev, suggestions: [...prev.suggestions, sug] }
+        : prev));
+    });
+    source.addEventListener("status", (e) => {
+      const { status } = JSON.parse((e as MessageEvent).data) as { status: string };
+      setData((prev) => (prev ? { ...prev, status } : prev));
+      if (status === "complete" || status === "failed") {
+        source?.close();
+        // Reload once so guest views get their final ranked cut
+        fetchFeed();
+      }
+    });
+    source.onerror = () => {
+      if (!opened) {
+        source?.close();
+        fetchFeed();
+      }
+    };
+    return () => {
+      source?.close();
+      if (timer) clearTimeout(timer);
+    };
   }, [params.id, guest_id]);
 
   async function generateNewForProduct() {
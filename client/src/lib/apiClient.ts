@@ -126,9 +126,14 @@ export class ApiClient {
     return this.refreshing;
   }
 
+  // Absolute URL for APIs used outside fetch (EventSource, <img src>)
+  public url(path: string): string {
+    return path.startsWith("http") ? path : `${this.baseUrl}${path}`;
+  }
+
   // ---------- Core request with auto auth/refresh ----------
   public async request(path: string, options: RequestOptions = {}): Promise<Response> {
-    const url = path.startsWith("http") ? path : `${this.baseUrl}${path}`;
+    const url = this.url(path);
     const headers: Record<string, string> = {
       "Content-Type": "application/json",
       ...(options.headers as Record<string, string> | undefined),
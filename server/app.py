@@ -34,6 +34,7 @@ from flask_admin.contrib.sqla import ModelView
 from dotenv import load_dotenv
 from models.password_reset import PasswordReset
 from models.credit_ledger import CreditLedger
+import json_provider
 load_dotenv()
 
 def create_app(is_testing = False):
@@ -58,6 +59,7 @@ def create_app(is_testing = False):
             'max_overflow': 10,
             'pool_recycle': 3600
         }
+    json_provider.init_app(app)
     db.init_app(app)
     Session(app)
     migrate = Migrate(app, db)
@@ -16,12 +16,15 @@ from typing import (
 from six.moves.urllib.request import urlopen
 from models.db_utils import db
 from models.user import User
+import user_cache
 from datetime import (
     datetime,
 )
 from jose import jwt
 import os
 import json
+import threading
+import time
 from config import logger
 import config
 from werkzeug.wrappers import Response
@@ -32,6 +35,17 @@ from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, create_a
 AUTH0_DOMAIN = config.auth0_domain
 API_AUDIENCE = config.auth0_api_audience
 ALGORITHMS = config.auth0_algorithms
+# Signing keys are cached by kid and re-fetched in the background after this many seconds
+JWKS_TTL_SECONDS = 3600
+# Minimum gap between forced re-fetches for an unknown kid
+JWKS_MIN_REFETCH_SECONDS = 30
+# Management token is renewed this many seconds before it expires
+MGMT_TOKEN_EXPIRY_MARGIN = 60
+
+_jwks_lock = threading.Lock()
+_jwks = {'keys': {}, 'fetched_at': 0.0, 'refreshing': False}
+_mgmt_lock = threading.Lock()
+_mgmt_token = {'token': None, 'expires_at': 0.0}
 
 class AuthError(Exception):
     def __init__(self, error, status_code):
@@ -67,20 +81,61 @@ def get_token_auth_header():
     token = parts[1]
     return token
 
-def validate_token(token):
-    jsonurl = urlopen("https://"+AUTH0_DOMAIN+"/.well-known/jwks.json")
+def _fetch_jwks():
+    """Fetch the tenant's signing keys and replace the cache; returns the keys by kid."""
+    jsonurl = urlopen("https://"+AUTH0_DOMAIN+"/.well-known/jwks.json", timeout=10)
     jwks = json.loads(jsonurl.read())
+    keys = {
+        key["kid"]: {
+            "kty": key["kty"],
+            "kid": key["kid"],
+            "use": key["use"],
+            "n": key["n"],
+            "e": key["e"]
+        } for key in jwks.get("keys", []) if key.get("kid")
+    }
+    with _jwks_lock:
+        _jwks['keys'] = keys
+        _jwks['fetched_at'] = time.monotonic()
+    return keys
+
+
+def _refresh_jwks_in_background():
+    def run():
+        try:
+            _fetch_jwks()
+        except Exception as e:
+            logger.error(f"JWKS refresh failed: {e}")
+        finally:
+            _jwks['refreshing'] = False
+
+    with _jwks_lock:
+        if _jwks['refreshing']:
+            return
+        _jwks['refreshing'] = True
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_signing_key(kid):
+    """The cached JWKS entry for kid.
+
+    A stale cache is served while a background refresh runs; an unknown kid
+    (key rotation) triggers a synchronous re-fetch, at most every
+    JWKS_MIN_REFETCH_SECONDS.
+    """
+    keys, age = _jwks['keys'], time.monotonic() - _jwks['fetched_at']
+    if kid in keys:
+        if age > JWKS_TTL_SECONDS:
+            _refresh_jwks_in_background()
+        return keys[kid]
+    if not keys or age > JWKS_MIN_REFETCH_SECONDS:
+        return _fetch_jwks().get(kid)
+    return None
+
+
+def validate_token(token):
     unverified_header = jwt.get_unverified_header(token)
-    rsa_key = {}
-    for key in jwks["keys"]:
-        if key["kid"] == unverified_header["kid"]:
-            rsa_key = {
-                "kty": key["kty"],
-                "kid": key["kid"],
-                "use": key["use"],
-                "n": key["n"],
-                "e": key["e"]
-            }
+    rsa_key = get_signing_key(unverified_header.get("kid"))
     if not rsa_key:
         raise AuthError({"code": "invalid_header",
                         "description": "Unable to find appropriate key"}, 401)
@@ -104,8 +159,8 @@ def requires_auth(f):
         # Get the user identity from the JWT
         user_id = get_jwt_identity()
 
-        # Load the user from the database
-        user = User.query.get(user_id)
+        # Resolve the user from the hot-field cache; the row itself loads only if the view needs it
+        user = user_cache.lazy_user(user_id)
         if not user:
             return jsonify({"msg": "User not found"}), 401
 
@@ -131,30 +186,38 @@ def requires_scope(required_scope):
     return False
 
 def get_management_access_token():
+    """Client-credentials token for the Auth0 Management API, reused until shortly before it expires."""
     import json, requests
 
-    # Configuration Values
-    domain = config.auth0_mgmt_domain   
-    audience = f'https://{domain}/api/v2/'
-    client_id = config.auth0_client_id
-    client_secret = config.auth0_client_secret
-    grant_type = "client_credentials" # OAuth 2.0 flow to use
+    with _mgmt_lock:
+        if _mgmt_token['token'] and time.monotonic() < _mgmt_token['expires_at']:
+            return _mgmt_token['token']
 
-    # Get an Access Token from Auth0
-    base_url = f"https://{domain}"
-    payload =  { 
-        'grant_type': grant_type,
-        'client_id': client_id,
-        'client_secret': client_secret,
-        'audience': audience
-    }
-    response = requests.post(f'{base_url}/oauth/token', data=payload)
-    oauth = response.json()
-    access_token = oauth.get('access_token')
-    if not access_token:
-        print(response.text)
-        raise Exception("Unable to retrieve Access Token")
-    return access_token
+        # Configuration Values
+        domain = config.auth0_mgmt_domain
+        audience = f'https://{domain}/api/v2/'
+        client_id = config.auth0_client_id
+        client_secret = config.auth0_client_secret
+        grant_type = "client_credentials" # OAuth 2.0 flow to use
+
+        # Get an Access Token from Auth0
+        base_url = f"https://{domain}"
+        payload =  {
+            'grant_type': grant_type,
+            'client_id': client_id,
+            'client_secret': client_secret,
+            'audience': audience
+        }
+        response = requests.post(f'{base_url}/oauth/token', data=payload, timeout=10)
+        oauth = response.json()
+        access_token = oauth.get('access_token')
+        if not access_token:
+            print(response.text)
+            raise Exception("Unable to retrieve Access Token")
+        expires_in = oauth.get('expires_in') or 0
+        _mgmt_token['token'] = access_token
+        _mgmt_token['expires_at'] = time.monotonic() + max(0, expires_in - MGMT_TOKEN_EXPIRY_MARGIN)
+        return access_token
 
 def call_auth0_management_api(api_path, access_token):
     import json, requests
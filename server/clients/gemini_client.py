@@ -3,9 +3,35 @@ from typing import Optional
 import os
 import time
 from pathlib import Path
+import httpx
 from google import genai
-from google.genai import types
+from google.genai import types, errors
 from config import logger
+import resilience
+
+# Upper bound on waiting for a Veo operation to finish, polling included
+VIDEO_DEADLINE_SECONDS = 600
+
+
+def _is_retryable(e: Exception) -> bool:
+    """Starting a render is paid and not idempotent: retry only what Google certainly did not run.
+
+    That is a 429, or a connection that failed before the request was sent. A 5xx
+    or a read timeout may have started a render already.
+    """
+    if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return True
+    return isinstance(e, errors.APIError) and getattr(e, 'code', None) == 429
+
+
+def _is_poll_retryable(e: Exception) -> bool:
+    # Reading an operation is idempotent, so server errors and timeouts are retried too
+    return _is_retryable(e) or isinstance(e, (errors.ServerError, httpx.TransportError))
+
+
+def _http_options(timeout: float) -> types.HttpOptions:
+    # The SDK takes its per-request timeout in milliseconds
+    return types.HttpOptions(timeout=int(timeout * 1000))
 
 
 @dataclass
@@ -56,19 +82,26 @@ class GeminiClient:
 
         try:
             # Build config. Do NOT pass duration; the model fixes clip length (~8s).
-            config = types.GenerateVideosConfig(aspect_ratio=ar, resolution=resolution)
+            def config(timeout: float) -> types.GenerateVideosConfig:
+                return types.GenerateVideosConfig(aspect_ratio=ar, resolution=resolution,
+                                                  http_options=_http_options(timeout))
 
-            # Start long-running generation operation
-            operation = client.models.generate_videos(
+            # Start long-running generation operation (retried and guarded by the gemini breaker)
+            started = time.monotonic()
+            operation = resilience.call("gemini", lambda timeout: client.models.generate_videos(
                 model="veo-3.0-generate-001",
                 prompt=prompt,
-                config=config,
-            )
+                config=config(timeout),
+            ), is_retryable=_is_retryable)
 
             # Poll until done
             while not operation.done:
+                if time.monotonic() - started > VIDEO_DEADLINE_SECONDS:
+                    raise TimeoutError(f"Veo 3 operation not done after {VIDEO_DEADLINE_SECONDS}s")
                 time.sleep(10)  # per docs: poll every ~10s
-                operation = client.operations.get(operation)
+                operation = resilience.call("gemini", lambda timeout: client.operations.get(
+                    operation, config=types.GetOperationConfig(http_options=_http_options(timeout)),
+                ), is_retryable=_is_poll_retryable)
 
             if operation.error:
                 raise RuntimeError(f"Veo 3 generation error: {operation.error.message}")
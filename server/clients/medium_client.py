@@ -1,8 +1,18 @@
 from __future__ import annotations
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Dict, Optional
 import requests
-from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+from dataclasses import dataclass, asdict
 import json
+import threading
+from config import logger
+import resilience
+
+# Concurrent requests allowed against the RapidAPI Medium host per client
+MAX_CONCURRENCY_PER_HOST = 6
+# Article metadata does not change once published; keep it for a month
+ARTICLE_CACHE_SECONDS = 30 * 86400
 
 
 @dataclass
@@ -27,62 +37,78 @@ class MediumClient:
             raise ValueError("MediumClient requires an API key")
         self.api_key = api_key
         self.host = host
-        self.session = session or requests.Session()
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENCY_PER_HOST))
+        self.session = session
+        self._host_slots = threading.BoundedSemaphore(MAX_CONCURRENCY_PER_HOST)
         self.base_url = f"https://{host}"
         self.headers = {
             "x-rapidapi-key": self.api_key,
             "x-rapidapi-host": self.host,
         }
 
+    def _get(self, path: str, params: Optional[Dict] = None) -> requests.Response:
+        """GET through the medium circuit breaker; raises resilience.ProviderUnavailable.
+
+        At most MAX_CONCURRENCY_PER_HOST requests run at once, whatever threads call in.
+        """
+        with self._host_slots:
+            return resilience.request("medium", self.session, "GET", f"{self.base_url}{path}", headers=self.headers, params=params)
+
+    def _get_or_none(self, path: str, params: Optional[Dict] = None) -> Optional[requests.Response]:
+        """Like _get, but returns None when the provider is unavailable so lookups degrade to empty."""
+        try:
+            return self._get(path, params=params)
+        except resilience.ProviderUnavailable as e:
+            logger.warning(f"Medium request {path} skipped: {e}")
+            return None
+
     def list_root_tags(self, limit: int = 100) -> List[str]:
-        r = self.session.get(f"{self.base_url}/root_tags", headers=self.headers, timeout=60)
+        r = self._get("/root_tags")
         r.raise_for_status()
         tags = r.json().get("root_tags", [])
         return tags[:limit]
 
     def search_for_tags(self, query: str, limit: int = 100) -> List[str]:
-        r = self.session.get(f"{self.base_url}/search/tags", headers=self.headers, params={"query": query}, timeout=60)
+        r = self._get("/search/tags", params={"query": query})
         r.raise_for_status()
         tags = r.json().get("tags", [])
         return tags[:limit]
     
     def get_related_tags(self, tag: str, limit: int = 10) -> List[str]:
-        r = self.session.get(f"{self.base_url}/related_tags/{tag}", headers=self.headers, timeout=60)
-        if not r.ok:
+        r = self._get_or_none(f"/related_tags/{tag}")
+        if r is None or not r.ok:
             return []
         tags = r.json().get("related_tags", [])
         return tags[:limit]
     
     def get_all_available_tags(self, limit: int = 1000) -> List[str]:
-        # first check in the cache
-        from cache import cache_store
-        cached = cache_store.get("medium_all_tags")
-        if cached:
-            try:
-                tags = json.loads(cached)
-                if isinstance(tags, list) and all(isinstance(t, str) for t in tags):
-                    return tags[:limit]
-            except Exception as e:
-                pass
-        
-        root_tags = self.list_root_tags(limit=limit)
-        all_tags = set(root_tags)
-        for rt in root_tags:
-            related = self.get_related_tags(rt, limit=20)
-            for t in related:
-                all_tags.add(t)
-            if len(all_tags) >= limit:
-                break
-        # cache it
-        try:
-            cache_store.set("medium_all_tags", json.dumps(list(all_tags)), ex=86400)
-        except Exception as e:
-            pass
-        return list(all_tags)[:limit]
+        """Tags from the crawled tag index (see medium_tags).
+
+        Until the first background crawl has finished only the root tags are returned.
+        """
+        import medium_tags
+        index = medium_tags.load_index()
+        if index is None:
+            return self.list_root_tags(limit=limit)
+        return index.tags[:limit]
+
+    def shortlist_tags(self, text: str, limit: int = 20) -> List[str]:
+        """Tags lexically closest to text, scored locally from the tag index (no API or LLM call)."""
+        import medium_tags
+        index = medium_tags.load_index()
+        if index is None:
+            return []
+        return index.shortlist(text, limit=limit)
     
-    def get_article_by_id(self, article_id: str) -> Optional[MediumArticle]:
-        r = self.session.get(f"{self.base_url}/article/{article_id}", headers=self.headers, timeout=60)
-        if not r.ok:
+    @staticmethod
+    def _article_key(article_id: str) -> str:
+        return f"medium:article:{article_id}"
+
+    def _fetch_article(self, article_id: str) -> Optional[MediumArticle]:
+        r = self._get_or_none(f"/article/{article_id}")
+        if r is None or not r.ok:
             return None
         data = r.json()
         return MediumArticle(
@@ -96,33 +122,57 @@ class MediumClient:
             boosted_at=data.get("boosted_at", ""),
         )
 
+    def get_article_by_id(self, article_id: str) -> Optional[MediumArticle]:
+        return self.get_articles([article_id]).get(article_id)
+
+    def get_articles(self, ids: Iterable[str]) -> Dict[str, MediumArticle]:
+        """Articles by id; cached ids come from one Redis MGET, the rest are fetched concurrently.
+
+        Ids that could not be fetched are missing from the result.
+        """
+        from cache import cache_store
+        ids = list(dict.fromkeys(i for i in ids if i))
+        if not ids:
+            return {}
+        found: Dict[str, MediumArticle] = {}
+        try:
+            for article_id, raw in zip(ids, cache_store.mget([self._article_key(i) for i in ids])):
+                if raw:
+                    found[article_id] = MediumArticle(**json.loads(raw))
+        except Exception as e:
+            logger.error(f"Medium article cache read failed: {e}")
+        missing = [i for i in ids if i not in found]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENCY_PER_HOST, len(missing))) as pool:
+                fetched = dict(zip(missing, pool.map(self._fetch_article, missing)))
+            pipe = cache_store.pipeline()
+            for article_id, article in fetched.items():
+                if article is None:
+                    continue
+                found[article_id] = article
+                pipe.set(self._article_key(article_id), json.dumps(asdict(article)), ex=ARTICLE_CACHE_SECONDS)
+            try:
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"Medium article cache write failed: {e}")
+        return found
+
     def trending_ids_for_tag(self, tag: str, limit: int = 10) -> List[Dict]:
-        r = self.session.get(f"{self.base_url}/recommended_feed/{tag}", headers=self.headers, timeout=60)
-        if not r.ok:
+        r = self._get_or_none(f"/recommended_feed/{tag}")
+        if r is None or not r.ok:
             return []
         return (r.json().get("recommended_feed") or [])[:limit]
     
     def get_trending_articles(self, keyword: str, limit: int = 10) -> List[MediumArticle]:
         tag = keyword.lower().replace(" ", "-")
         ids = self.trending_ids_for_tag(tag, limit=limit)
-        articles: List[MediumArticle] = []
-        for id in ids:
-            article = self.get_article_by_id(id)
-            if article is not None:
-                articles.append(article)
-            if len(articles) >= limit:
-                break
-        return articles[:limit]
+        found = self.get_articles(ids)
+        return [found[i] for i in ids if i in found][:limit]
     
     def search_for_articles(self, query: str, limit: int = 10) -> List[MediumArticle]:
-        r = self.session.get(f"{self.base_url}/search/articles", headers=self.headers, params={"query": query}, timeout=60)
-        if not r.ok:
+        r = self._get_or_none("/search/articles", params={"query": query})
+        if r is None or not r.ok:
             return []
         ids = (r.json().get("articles") or [])[:limit]
-        articles: List[MediumArticle] = []
-        for article_id in ids:
-            article = self.get_article_by_id(article_id)
-            if article is not None:
-                articles.append(article)
-        return articles
-
+        found = self.get_articles(ids)
+        return [found[i] for i in ids if i in found]
@@ -1,9 +1,26 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 from xml.parsers.expat import model
+import hashlib
+import json
 import requests
+from requests.adapters import HTTPAdapter
 import random
+import time
+from cache import cache_store
+from config import logger
+import resilience
+
+# Autocomplete suggestions change slowly; cache them per normalized query
+AUTOCOMPLETE_CACHE_SECONDS = 3 * 86400
+# Concurrent autocomplete requests when expanding keywords
+EXPAND_CONCURRENCY = 8
+
+
+def normalize_keyword(text: str) -> str:
+    return " ".join((text or "").lower().split())
 
 @dataclass
 class TechNewsArticle:
@@ -29,7 +46,19 @@ class SerpApiClient:
             raise ValueError("SerpApiClient requires an API key")
         self.api_key = api_key
         self.base_url = "https://serpapi.com/search.json"
-        self.session = session or requests.Session()
+        if session is None:
+            session = requests.Session()
+            # Pool enough connections for expand_keywords' concurrent requests
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=EXPAND_CONCURRENCY))
+        self.session = session
+
+    def _get(self, params: dict) -> Optional[requests.Response]:
+        """GET through the serpapi circuit breaker; None when the provider is unavailable."""
+        try:
+            return resilience.request("serpapi", self.session, "GET", self.base_url, params=params)
+        except resilience.ProviderUnavailable as e:
+            logger.warning(f"SerpAPI {params.get('engine')} request skipped: {e}")
+            return None
 
     def get_top_tech_news(self, limit: int = 10) -> List[TechNewsArticle]:
         params = {
@@ -40,8 +69,8 @@ class SerpApiClient:
             "api_key": self.api_key,
             "num": limit,
         }
-        r = self.session.get(self.base_url, params=params, timeout=20)
-        if not r.ok:
+        r = self._get(params)
+        if r is None or not r.ok:
             return []
         data = r.json() or {}
         out: List[TechNewsArticle] = []
@@ -67,23 +96,63 @@ class SerpApiClient:
         return out
     
     def fetch_news_summary(self, title: str, url: str) -> Optional[str]:
-        from openai_utils import openai_client
-        response = openai_client.responses.create(
-            model="gpt-5",
-            tools=[{"type": "web_search"}],
-            input=f"Summarize the this news story '{title}' at {url}"
-        )
+        from openai_utils import openai_client, call_openai
+        from config import openai_completion_reserve
+        import model_routing
+        from models.credit_ledger import CreditLedger
+        route = model_routing.resolve("news_summary")
+        kwargs = {}
+        if route.reasoning_effort:
+            kwargs["reasoning"] = {"effort": route.reasoning_effort}
+        if route.max_output_tokens:
+            kwargs["max_output_tokens"] = route.max_output_tokens
+        started = time.monotonic()
+        try:
+            response = call_openai(route.model, route.max_output_tokens or openai_completion_reserve, lambda timeout: openai_client.responses.create(
+                model=route.model,
+                tools=[{"type": "web_search"}],
+                input=f"Summarize the this news story '{title}' at {url}",
+                timeout=timeout,
+                **kwargs,
+            ))
+        except resilience.ProviderUnavailable as e:
+            logger.warning(f"News summary skipped for '{title}': {e}")
+            return None
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "input_tokens", 0) or 0
+        completion_tokens = getattr(usage, "output_tokens", 0) or 0
+        cost = CreditLedger.calculate_cost(prompt_tokens / 1000, completion_tokens / 1000, route.model)
+        model_routing.record("news_summary", route, time.monotonic() - started, prompt_tokens, completion_tokens, cost)
         return response.output_text
 
     def autocomplete(self, query: str) -> List[str]:
+        """Google autocomplete suggestions for query, cached in Redis per normalized query."""
+        key = "serp:autocomplete:" + hashlib.sha1(normalize_keyword(query).encode("utf-8")).hexdigest()
+        try:
+            cached = cache_store.get(key)
+            if cached is not None:
+                return json.loads(cached)
+        except Exception as e:
+            logger.error(f"Autocomplete cache read failed: {e}")
+        out = self._fetch_autocomplete(query)
+        if out is None:
+            return []
+        try:
+            cache_store.set(key, json.dumps(out), ex=AUTOCOMPLETE_CACHE_SECONDS)
+        except Exception as e:
+            logger.error(f"Autocomplete cache write failed: {e}")
+        return out
+
+    def _fetch_autocomplete(self, query: str) -> Optional[List[str]]:
+        # None (rather than []) on failure so errors are not cached as "no suggestions"
         params = {
             "engine": "google_autocomplete",
             "q": query,
             "api_key": self.api_key,
         }
-        r = self.session.get(self.base_url, params=params, timeout=20)
-        if not r.ok:
-            return []
+        r = self._get(params)
+        if r is None or not r.ok:
+            return None
         data = r.json() or {}
         out: List[str] = []
         for s in data.get("suggestions", []) or []:
@@ -98,18 +167,25 @@ class SerpApiClient:
     def expand_keywords(self, keywords: List[str], limit: int = 100, per_kw_limit: int = 10) -> List[str]:
         """Expand given keywords with autocomplete suggestions.
 
-        Returns a unique list including the original keywords plus new suggestions,
-        truncated to the provided limit.
+        The first `per_kw_limit` keywords are expanded concurrently. Returns a unique
+        list (compared case- and whitespace-insensitively) of the original keywords
+        followed by new suggestions in keyword order, truncated to the provided limit.
         """
-        seen = []
+        keywords = [k for k in (keywords or []) if k]
+        seen = set()
+        out: List[str] = []
+
         def add_unique(items: List[str]):
             for it in items:
-                if it and it not in seen:
-                    seen.append(it)
-        add_unique(list(keywords or []))
-        for kw in (keywords or [])[:per_kw_limit]:
-            sugs = self.autocomplete(kw)
-            add_unique(sugs)
-            if len(seen) >= limit:
-                break
-        return seen[:limit]
+                norm = normalize_keyword(it)
+                if norm and norm not in seen:
+                    seen.add(norm)
+                    out.append(it)
+
+        add_unique(keywords)
+        to_expand = keywords[:per_kw_limit]
+        if to_expand and len(out) < limit:
+            with ThreadPoolExecutor(max_workers=min(EXPAND_CONCURRENCY, len(to_expand))) as pool:
+                for sugs in pool.map(self.autocomplete, to_expand):
+                    add_unique(sugs)
+        return out[:limit]
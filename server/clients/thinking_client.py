@@ -1,7 +1,77 @@
 from __future__ import annotations
-from typing import Dict, List, Optional
-from openai_utils import get_reply_json
+from typing import Dict, Iterator, List, Optional
+from openai_utils import get_reply_json, stream_reply
+from context_utils import truncate_to_tokens, clean_tweet_text
 from config import logger
+from plans import plan_id_for_user
+
+
+def _object_schema(properties: Dict[str, dict]) -> dict:
+    # Structured outputs in strict mode require every property to be listed as required
+    return {
+        'type': 'object',
+        'properties': properties,
+        'required': list(properties.keys()),
+        'additionalProperties': False,
+    }
+
+
+def _string_list_schema(key: str) -> dict:
+    return _object_schema({key: {'type': 'array', 'items': {'type': 'string'}}})
+
+
+KEYWORDS_SCHEMA = _string_list_schema('keywords')
+TOPICS_SCHEMA = _string_list_schema('topics')
+TWEETS_SCHEMA = _string_list_schema('tweets')
+REPLY_SCHEMA = _object_schema({'reply': {'type': 'string'}})
+ARTICLE_CONCEPTS_SCHEMA = _object_schema({
+    'article_concepts': {
+        'type': 'array',
+        'items': _object_schema({'title': {'type': 'string'}, 'description': {'type': 'string'}}),
+    },
+})
+ARTICLE_CONTENT_SCHEMA = _object_schema({'title': {'type': 'string'}, 'content_md': {'type': 'string'}})
+MEME_IDEAS_SCHEMA = _object_schema({
+    'ideas': {
+        'type': 'array',
+        'items': _object_schema({
+            'concept': {'type': 'string'},
+            'instructions': _object_schema({
+                'template': {'type': 'string'},
+                'scene_description': {'type': 'string'},
+                'text_overlays': {
+                    'type': 'array',
+                    'items': _object_schema({
+                        'position': {'type': 'string', 'enum': ['top', 'bottom', 'left', 'right', 'center']},
+                        'text': {'type': 'string'},
+                    }),
+                },
+                'style': {'type': 'string'},
+                'constraints': {'type': 'string'},
+            }),
+        }),
+    },
+})
+SLOP_IDEAS_SCHEMA = _object_schema({
+    'ideas': {
+        'type': 'array',
+        'items': _object_schema({
+            'concept': {'type': 'string'},
+            'instructions': _object_schema({
+                'scene_description': {'type': 'string'},
+                'weirdness_level': {'type': 'integer'},
+                'visual_motifs': {'type': 'array', 'items': {'type': 'string'}},
+                'motion_style': {'type': 'string'},
+                'color_palette': {'type': 'string'},
+                'sound_cues': {'type': 'array', 'items': {'type': 'string'}},
+                'constraints': _object_schema({
+                    'duration_seconds': {'type': 'integer'},
+                    'aspect_ratio': {'type': 'string'},
+                }),
+            }),
+        }),
+    },
+})
 
 
 class ThinkingClient:
@@ -10,9 +80,53 @@ class ThinkingClient:
     This isolates prompts, shapes, and parsing so worker logic stays clean and testable.
     """
 
-    def __init__(self, user=None):
+    # Token budget for the context block of each prompt
+    CONTEXT_TOKEN_BUDGETS: Dict[str, int] = {
+        'articles_for_topic': 2500,
+        'tweets_for_topic': 2500,
+        'article_content': 2500,
+        'meme_ideas_from_twitter': 2000,
+        'slop_ideas_from_twitter': 2000,
+        'witty_reply': 150,
+        'avoid_hint': 60,
+    }
+
+    # Suggestion kind whose past ideas are passed as "avoid" hints to each generating prompt
+    AVOID_HINT_KINDS: Dict[str, str] = {
+        'articles_for_topic': 'article_headline',
+        'tweets_for_topic': 'tweet',
+        'meme_ideas_from_twitter': 'meme_concept',
+        'meme_ideas_from_medium': 'meme_concept',
+        'slop_ideas_from_twitter': 'slop_concept',
+        'slop_ideas_from_medium': 'slop_concept',
+    }
+    # Past ideas listed per hint
+    AVOID_HINT_LIMIT = 8
+
+    def __init__(self, user=None, tier: Optional[str] = None, avoid: Optional[Dict[str, List[str]]] = None):
         # Optional authenticated user for credit logging; guests may be None
         self.user = user
+        # Plan tier used to pick models (see model_routing); looked up from the user if not given
+        self.tier = tier or (plan_id_for_user(user.id) if user is not None else 'guest')
+        # Recent past suggestions per kind for this product (see novelty.NoveltyIndex.avoid_hints)
+        self.avoid = avoid or {}
+
+    def _avoid_hint(self, prompt: str) -> str:
+        past = self.avoid.get(self.AVOID_HINT_KINDS.get(prompt, ''), [])[:self.AVOID_HINT_LIMIT]
+        if not past:
+            return ''
+        listed = '\n'.join(f"- {self._context('avoid_hint', p)}" for p in past)
+        return f"\nAlready suggested in earlier feeds; do not repeat or closely rephrase these:\n{listed}"
+
+    def _reply_json(self, prompt: str, system: str, user_msg: str, schema: dict, schema_name: str, hedge: bool = False):
+        user_msg += self._avoid_hint(prompt)
+        return get_reply_json(self.user, system, user_msg, schema=schema, schema_name=schema_name, prompt=prompt, hedge=hedge, tier=self.tier)
+
+    def context_budget(self, prompt: str) -> int:
+        return self.CONTEXT_TOKEN_BUDGETS.get(prompt, 2000)
+
+    def _context(self, prompt: str, text: Optional[str]) -> str:
+        return truncate_to_tokens(text, self.context_budget(prompt))
 
     def initial_keywords(self, product_name: str, description: str) -> Dict:
         group1 = self.get_keywords_for_prospective_clients(product_name, description)
@@ -33,7 +147,7 @@ class ThinkingClient:
         )
         user_msg = f"Product: {product_name}\nDescription: {description}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('get_keywords_for_prospective_clients', system, user_msg, KEYWORDS_SCHEMA, 'keywords')
             return out.get('keywords') or []
         except Exception as e:
             logger.exception(e)
@@ -47,7 +161,7 @@ class ThinkingClient:
         )
         user_msg = f"Product: {product_name}\nDescription: {description}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('get_keywords_for_seo', system, user_msg, KEYWORDS_SCHEMA, 'keywords')
             return out.get('keywords') or []
         except Exception as e:
             logger.exception(e)
@@ -57,7 +171,7 @@ class ThinkingClient:
         system = 'Select the most relevant keywords to the product from this list. Prioritize distinct keywords and long-tail keywords. Return JSON {"keywords":["..."]}'
         user_msg = f"Product: {product_name}. Description: {description}. Keywords: {keywords}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('filter_keywords', system, user_msg, KEYWORDS_SCHEMA, 'keywords', hedge=True)
             res = out.get('keywords') or []
             if not isinstance(res, list):
                 return keywords[:min(limit, 5)]
@@ -70,7 +184,7 @@ class ThinkingClient:
         system = 'Select the most relevant topics to the product from this list. Return JSON {"topics":["..."]}'
         user_msg = f"Product: {product_name}. Description: {description}. Topics: {topics}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('filter_topics', system, user_msg, TOPICS_SCHEMA, 'topics', hedge=True)
             res = out.get('topics') or []
             if not isinstance(res, list):
                 return topics[:min(limit, 5)]
@@ -86,9 +200,9 @@ class ThinkingClient:
         )
         user_msg = f"Product: {product_name}. Description: {description}. Topic: {topic}."
         if more_context:
-            user_msg += f" Helpful Context: {more_context[:10000]}"
+            user_msg += f" Helpful Context: {self._context('articles_for_topic', more_context)}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('articles_for_topic', system, user_msg, ARTICLE_CONCEPTS_SCHEMA, 'article_concepts')
             heads = out.get('article_concepts') or []
             return heads[:n] if isinstance(heads, list) else []
         except Exception as e:
@@ -101,9 +215,9 @@ class ThinkingClient:
         )
         user_msg = f"Product: {product_name}. Description: {description}. Topic: {topic}."
         if more_context:
-            user_msg += f" Helpful Context: {more_context[:10000]}"
+            user_msg += f" Helpful Context: {self._context('tweets_for_topic', more_context)}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('tweets_for_topic', system, user_msg, TWEETS_SCHEMA, 'tweets')
             tweets = out.get('tweets') or []
             return tweets[:n] if isinstance(tweets, list) else []
         except Exception as e:
@@ -112,9 +226,9 @@ class ThinkingClient:
 
     def witty_reply(self, product_name: str, description: str, tweet_text: str) -> Optional[str]:
         system = 'Write a witty but helpful single-tweet reply. Avoid emojis. DO NOT Promote our product. Just say something useful and keep it short and concise. Return JSON {"reply":"..."}'
-        user_msg = f"Tweet: {tweet_text[:500]}\nProduct: {product_name}. Description: {description}."
+        user_msg = f"Tweet: {self._context('witty_reply', clean_tweet_text(tweet_text))}\nProduct: {product_name}. Description: {description}."
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('witty_reply', system, user_msg, REPLY_SCHEMA, 'reply', hedge=True)
             reply = out.get('reply')
             return reply if isinstance(reply, str) and reply.strip() else None
         except Exception as e:
@@ -128,9 +242,9 @@ class ThinkingClient:
         )
         user_msg = f"Title: {title}\nDescription: {description}."
         if more_context:
-            user_msg += f" Helpful Context: {more_context[:10000]}"
+            user_msg += f" Helpful Context: {self._context('article_content', more_context)}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('article_content', system, user_msg, ARTICLE_CONTENT_SCHEMA, 'article')
             art = out.get('content_md')
             if not isinstance(art, str) or not art.strip():
                 return None
@@ -142,6 +256,21 @@ class ThinkingClient:
             logger.error(e)
             return None
 
+    def article_content_stream(self, title: str, description: str, more_context: str = None) -> Iterator[str]:
+        """Stream the article body as markdown chunks.
+
+        Unlike article_content this asks for plain markdown rather than JSON so chunks
+        can be shown to the user as they arrive. Errors propagate to the caller.
+        """
+        system = (
+            'Write a detailed, long-form article based on the title and context provided. The article should be well-structured with an engaging introduction, informative body, and concise conclusion. Use subheadings, bullet points, and other formatting tools to enhance readability. Ensure the content is original, provides value to the reader, and is relevant to the product description. Avoid promotional language but subtly align the content with the product\'s purpose. '
+            'Return only the article body in Markdown, without a top-level title and without code fences.'
+        )
+        user_msg = f"Title: {title}\nDescription: {description}."
+        if more_context:
+            user_msg += f" Helpful Context: {self._context('article_content', more_context)}"
+        return stream_reply(self.user, system, user_msg, prompt='article_content', tier=self.tier)
+
     def meme_ideas_from_twitter(self, product_name: str, description: str, topic: str, tweets_context: Optional[str] = None, n: int = 3) -> List[dict]:
         """Generate meme concepts based on a trending topic and example tweets.
 
@@ -158,9 +287,9 @@ Return JSON {{\"ideas\":[{{\"concept\":\"...\",\"instructions\":{{...}}}}]}}
         )
         user_msg = f"Product: {product_name}. Description: {description}. Trending topic: {topic}."
         if tweets_context:
-            user_msg += f" Example tweets (context):\n{tweets_context[:8000]}"
+            user_msg += f" Example tweets (context):\n{self._context('meme_ideas_from_twitter', tweets_context)}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('meme_ideas_from_twitter', system, user_msg, MEME_IDEAS_SCHEMA, 'meme_ideas')
             items = out.get('ideas') or []
             return items[:n] if isinstance(items, list) else []
         except Exception as e:
@@ -176,7 +305,7 @@ Return JSON {{\"ideas\":[{{\"concept\":\"...\",\"instructions\":{{...}}}}]}}
         )
         user_msg = f"Product: {product_name}. Description: {description}. Title: {title}. Subtitle: {subtitle or ''}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('meme_ideas_from_medium', system, user_msg, MEME_IDEAS_SCHEMA, 'meme_ideas')
             items = out.get('ideas') or []
             return items[:n] if isinstance(items, list) else []
         except Exception as e:
@@ -205,9 +334,9 @@ Return JSON {{"ideas":[{{"concept":"...","instructions":{{...}}}}]}}
         )
         user_msg = f"Product: {product_name}. Description: {description}. Trending topic: {topic}."
         if tweets_context:
-            user_msg += f" Example tweets (context):\n{tweets_context[:8000]}"
+            user_msg += f" Example tweets (context):\n{self._context('slop_ideas_from_twitter', tweets_context)}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('slop_ideas_from_twitter', system, user_msg, SLOP_IDEAS_SCHEMA, 'slop_ideas')
             items = out.get('ideas') or []
             return items[:n] if isinstance(items, list) else []
         except Exception as e:
@@ -224,7 +353,7 @@ Return JSON {{"ideas":[{{"concept":"...","instructions":{{...}}}}]}}
         )
         user_msg = f"Product: {product_name}. Description: {description}. Title: {title}. Subtitle: {subtitle or ''}"
         try:
-            out = get_reply_json(self.user, system, user_msg)
+            out = self._reply_json('slop_ideas_from_medium', system, user_msg, SLOP_IDEAS_SCHEMA, 'slop_ideas')
             items = out.get('ideas') or []
             return items[:n] if isinstance(items, list) else []
         except Exception as e:
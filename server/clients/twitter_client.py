@@ -4,6 +4,7 @@ from typing import List, Dict, Optional, Any
 import requests
 from dataclasses import dataclass
 from config import logger
+import resilience
 
 
 @dataclass
@@ -16,6 +17,8 @@ class TweetSummary:
     # New: include identifiers to allow UI deep linking
     id: Optional[str] = None  # tweet id (id_str/rest_id)
     username: Optional[str] = None  # user handle (screen_name)
+    created_at: Optional[str] = None  # e.g. "Wed Oct 10 20:19:24 +0000 2018"
+    lang: Optional[str] = None  # BCP 47 code detected by Twitter, "und" if unknown
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -26,8 +29,14 @@ class TweetSummary:
             "reply_count": self.reply_count,
             "id": self.id,
             "username": self.username,
+            "created_at": self.created_at,
+            "lang": self.lang,
         }
 
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "TweetSummary":
+        return cls(**{k: d.get(k) for k in cls.__dataclass_fields__})
+
 
 @dataclass
 class TwitterSearchResult:
@@ -40,6 +49,13 @@ class TwitterSearchResult:
             "latest": [t.to_dict() for t in self.latest],
         }
 
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "TwitterSearchResult":
+        return cls(
+            top=[TweetSummary.from_dict(t) for t in d.get("top") or []],
+            latest=[TweetSummary.from_dict(t) for t in d.get("latest") or []],
+        )
+
 
 class TwitterClient:
     """Thin client around RapidAPI 'twttr' endpoints.
@@ -63,9 +79,12 @@ class TwitterClient:
             "x-rapidapi-host": self.host,
         }
 
+    def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """GET through the twitter circuit breaker; raises resilience.ProviderUnavailable."""
+        return resilience.request("twitter", self.session, "GET", f"{self.base_url}{path}", headers=self.headers, params=params)
+
     def get_trending_topics(self, limit: int = 30) -> List[str]:
-        url = f"{self.base_url}/trends-by-location?woeid=2424766"
-        r = self.session.get(url, headers=self.headers, timeout=20)
+        r = self._get("/trends-by-location", params={"woeid": 2424766})
         r.raise_for_status()
         data = r.json().get('result', [{}])[0]
         names = [t.get("name") for t in (data.get("trends") or []) if t.get("name")]
@@ -73,12 +92,23 @@ class TwitterClient:
 
     def search(self, query: str, count: int = 5) -> TwitterSearchResult:
         params = {"query": query, "count": count}
+
+        def fetch(kind: str) -> Optional[requests.Response]:
+            # Search results are optional context; degrade to no tweets when the provider is down
+            try:
+                return self._get("/search-v2", params={**params, "type": kind})
+            except resilience.ProviderUnavailable as e:
+                logger.warning(f"Twitter search '{query}' ({kind}) skipped: {e}")
+                return None
+
         # Top (popular)
-        res_top = self.session.get(f"{self.base_url}/search-v2", headers=self.headers, params={**params, "type": "Top"}, timeout=60)
+        res_top = fetch("Top")
         # Latest (recent)
-        res_latest = self.session.get(f"{self.base_url}/search-v2", headers=self.headers, params={**params, "type": "Latest"}, timeout=60)
+        res_latest = fetch("Latest")
 
         def extract_tweets(resp):
+            if resp is None:
+                return []
             if not resp.ok:
                 logger.warning(f"Twitter search response not OK: {getattr(resp, 'status_code', 'NA')}")
                 return []
@@ -174,6 +204,8 @@ class TwitterClient:
                                 reply_count=reply_count,
                                 id=tweet_id,
                                 username=username,
+                                created_at=legacy.get("created_at"),
+                                lang=legacy.get("lang"),
                             )
                         )
 
@@ -180,3 +180,46 @@ def send_latest_report_emails(user_id: str | None, send_all: bool, logo_url: str
     return
   print("Provide --user-id <id> or --send-all")
 
+
+
+@app_commands.cli.command(with_appcontext=True)
+@click.option('--verbose', '-v', is_flag=True, default=False, help='Print the EXPLAIN output of each checked path')
+def check_query_plans(verbose: bool):
+  """Check the hot-path probes in query_audit for query counts and composite index usage (exits 1 on failure).
+
+  The probes are a fixed set of the busiest queries, not every endpoint and worker.
+  """
+  import query_audit
+  missing = query_audit.missing_indexes()
+  if missing:
+    print(f"Missing indexes (run flask db upgrade): {', '.join(missing)}")
+    raise SystemExit(1)
+  failed = False
+  for res in query_audit.check_hot_paths():
+    print(f"{'ok  ' if res.ok else 'FAIL'} {res.name}: {res.queries} queries" + ('' if res.ok else f" - {'; '.join(res.problems)}"))
+    if verbose:
+      for plan in res.plans:
+        print('    ' + plan.replace('\n', '\n    '))
+    failed = failed or not res.ok
+  if failed:
+    raise SystemExit(1)
+
+
+@app_commands.cli.command(with_appcontext=True)
+@click.option('--dry-run', is_flag=True, default=False, help='Only count what would be archived or deleted')
+@click.option('--batch-size', default=100, show_default=True, help='Rows handled per batch')
+@click.option('--pause', default=0.5, show_default=True, help='Seconds to sleep between batches')
+def apply_retention(dry_run: bool, batch_size: int, pause: float):
+  """Archive reports past their plan's retention, delete old guest data and trim the credit ledger (run from cron)."""
+  import retention
+  stats = retention.run(dry_run=dry_run, batch_size=batch_size, pause=pause)
+  for key, value in stats.to_dict().items():
+    print(f"{key}: {value}")
+
+
+@app_commands.cli.command(with_appcontext=True)
+@click.argument('report_id')
+def restore_report(report_id):
+  """Move an archived report's suggestions and steps back into their tables."""
+  import retention
+  print("Restored" if retention.restore_report(report_id) else "Report not found or not archived")
@@ -1,4 +1,5 @@
 import os
+import json
 import logging
 import sys
 import logging.handlers
@@ -50,4 +51,61 @@ rapidapi_key = os.getenv('RAPIDAPI_KEY')  # used for twttr and medium endpoints
 
 # Feature toggles (optional)
 enable_twitter = os.getenv('ENABLE_TWITTER', '1') in ('1','true','TRUE')
-enable_medium = os.getenv('ENABLE_MEDIUM', '1') in ('1','true','TRUE')
\ No newline at end of file
+enable_medium = os.getenv('ENABLE_MEDIUM', '1') in ('1','true','TRUE')
+# Expand SEO keywords with SerpAPI autocomplete in generate_report
+enable_keyword_expansion = os.getenv('ENABLE_KEYWORD_EXPANSION', '1') in ('1','true','TRUE')
+
+# Stream article generation to the owner and persist checkpoints while it runs
+stream_articles = os.getenv('STREAM_ARTICLES', '1') in ('1','true','TRUE')
+article_checkpoint_seconds = float(os.getenv('ARTICLE_CHECKPOINT_SECONDS', '3'))
+
+# Number of RQ workers per pool (see queue_util.WORKER_POOLS)
+worker_pool_sizes = {
+    'reports': int(os.getenv('WORKER_POOL_REPORTS', '2')),
+    'media_fast': int(os.getenv('WORKER_POOL_MEDIA_FAST', '2')),
+    'media_video': int(os.getenv('WORKER_POOL_MEDIA_VIDEO', '1')),
+}
+
+# Cluster-wide OpenAI limits per model: requests/min, tokens/min and max concurrency.
+# OPENAI_RATE_LIMITS can override per model, e.g. {"gpt-5": {"rpm": 500, "tpm": 500000}}
+openai_default_limits = {
+    'rpm': int(os.getenv('OPENAI_RPM_LIMIT', '500')),
+    'tpm': int(os.getenv('OPENAI_TPM_LIMIT', '500000')),
+    'concurrency': int(os.getenv('OPENAI_MAX_CONCURRENCY', '16')),
+}
+try:
+    openai_rate_limits = json.loads(os.getenv('OPENAI_RATE_LIMITS', '{}'))
+except ValueError:
+    openai_rate_limits = {}
+# Completion tokens reserved per call before the real usage is known
+openai_completion_reserve = int(os.getenv('OPENAI_COMPLETION_RESERVE', '1500'))
+
+# Hedged requests for short prompts that opt in: a duplicate is sent once a call
+# outlasts the prompt's observed p90. A token bucket caps hedges at HEDGE_MAX_RATE of calls,
+# with up to HEDGE_BURST hedges banked for quiet periods
+enable_hedging = os.getenv('ENABLE_HEDGING', '1') in ('1','true','TRUE')
+hedge_max_rate = float(os.getenv('HEDGE_MAX_RATE', '0.1'))
+hedge_min_delay = float(os.getenv('HEDGE_MIN_DELAY', '1.0'))
+hedge_burst = float(os.getenv('HEDGE_BURST', '3'))
+hedge_pool_size = int(os.getenv('HEDGE_POOL_SIZE', '8'))
+
+# Model routing overrides (see model_routing.resolve), e.g.
+# MODEL_ROUTES={"filter_topics": {"model": "gpt-5-mini"}}
+# MODEL_ROUTES_BY_TIER={"pro": {"article_content": {"model": "gpt-5", "reasoning_effort": "low"}}}
+try:
+    model_routes = json.loads(os.getenv('MODEL_ROUTES', '{}'))
+except ValueError:
+    model_routes = {}
+try:
+    model_routes_by_tier = json.loads(os.getenv('MODEL_ROUTES_BY_TIER', '{}'))
+except ValueError:
+    model_routes_by_tier = {}
+
+# Report step payloads: compressed in the row, spilled to files above this many compressed bytes.
+# Workers write spilled files and web hosts read them, so STEP_PAYLOAD_DIR must be shared storage.
+step_payload_spill_bytes = int(os.getenv('STEP_PAYLOAD_SPILL_BYTES', str(48 * 1024)))
+step_payload_dir = os.getenv('STEP_PAYLOAD_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'step_payloads')
+
+# Retention: abandoned guest data and credit ledger rows older than these are deleted
+guest_retention_days = int(os.getenv('GUEST_RETENTION_DAYS', '14'))
+ledger_retention_days = int(os.getenv('LEDGER_RETENTION_DAYS', '400'))
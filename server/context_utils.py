@@ -0,0 +1,111 @@
+from __future__ import annotations
+import math
+import re
+from typing import Iterable, List, Optional, Sequence
+from openai_utils import get_encoding
+from dedup import NearDuplicateIndex
+
+# Model used for token accounting of prompt context. Prompts go to gpt-5-mini which
+# tiktoken may not know about; get_encoding falls back to a compatible encoding.
+CONTEXT_MODEL = 'gpt-4'
+# Default token budget for a packed context block
+DEFAULT_CONTEXT_TOKENS = 2000
+# Do not bother appending a truncated item smaller than this
+MIN_PARTIAL_TOKENS = 24
+# Jaccard similarity (over dedup's character shingles) at which two tweets count as duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+_URL_RE = re.compile(r'https?://\S+|www\.\S+', re.IGNORECASE)
+_HANDLE_RE = re.compile(r'(?<!\w)@\w{1,15}')
+_RT_PREFIX_RE = re.compile(r'^RT\s*:?\s*', re.IGNORECASE)
+_WS_RE = re.compile(r'\s+')
+
+
+def clean_tweet_text(text: str) -> str:
+    """Strip URLs, @handles and retweet prefixes and collapse whitespace."""
+    if not text:
+        return ''
+    out = _URL_RE.sub(' ', text)
+    out = _HANDLE_RE.sub(' ', out)
+    out = _WS_RE.sub(' ', out).strip()
+    out = _RT_PREFIX_RE.sub('', out)
+    return out.strip(' :-')
+
+
+def dedupe_texts(texts: Iterable[str], threshold: float = NEAR_DUPLICATE_THRESHOLD) -> List[str]:
+    """Drop texts that are near-identical to an earlier one, preserving order."""
+    index = NearDuplicateIndex(threshold)
+    return [t for t in texts if index.add(t)]
+
+
+def engagement_score(tweet) -> float:
+    """Log-scaled engagement for a TweetSummary-like object or dict."""
+    def val(name):
+        v = getattr(tweet, name, None)
+        if v is None and isinstance(tweet, dict):
+            v = tweet.get(name)
+        return int(v or 0)
+    return math.log1p(val('like_count') + 2 * val('retweet_count') + 1.5 * val('reply_count'))
+
+
+def truncate_to_tokens(text: Optional[str], budget: int, model_name: str = CONTEXT_MODEL) -> str:
+    """Cut text to at most `budget` tokens."""
+    if not text or budget <= 0:
+        return ''
+    enc = get_encoding(model_name)
+    toks = enc.encode(text)
+    if len(toks) <= budget:
+        return text
+    return enc.decode(toks[:budget])
+
+
+def pack_to_budget(texts: Sequence[str], budget: int, model_name: str = CONTEXT_MODEL, separator: str = '\n') -> str:
+    """Join texts in order until the token budget is spent.
+
+    The item that crosses the budget is truncated to fill the remainder so the
+    packed block uses the budget exactly rather than stopping early.
+    """
+    if budget <= 0:
+        return ''
+    enc = get_encoding(model_name)
+    sep_tokens = len(enc.encode(separator))
+    out: List[str] = []
+    used = 0
+    for t in texts:
+        toks = enc.encode(t)
+        cost = len(toks) + (sep_tokens if out else 0)
+        if used + cost <= budget:
+            out.append(t)
+            used += cost
+            continue
+        remaining = budget - used - (sep_tokens if out else 0)
+        if remaining >= MIN_PARTIAL_TOKENS:
+            out.append(enc.decode(toks[:remaining]))
+        break
+    return separator.join(out)
+
+
+def build_tweet_context(tweets, budget: int = DEFAULT_CONTEXT_TOKENS, model_name: str = CONTEXT_MODEL) -> Optional[str]:
+    """Build a compact prompt context block from tweets.
+
+    Accepts a TwitterSearchResult (top + latest) or a list of TweetSummary/dicts.
+    Tweets are cleaned, near-duplicates removed and the highest-engagement ones
+    packed first until the token budget is spent.
+    """
+    if tweets is None:
+        return None
+    if hasattr(tweets, 'top') or hasattr(tweets, 'latest'):
+        items = list(getattr(tweets, 'top', None) or []) + list(getattr(tweets, 'latest', None) or [])
+    else:
+        items = list(tweets)
+    items.sort(key=engagement_score, reverse=True)
+    texts = []
+    for tw in items:
+        text = getattr(tw, 'text', None) or (tw.get('text') if isinstance(tw, dict) else None)
+        cleaned = clean_tweet_text(text or '')
+        if cleaned:
+            texts.append(cleaned)
+    texts = dedupe_texts(texts)
+    if not texts:
+        return None
+    return pack_to_budget(texts, budget, model_name=model_name)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+import numpy as np
+
+# Characters per shingle
+SHINGLE_SIZE = 5
+# MinHash permutations, split into BANDS bands of NUM_PERM // BANDS rows for LSH
+NUM_PERM = 64
+BANDS = 16
+# Jaccard similarity (over character shingles) at which two texts count as duplicates
+DUPLICATE_THRESHOLD = 0.7
+# Kinds the deduper tracks for bookkeeping (tweets already replied to), not suggestions
+INTERNAL_KINDS = ('source_tweet',)
+
+_PRIME = (1 << 31) - 1
+_WS_RE = re.compile(r'\s+')
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    norm = _WS_RE.sub(' ', _NON_WORD_RE.sub('', (text or '').lower())).strip()
+    if len(norm) <= size:
+        return {norm} if norm else set()
+    return {norm[i:i + size] for i in range(len(norm) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures from universal hashes (a*x + b) mod p over crc32 shingle hashes.
+
+    crc32 keeps signatures stable across processes, unlike Python's salted hash().
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, _PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.randint(0, _PRIME, size=num_perm, dtype=np.int64)
+
+    def signature(self, sh: Set[str]) -> np.ndarray:
+        if not sh:
+            return np.full(self.num_perm, _PRIME, dtype=np.int64)
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) % _PRIME for s in sh), dtype=np.int64, count=len(sh))
+        # (n_shingles, num_perm) matrix; values stay below 2**62 so int64 does not overflow
+        return ((np.outer(hashes, self.a) + self.b) % _PRIME).min(axis=0)
+
+
+_default_hasher = MinHasher()
+
+
+class NearDuplicateIndex:
+    """LSH index over MinHash signatures that admits a text only if nothing similar was admitted.
+
+    Banding finds candidates in roughly constant time per text; candidates are
+    confirmed with the exact shingle Jaccard so false positives never drop a text.
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD, bands: int = BANDS, hasher: MinHasher = _default_hasher):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = hasher.num_perm // bands
+        self.hasher = hasher
+        self._buckets: Dict[tuple, List[int]] = defaultdict(list)
+        self._shingles: List[Set[str]] = []
+
+    def _band_keys(self, sig: np.ndarray):
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def find(self, text: str) -> Optional[int]:
+        """Position of an admitted near-duplicate of text, or None."""
+        sh = shingles(text)
+        if not sh:
+            return None
+        return self._find(sh, self.hasher.signature(sh))
+
+    def _find(self, sh: Set[str], sig: np.ndarray) -> Optional[int]:
+        seen = set()
+        for key in self._band_keys(sig):
+            for idx in self._buckets.get(key, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                other = self._shingles[idx]
+                if len(sh & other) / len(sh | other) >= self.threshold:
+                    return idx
+        return None
+
+    def add(self, text: str) -> bool:
+        """Admit text unless it is a near-duplicate of an earlier one. Returns True if admitted."""
+        sh = shingles(text)
+        if not sh:
+            return False
+        sig = self.hasher.signature(sh)
+        if self._find(sh, sig) is not None:
+            return False
+        idx = len(self._shingles)
+        self._shingles.append(sh)
+        for key in self._band_keys(sig):
+            self._buckets[key].append(idx)
+        return True
+
+    def __len__(self):
+        return len(self._shingles)
+
+
+class SuggestionDeduper:
+    """One near-duplicate index per suggestion kind for a single report run."""
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._indexes: Dict[str, NearDuplicateIndex] = {}
+        self.dropped: Dict[str, int] = defaultdict(int)
+
+    def admit(self, kind: str, text: str) -> bool:
+        index = self._indexes.get(kind)
+        if index is None:
+            index = self._indexes[kind] = NearDuplicateIndex(self.threshold)
+        if index.add(text):
+            return True
+        self.dropped[kind] += 1
+        return False
+
+    def summary(self) -> dict:
+        return {
+            'kept': {kind: len(index) for kind, index in self._indexes.items()},
+            'dropped': dict(self.dropped),
+            'dropped_total': sum(n for kind, n in self.dropped.items() if kind not in INTERNAL_KINDS),
+        }
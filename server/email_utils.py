@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from typing import Optional, Tuple, Dict, Any
 from datetime import datetime
-import json
 
 from models.suggestion import Suggestion
 from models.report import Report
@@ -176,10 +175,7 @@ def generate_report_summary_email(
     def meta_of(s: Optional[Suggestion]) -> Dict[str, Any]:
         if not s:
             return {}
-        try:
-            return json.loads(s.meta_json or "{}")
-        except Exception:
-            return {}
+        return s.meta_json if isinstance(s.meta_json, dict) else {}
 
     m_art = meta_of(art)
     m_tw = meta_of(tw)
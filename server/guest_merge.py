@@ -0,0 +1,57 @@
+from __future__ import annotations
+from cache import cache_store
+from config import logger
+
+# How long a completed merge is remembered; new guest-owned rows clear it earlier
+MERGE_MARKER_SECONDS = 30 * 86400
+
+
+def _marker_key(guest_id: str) -> str:
+    return f"guest_merged:{guest_id}"
+
+
+def is_merged(guest_id: str, user_id: str) -> bool:
+    try:
+        marker = cache_store.get(_marker_key(guest_id))
+    except Exception as e:
+        logger.error(f"Guest merge marker read failed: {e}")
+        return False
+    return bool(marker) and (marker.decode() if isinstance(marker, bytes) else marker) == str(user_id)
+
+
+def forget(guest_id: str | None):
+    """Clear the merge marker after the guest creates something new, so the next login merges it."""
+    if not guest_id:
+        return
+    try:
+        cache_store.delete(_marker_key(guest_id))
+    except Exception as e:
+        logger.error(f"Guest merge marker delete failed: {e}")
+
+
+def merge_guest_into_user(guest_id: str, user_id: str, force: bool = False) -> dict:
+    """Move a guest's products and reports to user_id with two bulk UPDATEs in one transaction.
+
+    Memes, slops and articles hang off reports and change owner with them.
+    Completed merges are marked in Redis, so repeat calls for the same guest and
+    user return without touching the DB unless force is set.
+    """
+    from models.db_utils import db
+    from models.product import Product
+    from models.report import Report
+    if not force and is_merged(guest_id, user_id):
+        return {'products': 0, 'reports': 0, 'skipped': True}
+    try:
+        products = (Product.query.filter(Product.guest_id == guest_id)
+                    .update({Product.user_id: user_id, Product.guest_id: None}, synchronize_session=False))
+        reports = (Report.query.filter(Report.guest_id == guest_id)
+                   .update({Report.user_id: user_id, Report.guest_id: None}, synchronize_session=False))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    try:
+        cache_store.set(_marker_key(guest_id), str(user_id), ex=MERGE_MARKER_SECONDS)
+    except Exception as e:
+        logger.error(f"Guest merge marker write failed: {e}")
+    return {'products': products, 'reports': reports, 'skipped': False}
@@ -0,0 +1,165 @@
+from __future__ import annotations
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait
+from typing import Callable, Dict, Optional
+from cache import cache_store
+from config import logger
+import config
+
+# Latency samples kept per prompt for the percentile estimate
+LATENCY_SAMPLES = 200
+# Do not hedge a prompt until this many samples have been observed
+MIN_SAMPLES = 20
+# Seconds an in-process percentile estimate is reused before re-reading Redis
+DELAY_CACHE_SECONDS = 30
+# Hedge budget shared by all processes: every call adds hedge_max_rate, every hedge takes one
+BUDGET_KEY = 'hedge:budget'
+# Most hedges the budget can hold, and what it starts with; at least one so a quiet cluster can hedge
+HEDGE_BURST = max(1.0, config.hedge_burst)
+
+# Refill the budget by ARGV[1] for one call, capped at ARGV[2]
+_REFILL_SCRIPT = """
+local cap = tonumber(ARGV[2])
+local lv = tonumber(redis.call('GET', KEYS[1]) or cap)
+redis.call('SET', KEYS[1], tostring(math.min(cap, lv + tonumber(ARGV[1]))), 'EX', 86400)
+"""
+
+# Take one hedge from the budget (full at ARGV[1] when unset); 1 if taken, else 0
+_TAKE_SCRIPT = """
+local lv = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if lv < 1 then return 0 end
+redis.call('SET', KEYS[1], tostring(lv - 1), 'EX', 86400)
+return 1
+"""
+
+_pool = ThreadPoolExecutor(max_workers=config.hedge_pool_size, thread_name_prefix='hedge')
+_delay_cache: Dict[str, tuple] = {}
+_refill = cache_store.register_script(_REFILL_SCRIPT)
+_take = cache_store.register_script(_TAKE_SCRIPT)
+
+
+def _latency_key(prompt: str) -> str:
+    return f"latency:{prompt}"
+
+
+def _stats_key(prompt: str) -> str:
+    return f"hedge:stats:{prompt}"
+
+
+def record_latency(prompt: str, seconds: float):
+    """Add one completed call's latency to the prompt's rolling sample."""
+    try:
+        pipe = cache_store.pipeline()
+        pipe.lpush(_latency_key(prompt), f"{seconds:.3f}")
+        pipe.ltrim(_latency_key(prompt), 0, LATENCY_SAMPLES - 1)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to record latency for {prompt}: {e}")
+
+
+def percentile(prompt: str, q: float = 0.9) -> Optional[float]:
+    samples = sorted(float(v) for v in cache_store.lrange(_latency_key(prompt), 0, -1))
+    if len(samples) < MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def hedge_delay(prompt: str) -> Optional[float]:
+    """Seconds to wait before sending a duplicate: the observed p90, floored at the configured minimum."""
+    cached = _delay_cache.get(prompt)
+    if cached and time.monotonic() - cached[0] < DELAY_CACHE_SECONDS:
+        return cached[1]
+    try:
+        p90 = percentile(prompt, 0.9)
+    except Exception as e:
+        logger.error(f"Failed to read latency for {prompt}: {e}")
+        p90 = None
+    delay = max(p90, config.hedge_min_delay) if p90 is not None else None
+    _delay_cache[prompt] = (time.monotonic(), delay)
+    return delay
+
+
+def _hedge_allowed(prompt: str) -> bool:
+    """Take one hedge from the shared token bucket; over time hedges stay within hedge_max_rate of calls."""
+    if int(_take(keys=[BUDGET_KEY], args=[HEDGE_BURST])):
+        return True
+    cache_store.hincrby(_stats_key(prompt), 'capped', 1)
+    return False
+
+
+def _usage_tokens(response) -> int:
+    usage = getattr(response, 'usage', None)
+    return int(getattr(usage, 'total_tokens', 0) or 0)
+
+
+def _account_loser(prompt: str, future):
+    # The losing request still ran to completion (a blocking HTTP call cannot be
+    # interrupted), so its tokens are the price of the hedge
+    if future.cancelled() or future.exception() is not None:
+        return
+    cache_store.hincrby(_stats_key(prompt), 'extra_tokens', _usage_tokens(future.result()))
+
+
+def _timed(prompt: str, fn: Callable):
+    started = time.monotonic()
+    result = fn()
+    record_latency(prompt, time.monotonic() - started)
+    return result
+
+
+def call(prompt: str, fn: Callable):
+    """Run fn(); if it outlasts the prompt's p90, race a duplicate and return the first success.
+
+    fn must be safe to run twice concurrently and return an OpenAI response (its
+    usage is used to account the extra tokens of the losing request).
+    """
+    pipe = cache_store.pipeline()
+    _refill(keys=[BUDGET_KEY], args=[config.hedge_max_rate, HEDGE_BURST], client=pipe)
+    pipe.hincrby(_stats_key(prompt), 'calls', 1)
+    pipe.execute()
+    delay = hedge_delay(prompt)
+    if delay is None:
+        return _timed(prompt, fn)
+    primary = _pool.submit(_timed, prompt, fn)
+    try:
+        return primary.result(timeout=delay)
+    except FuturesTimeout:
+        pass
+    if not _hedge_allowed(prompt):
+        return primary.result()
+    cache_store.hincrby(_stats_key(prompt), 'hedges', 1)
+    backup = _pool.submit(_timed, prompt, fn)
+    pending = {primary, backup}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for winner in done:
+            if winner.exception() is not None:
+                error = winner.exception()
+                continue
+            for loser in ({primary, backup} - {winner}):
+                loser.cancel()
+                loser.add_done_callback(lambda f: _account_loser(prompt, f))
+            if winner is backup:
+                cache_store.hincrby(_stats_key(prompt), 'hedge_wins', 1)
+            return winner.result()
+    raise error
+
+
+def stats() -> Dict[str, dict]:
+    out = {}
+    for raw in cache_store.scan_iter(match='hedge:stats:*'):
+        key = raw.decode() if isinstance(raw, bytes) else raw
+        prompt = key.split(':', 2)[2]
+        counters = {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in cache_store.hgetall(key).items()
+        }
+        calls = counters.get('calls', 0)
+        out[prompt] = {
+            **counters,
+            'hedge_rate': (counters.get('hedges', 0) / calls) if calls else 0,
+            'p50': percentile(prompt, 0.5),
+            'p90': percentile(prompt, 0.9),
+        }
+    return out
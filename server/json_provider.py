@@ -0,0 +1,35 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # declared dependency; the stdlib encoder is kept as a fallback
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider serializing with orjson.
+
+    Output matches the default provider (sorted keys, HTTP dates, dataclasses via
+    the same default hook). orjson always writes compact JSON, which is what
+    response() asks for outside debug; any other json.dumps options (indent in
+    debug) go through the stdlib encoder.
+    """
+
+    option = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+              | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs and kwargs != {'separators': (',', ':')}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def init_app(app):
+    """Use orjson for request and response bodies when it is installed."""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
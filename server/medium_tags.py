@@ -0,0 +1,167 @@
+from __future__ import annotations
+import bisect
+import json
+import math
+import re
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from cache import cache_store
+from config import logger
+
+INDEX_KEY = 'medium:tag_index'
+# Rebuild in the background once the crawl is older than this
+REFRESH_AFTER_SECONDS = 86400
+# Crawl bounds: related-tag hops from the root tags and total tags kept
+CRAWL_DEPTH = 2
+MAX_TAGS = 5000
+RELATED_PER_TAG = 20
+CRAWL_CONCURRENCY = 8
+# In-process copy of the index is reused for this long
+LOCAL_TTL_SECONDS = 600
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from how i in is it of on or our that the this to we with you your '
+    'app apps platform tool tools help helps helping product service using use based new best'.split()
+)
+
+_local: Dict[str, object] = {'index': None, 'loaded_at': 0.0}
+
+
+def tokens(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or '').lower()) if t not in _STOPWORDS]
+
+
+class TagIndex:
+    """Medium tags as a sorted array with a token inverted index.
+
+    Sorted order gives prefix lookup by bisection; the token index maps each word
+    of a slug-style tag ("machine-learning" -> machine, learning) to tag positions.
+    """
+
+    def __init__(self, tags: List[str], related: Optional[Dict[str, List[str]]] = None, built_at: Optional[float] = None):
+        self.tags = sorted(set(tags))
+        self.related = related or {}
+        self.built_at = built_at or time.time()
+        self._by_token: Dict[str, List[int]] = defaultdict(list)
+        for i, tag in enumerate(self.tags):
+            for tok in set(tokens(tag.replace('-', ' '))):
+                self._by_token[tok].append(i)
+        # Inverse document frequency of tag tokens for the lexical scorer
+        n = max(1, len(self.tags))
+        self._idf = {tok: math.log(1 + n / len(ids)) for tok, ids in self._by_token.items()}
+        self._token_keys = sorted(self._by_token)
+
+    def __len__(self):
+        return len(self.tags)
+
+    def is_stale(self) -> bool:
+        return time.time() - self.built_at > REFRESH_AFTER_SECONDS
+
+    def prefix(self, prefix: str, limit: int = 20) -> List[str]:
+        prefix = (prefix or '').lower()
+        start = bisect.bisect_left(self.tags, prefix)
+        out = []
+        for tag in self.tags[start:]:
+            if not tag.startswith(prefix) or len(out) >= limit:
+                break
+            out.append(tag)
+        return out
+
+    def by_token(self, token: str) -> List[str]:
+        return [self.tags[i] for i in self._by_token.get((token or '').lower(), [])]
+
+    def shortlist(self, text: str, limit: int = 20) -> List[str]:
+        """Tags sharing words with text, scored by idf-weighted overlap.
+
+        Exact token matches count fully; a tag token that merely starts with a
+        query word of 4+ characters ("market" -> "marketing") counts half. Tags
+        whose tokens are mostly covered by the text rank above broad ones.
+        """
+        query = Counter(tokens(text))
+        scores: Dict[int, float] = defaultdict(float)
+        for word, tf in query.items():
+            weight = 1 + math.log(tf)
+            for i in self._by_token.get(word, []):
+                scores[i] += weight * self._idf[word]
+            if len(word) >= 4:
+                start = bisect.bisect_left(self._token_keys, word)
+                for tok in self._token_keys[start:]:
+                    if not tok.startswith(word):
+                        break
+                    if tok == word:
+                        continue
+                    for i in self._by_token[tok]:
+                        scores[i] += 0.5 * weight * self._idf[tok]
+        ranked = []
+        for i, score in scores.items():
+            tag_tokens = tokens(self.tags[i].replace('-', ' ')) or ['']
+            coverage = sum(1 for t in tag_tokens if t in query) / len(tag_tokens)
+            ranked.append((score * (0.5 + coverage), self.tags[i]))
+        ranked.sort(key=lambda x: (-x[0], x[1]))
+        return [tag for _, tag in ranked[:limit]]
+
+    def to_json(self) -> str:
+        return json.dumps({'tags': self.tags, 'related': self.related, 'built_at': self.built_at})
+
+    @classmethod
+    def from_json(cls, raw) -> 'TagIndex':
+        data = json.loads(raw)
+        return cls(data.get('tags') or [], data.get('related') or {}, data.get('built_at'))
+
+
+def load_index() -> Optional[TagIndex]:
+    """The stored tag index (cached in-process), or None if it was never built.
+
+    A stale index is still returned; a background refresh is queued for it.
+    """
+    index = _local['index']
+    if index is None or time.monotonic() - _local['loaded_at'] > LOCAL_TTL_SECONDS:
+        try:
+            raw = cache_store.get(INDEX_KEY)
+        except Exception as e:
+            logger.error(f"Failed to read Medium tag index: {e}")
+            raw = None
+        index = TagIndex.from_json(raw) if raw else None
+        _local['index'], _local['loaded_at'] = index, time.monotonic()
+    if index is None or index.is_stale():
+        schedule_refresh()
+    return index
+
+
+def schedule_refresh():
+    # One queued refresh per hour at most, whichever process notices first
+    if cache_store.set(f"{INDEX_KEY}:refresh_scheduled", 1, nx=True, ex=3600):
+        from queue_util import enqueue_job
+        enqueue_job('workers.refresh_medium_tags')
+
+
+def crawl(client, depth: int = CRAWL_DEPTH, max_tags: int = MAX_TAGS) -> TagIndex:
+    """Breadth-first crawl of root tags and their related tags, one hop level at a time in parallel."""
+    roots = client.list_root_tags(limit=1000)
+    seen = set(roots)
+    related: Dict[str, List[str]] = {}
+    frontier = list(roots)
+    with ThreadPoolExecutor(max_workers=CRAWL_CONCURRENCY) as pool:
+        for _ in range(depth):
+            if not frontier or len(seen) >= max_tags:
+                break
+            next_frontier = []
+            for tag, rel in zip(frontier, pool.map(lambda t: client.get_related_tags(t, limit=RELATED_PER_TAG), frontier)):
+                related[tag] = rel
+                for r in rel:
+                    if r not in seen and len(seen) < max_tags:
+                        seen.add(r)
+                        next_frontier.append(r)
+            frontier = next_frontier
+    return TagIndex(list(seen), related)
+
+
+def refresh(client) -> TagIndex:
+    index = crawl(client)
+    cache_store.set(INDEX_KEY, index.to_json())
+    _local['index'], _local['loaded_at'] = index, time.monotonic()
+    logger.info(f"Medium tag index refreshed with {len(index)} tags")
+    return index
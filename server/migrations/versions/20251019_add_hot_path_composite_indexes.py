@@ -0,0 +1,50 @@
+"""add composite indexes for hot query paths
+
+Revision ID: hot_path_indexes_20251019
+Revises: 5b919781deb4
+Create Date: 2025-10-19 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'hot_path_indexes_20251019'
+down_revision = '5b919781deb4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # email_utils._find_top_suggestion: WHERE report_id, kind ORDER BY rank DESC
+    with op.batch_alter_table('suggestions', schema=None) as batch_op:
+        batch_op.create_index('ix_suggestions_report_kind_rank', ['report_id', 'kind', 'rank'], unique=False)
+
+    # latest report per product; latest report per user and status (send_latest_report_emails)
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.create_index('ix_reports_product_created', ['product_id', 'created_on'], unique=False)
+        batch_op.create_index('ix_reports_user_status_created', ['user_id', 'status', 'created_on'], unique=False)
+
+    # UsageQuota.get_or_create
+    with op.batch_alter_table('usage_quotas', schema=None) as batch_op:
+        batch_op.create_index('ix_usage_quotas_user_date', ['user_id', 'date'], unique=False)
+
+    # CreditLedger monthly totals
+    with op.batch_alter_table('credit_ledger', schema=None) as batch_op:
+        batch_op.create_index('ix_credit_ledger_user_created', ['user_id', 'created_on'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('credit_ledger', schema=None) as batch_op:
+        batch_op.drop_index('ix_credit_ledger_user_created')
+
+    with op.batch_alter_table('usage_quotas', schema=None) as batch_op:
+        batch_op.drop_index('ix_usage_quotas_user_date')
+
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.drop_index('ix_reports_user_status_created')
+        batch_op.drop_index('ix_reports_product_created')
+
+    with op.batch_alter_table('suggestions', schema=None) as batch_op:
+        batch_op.drop_index('ix_suggestions_report_kind_rank')
@@ -0,0 +1,40 @@
+"""add report archives
+
+Revision ID: report_archives_20251019
+Revises: compressed_step_payloads_20251019
+Create Date: 2025-10-19 18:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'report_archives_20251019'
+down_revision = 'compressed_step_payloads_20251019'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_archives',
+    sa.Column('report_id', sa.String(length=100), nullable=False),
+    sa.Column('codec', sa.String(length=20), nullable=False),
+    sa.Column('data', sa.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql'), nullable=False),
+    sa.Column('steps_codec', sa.String(length=20), nullable=False),
+    sa.Column('steps_data', sa.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql'), nullable=False),
+    sa.Column('suggestion_count', sa.Integer(), nullable=True),
+    sa.Column('step_count', sa.Integer(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['report_id'], ['reports.id'], ),
+    sa.PrimaryKeyConstraint('report_id')
+    )
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.drop_column('archived_at')
+    op.drop_table('report_archives')
@@ -0,0 +1,26 @@
+"""add report pipeline profile
+
+Revision ID: report_pipeline_profile_20251019
+Revises: report_archives_20251019
+Create Date: 2025-10-19 19:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'report_pipeline_profile_20251019'
+down_revision = 'report_archives_20251019'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pipeline_profile', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.drop_column('pipeline_profile')
@@ -0,0 +1,30 @@
+"""compressed report step payloads
+
+Revision ID: compressed_step_payloads_20251019
+Revises: json_document_columns_20251019
+Create Date: 2025-10-19 15:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'compressed_step_payloads_20251019'
+down_revision = 'json_document_columns_20251019'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('report_steps', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('payload_codec', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('payload_blob', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('payload_path', sa.String(length=300), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('report_steps', schema=None) as batch_op:
+        batch_op.drop_column('payload_path')
+        batch_op.drop_column('payload_blob')
+        batch_op.drop_column('payload_codec')
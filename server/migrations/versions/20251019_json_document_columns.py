@@ -0,0 +1,51 @@
+"""store suggestion meta, step payloads and meme/slop instructions as JSON
+
+Revision ID: json_document_columns_20251019
+Revises: hot_path_indexes_20251019
+Create Date: 2025-10-19 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'json_document_columns_20251019'
+down_revision = 'hot_path_indexes_20251019'
+branch_labels = None
+depends_on = None
+
+# (table, column) pairs converted from TEXT holding JSON
+COLUMNS = (
+    ('suggestions', 'meta_json'),
+    ('report_steps', 'payload_json'),
+    ('memes', 'instructions_json'),
+    ('slops', 'instructions_json'),
+)
+
+
+def _json_type():
+    return postgresql.JSONB() if op.get_bind().dialect.name == 'postgresql' else sa.JSON()
+
+
+def upgrade():
+    for table, column in COLUMNS:
+        # Empty strings are not valid JSON documents
+        op.execute(sa.text(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''"))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column,
+                   existing_type=sa.Text(),
+                   type_=_json_type(),
+                   existing_nullable=True,
+                   postgresql_using=f"{column}::jsonb")
+
+
+def downgrade():
+    for table, column in COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column,
+                   existing_type=_json_type(),
+                   type_=sa.Text(),
+                   existing_nullable=True,
+                   postgresql_using=f"{column}::text")
@@ -0,0 +1,111 @@
+from __future__ import annotations
+from dataclasses import dataclass, asdict, replace
+from typing import Dict, Optional
+from cache import cache_store
+from config import logger
+import config
+
+
+@dataclass(frozen=True)
+class Route:
+    model: str
+    # 'minimal' | 'low' | 'medium' | 'high', or None for the model default
+    reasoning_effort: Optional[str] = None
+    # Cap on completion tokens (reasoning tokens included), or None for no cap
+    max_output_tokens: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+DEFAULT_ROUTE = Route('gpt-5-mini')
+
+# Routes per prompt (ThinkingClient method name). Classification-style prompts get
+# the smallest model; long-form writing keeps the larger one.
+ROUTES: Dict[str, Route] = {
+    'get_keywords_for_prospective_clients': Route('gpt-5-mini', 'low', 4000),
+    'get_keywords_for_seo': Route('gpt-5-mini', 'low', 3000),
+    'filter_keywords': Route('gpt-5-nano', 'minimal', 1000),
+    'filter_topics': Route('gpt-5-nano', 'minimal', 1000),
+    'articles_for_topic': Route('gpt-5-mini', 'low', 4000),
+    'tweets_for_topic': Route('gpt-5-mini', 'low', 3000),
+    'witty_reply': Route('gpt-5-nano', 'low', 1000),
+    'article_content': Route('gpt-5-mini', 'medium', 12000),
+    'meme_ideas_from_twitter': Route('gpt-5-mini', 'low', 3000),
+    'meme_ideas_from_medium': Route('gpt-5-mini', 'low', 3000),
+    'slop_ideas_from_twitter': Route('gpt-5-mini', 'low', 4000),
+    'slop_ideas_from_medium': Route('gpt-5-mini', 'low', 4000),
+    'news_summary': Route('gpt-5', 'low', 4000),
+}
+
+# Per plan tier overrides of ROUTES ('guest' for reports without an account)
+TIER_ROUTES: Dict[str, Dict[str, Route]] = {
+    'guest': {
+        'article_content': Route('gpt-5-mini', 'low', 8000),
+    },
+    'advanced': {
+        'article_content': Route('gpt-5', 'medium', 16000),
+    },
+}
+
+
+def _from_config(raw: dict, base: Route) -> Route:
+    fields = {k: raw[k] for k in ('model', 'reasoning_effort', 'max_output_tokens') if k in raw}
+    return replace(base, **fields)
+
+
+def resolve(prompt: Optional[str], tier: Optional[str] = None) -> Route:
+    """Route for a prompt: env/config overrides win over tier routes, which win over defaults.
+
+    MODEL_ROUTES overrides every tier; MODEL_ROUTES_BY_TIER overrides one tier.
+    Overrides may set only some fields, e.g. {"filter_topics": {"model": "gpt-5-mini"}}.
+    """
+    route = ROUTES.get(prompt, DEFAULT_ROUTE) if prompt else DEFAULT_ROUTE
+    if tier and prompt in TIER_ROUTES.get(tier, {}):
+        route = TIER_ROUTES[tier][prompt]
+    try:
+        if prompt in config.model_routes:
+            route = _from_config(config.model_routes[prompt], route)
+        tier_overrides = config.model_routes_by_tier.get(tier) or {}
+        if prompt in tier_overrides:
+            route = _from_config(tier_overrides[prompt], route)
+    except (TypeError, AttributeError) as e:
+        logger.error(f"Ignoring malformed model route override for {prompt}: {e}")
+    return route
+
+
+def _stats_key(prompt: Optional[str], model: str) -> str:
+    return f"route:stats:{prompt or 'default'}:{model}"
+
+
+def record(prompt: Optional[str], route: Route, latency_seconds: float, prompt_tokens: int, completion_tokens: int, cost: float):
+    """Accumulate latency, token usage and cost for one completed call on a route."""
+    try:
+        key = _stats_key(prompt, route.model)
+        pipe = cache_store.pipeline()
+        pipe.hincrby(key, 'calls', 1)
+        pipe.hincrby(key, 'latency_ms_total', int(latency_seconds * 1000))
+        pipe.hincrby(key, 'prompt_tokens', int(prompt_tokens or 0))
+        pipe.hincrby(key, 'completion_tokens', int(completion_tokens or 0))
+        pipe.hincrbyfloat(key, 'cost', float(cost or 0))
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to record route stats for {prompt}: {e}")
+
+
+def stats() -> Dict[str, dict]:
+    out: Dict[str, dict] = {}
+    for raw in cache_store.scan_iter(match='route:stats:*'):
+        key = raw.decode() if isinstance(raw, bytes) else raw
+        _, _, prompt, model = key.split(':', 3)
+        counters = {
+            (k.decode() if isinstance(k, bytes) else k): float(v)
+            for k, v in cache_store.hgetall(key).items()
+        }
+        calls = counters.get('calls', 0)
+        out.setdefault(prompt, {})[model] = {
+            **counters,
+            'avg_latency_ms': (counters.get('latency_ms_total', 0) / calls) if calls else 0,
+            'avg_cost': (counters.get('cost', 0) / calls) if calls else 0,
+        }
+    return out
@@ -5,6 +5,9 @@ from sqlalchemy import tuple_, func, or_
 
 class CreditLedger(db.Model):
   UNIT = 1000*1000
+  __table_args__ = (
+    db.Index('ix_credit_ledger_user_created', 'user_id', 'created_on'),
+  )
   id = db.Column(db.Integer, primary_key=True)
   user_id = db.Column(db.String(200), index=True)
   credit = db.Column(db.Integer)
@@ -49,5 +52,11 @@ class CreditLedger(db.Model):
       return (prompts * 0.03 * CreditLedger.UNIT ) + (completion * 0.06 * CreditLedger.UNIT)
     elif model == 'gpt-3.5-turbo':
       return (prompts * 0.002 * CreditLedger.UNIT ) + (completion * 0.002 * CreditLedger.UNIT)
+    elif model == 'gpt-5':
+      return (prompts * 0.00125 * CreditLedger.UNIT ) + (completion * 0.01 * CreditLedger.UNIT)
+    elif model == 'gpt-5-mini':
+      return (prompts * 0.00025 * CreditLedger.UNIT ) + (completion * 0.002 * CreditLedger.UNIT)
+    elif model == 'gpt-5-nano':
+      return (prompts * 0.00005 * CreditLedger.UNIT ) + (completion * 0.0004 * CreditLedger.UNIT)
     else:
       return 0
\ No newline at end of file
@@ -1,3 +1,51 @@
+import json
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import String, cast, func, literal
+from sqlalchemy.dialects.postgresql import JSONB
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+# JSON document column: JSONB on Postgres, native JSON on MySQL, JSON text on SQLite
+JSONDocument = db.JSON().with_variant(JSONB(), 'postgresql')
+
+
+def json_merge_expr(column, updates: dict, dialect: str):
+    """SQL expression setting top-level keys of a JSON column in place, or None if the dialect has none.
+
+    None values are dropped: merge-patch (MySQL, SQLite) would delete the key
+    while Postgres `||` would store null, so they leave the key as it is on
+    every dialect.
+    """
+    patch = literal(json.dumps({k: v for k, v in updates.items() if v is not None}), String)
+    empty = literal('{}', String)
+    if dialect == 'postgresql':
+        return func.coalesce(column, cast(empty, JSONB)).op('||')(cast(patch, JSONB))
+    if dialect == 'mysql':
+        return func.json_merge_patch(func.coalesce(column, empty), patch)
+    if dialect == 'sqlite':
+        return func.json_patch(func.coalesce(column, empty), patch)
+    return None
+
+
+def update_json_keys(model, row_id, column, updates: dict):
+    """Set keys of one row's JSON column with a single UPDATE and commit.
+
+    Dialects without an in-place JSON merge fall back to read-modify-write.
+    None values are skipped (see json_merge_expr). Instances of the row
+    already loaded in the session are not refreshed.
+    """
+    updates = {k: v for k, v in updates.items() if v is not None}
+    if not updates:
+        return
+    expr = json_merge_expr(column, updates, db.session.get_bind().dialect.name)
+    if expr is not None:
+        model.query.filter(model.id == row_id).update({column: expr}, synchronize_session=False)
+    else:
+        row = model.query.get(row_id)
+        if row is None:
+            return
+        data = dict(getattr(row, column.key) or {})
+        data.update(updates)
+        setattr(row, column.key, data)
+        db.session.add(row)
+    db.session.commit()
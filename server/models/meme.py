@@ -1,4 +1,4 @@
-from .db_utils import db
+from .db_utils import db, JSONDocument
 from uuid import uuid4
 
 
@@ -8,7 +8,7 @@ class Meme(db.Model):
     report_id = db.Column(db.String(100), db.ForeignKey('reports.id'), nullable=False, index=True)
     suggestion_id = db.Column(db.String(100), db.ForeignKey('suggestions.id'), nullable=True, index=True)
     concept = db.Column(db.String(500), nullable=True)
-    instructions_json = db.Column(db.Text, nullable=True)  # JSON string with generation instructions
+    instructions_json = db.Column(JSONDocument, nullable=True)  # generation instructions
     # Deprecated: base64-encoded image data (PNG)
     image_b64 = db.Column(db.Text, nullable=True)
     # Preferred: raw PNG bytes
@@ -24,13 +24,13 @@ class Meme(db.Model):
     report = db.relationship('Report', backref=db.backref('memes', lazy=True))
 
     @classmethod
-    def create(cls, report_id: str, suggestion_id: str | None = None, concept: str | None = None, instructions_json: str | None = None):
+    def create(cls, report_id: str, suggestion_id: str | None = None, concept: str | None = None, instructions: dict | None = None):
         rec = Meme(
             id=str(uuid4()),
             report_id=report_id,
             suggestion_id=suggestion_id,
             concept=concept,
-            instructions_json=instructions_json,
+            instructions_json=instructions,
             status='generating',
         )
         db.session.add(rec)
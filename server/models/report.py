@@ -1,10 +1,15 @@
 from .db_utils import db
 from uuid import uuid4
 from datetime import datetime
+from pubsub_utils import publish_feed_event
 
 
 class Report(db.Model):
     __tablename__ = 'reports'
+    __table_args__ = (
+        db.Index('ix_reports_product_created', 'product_id', 'created_on'),
+        db.Index('ix_reports_user_status_created', 'user_id', 'status', 'created_on'),
+    )
     id = db.Column(db.String(100), primary_key=True)
     product_id = db.Column(db.String(100), db.ForeignKey('products.id'), nullable=False, index=True)
     user_id = db.Column(db.String(100), db.ForeignKey('user.id'), nullable=True, index=True)
@@ -12,8 +17,11 @@ class Report(db.Model):
     status = db.Column(db.String(50), default='queued', index=True)
     error_message = db.Column(db.Text, nullable=True)
     visibility_cutoff = db.Column(db.Integer, default=5)  # number of items visible to guests
+    pipeline_profile = db.Column(db.String(20), nullable=True)  # guest|free|pro|advanced (see pipeline_profiles)
     started_at = db.Column(db.DateTime, nullable=True)
     completed_at = db.Column(db.DateTime, nullable=True)
+    # Set once suggestions and steps were moved into report_archives
+    archived_at = db.Column(db.DateTime, nullable=True)
     created_on = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_on = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
 
@@ -21,7 +29,7 @@ class Report(db.Model):
     user = db.relationship('User', backref=db.backref('reports', lazy=True))
 
     @classmethod
-    def create(cls, product_id: str, user_id=None, guest_id=None, visibility_cutoff=5):
+    def create(cls, product_id: str, user_id=None, guest_id=None, visibility_cutoff=5, pipeline_profile=None):
         rep = Report(
             id=str(uuid4()),
             product_id=product_id,
@@ -29,27 +37,34 @@ class Report(db.Model):
             guest_id=guest_id,
             status='queued',
             visibility_cutoff=visibility_cutoff,
+            pipeline_profile=pipeline_profile,
         )
         db.session.add(rep)
         db.session.commit()
         return rep
 
+    def _publish_status(self):
+        publish_feed_event(self.id, 'status', {'status': self.status})
+
     def mark_running(self):
         self.status = 'running'
         self.started_at = datetime.utcnow()
         db.session.add(self)
         db.session.commit()
+        self._publish_status()
 
     def mark_partial(self):
         self.status = 'partial_ready'
         db.session.add(self)
         db.session.commit()
+        self._publish_status()
 
     def mark_complete(self):
         self.status = 'complete'
         self.completed_at = datetime.utcnow()
         db.session.add(self)
         db.session.commit()
+        self._publish_status()
 
     def mark_failed(self, message: str):
         try:
@@ -60,3 +75,4 @@ class Report(db.Model):
         self.error_message = message
         db.session.add(self)
         db.session.commit()
+        self._publish_status()
@@ -0,0 +1,20 @@
+from .db_utils import db
+from datetime import datetime
+from sqlalchemy.dialects import mysql
+
+
+class ReportArchive(db.Model):
+    """A report's suggestions and steps, compressed (see retention).
+
+    data holds the suggestions, step names/statuses and media links that
+    get_report serves; steps_data holds the full steps with their payloads.
+    """
+    __tablename__ = 'report_archives'
+    report_id = db.Column(db.String(100), db.ForeignKey('reports.id'), primary_key=True)
+    codec = db.Column(db.String(20), nullable=False)
+    data = db.deferred(db.Column(db.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql'), nullable=False))
+    steps_codec = db.Column(db.String(20), nullable=False)
+    steps_data = db.deferred(db.Column(db.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql'), nullable=False))
+    suggestion_count = db.Column(db.Integer, default=0)
+    step_count = db.Column(db.Integer, default=0)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,6 +1,9 @@
-from .db_utils import db
+from .db_utils import db, JSONDocument
 from uuid import uuid4
 from datetime import datetime
+from pubsub_utils import publish_feed_event
+import payload_store
+import config
 
 
 class ReportStep(db.Model):
@@ -12,7 +15,12 @@ class ReportStep(db.Model):
     started_at = db.Column(db.DateTime, nullable=True)
     finished_at = db.Column(db.DateTime, nullable=True)
     error_message = db.Column(db.Text, nullable=True)
-    payload_json = db.Column(db.Text, nullable=True)
+    # Legacy uncompressed payloads; new ones are written through the payload property
+    payload_json = db.deferred(db.Column(JSONDocument, nullable=True))
+    # Compressed msgpack payload, either inline or in a file under config.step_payload_dir
+    payload_codec = db.Column(db.String(20), nullable=True)
+    payload_blob = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    payload_path = db.Column(db.String(300), nullable=True)
 
     report = db.relationship('Report', backref=db.backref('steps', lazy=True))
 
@@ -21,15 +29,45 @@ class ReportStep(db.Model):
         rec = ReportStep(id=str(uuid4()), report_id=report_id, step_name=step_name, status='running', started_at=datetime.utcnow())
         db.session.add(rec)
         db.session.commit()
+        rec._publish()
         return rec
 
-    def done(self, payload_json: str | None = None):
+    def _publish(self):
+        publish_feed_event(self.report_id, 'step', {'step_name': self.step_name, 'status': self.status})
+
+    @property
+    def payload(self):
+        """The step's payload, whether spilled to a file, compressed in the row or stored as legacy JSON."""
+        if self.payload_codec:
+            data = payload_store.read_file(self.payload_path) if self.payload_path else self.payload_blob
+            return payload_store.decode(self.payload_codec, data) if data is not None else None
+        return self.payload_json
+
+    @payload.setter
+    def payload(self, value):
+        old_path = self.payload_path
+        self.payload_json = None
+        self.payload_blob = None
+        self.payload_path = None
+        self.payload_codec = None
+        if value is not None:
+            self.payload_codec, data = payload_store.encode(value)
+            if len(data) > config.step_payload_spill_bytes:
+                self.payload_path = payload_store.spill_path(self.report_id, self.id)
+                payload_store.write_file(self.payload_path, data)
+            else:
+                self.payload_blob = data
+        if old_path and old_path != self.payload_path:
+            payload_store.delete_file(old_path)
+
+    def done(self, payload: dict | None = None):
         self.status = 'done'
         self.finished_at = datetime.utcnow()
-        if payload_json is not None:
-            self.payload_json = payload_json
+        if payload is not None:
+            self.payload = payload
         db.session.add(self)
         db.session.commit()
+        self._publish()
 
     def fail(self, message: str):
         self.status = 'failed'
@@ -37,3 +75,4 @@ class ReportStep(db.Model):
         self.finished_at = datetime.utcnow()
         db.session.add(self)
         db.session.commit()
+        self._publish()
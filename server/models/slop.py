@@ -1,4 +1,4 @@
-from .db_utils import db
+from .db_utils import db, JSONDocument
 from uuid import uuid4
 
 
@@ -8,7 +8,7 @@ class Slop(db.Model):
     report_id = db.Column(db.String(100), db.ForeignKey('reports.id'), nullable=False, index=True)
     suggestion_id = db.Column(db.String(100), db.ForeignKey('suggestions.id'), nullable=True, index=True)
     concept = db.Column(db.String(500), nullable=True)
-    instructions_json = db.Column(db.Text, nullable=True)  # JSON string with generation instructions
+    instructions_json = db.Column(JSONDocument, nullable=True)  # generation instructions
     # Store generated MP4 locally and keep a relative path under static/
     video_path = db.Column(db.String(400), nullable=True)
     status = db.Column(db.String(20), default='generating')  # generating|ready|failed
@@ -20,13 +20,13 @@ class Slop(db.Model):
     report = db.relationship('Report', backref=db.backref('slops', lazy=True))
 
     @classmethod
-    def create(cls, report_id: str, suggestion_id: str | None = None, concept: str | None = None, instructions_json: str | None = None):
+    def create(cls, report_id: str, suggestion_id: str | None = None, concept: str | None = None, instructions: dict | None = None):
         rec = Slop(
             id=str(uuid4()),
             report_id=report_id,
             suggestion_id=suggestion_id,
             concept=concept,
-            instructions_json=instructions_json,
+            instructions_json=instructions,
             status='generating',
         )
         db.session.add(rec)
@@ -88,6 +88,9 @@ class UserSubscription(db.Model):
 
 class UsageQuota(db.Model):
     __tablename__ = 'usage_quotas'
+    __table_args__ = (
+        db.Index('ix_usage_quotas_user_date', 'user_id', 'date'),
+    )
     id = db.Column(db.String(100), primary_key=True)
     user_id = db.Column(db.String(100), db.ForeignKey('user.id'), nullable=False, index=True)
     date = db.Column(db.Date, nullable=False, index=True)
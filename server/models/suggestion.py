@@ -1,22 +1,26 @@
-from .db_utils import db
+from .db_utils import db, JSONDocument, update_json_keys
 from uuid import uuid4
+from pubsub_utils import publish_feed_event
 
 
 class Suggestion(db.Model):
     __tablename__ = 'suggestions'
+    __table_args__ = (
+        db.Index('ix_suggestions_report_kind_rank', 'report_id', 'kind', 'rank'),
+    )
     id = db.Column(db.String(100), primary_key=True)
     report_id = db.Column(db.String(100), db.ForeignKey('reports.id'), nullable=False, index=True)
     source_type = db.Column(db.String(50), nullable=False)  # trending_topic|kw_g1|kw_g2|medium_tag
     kind = db.Column(db.String(50), nullable=False)  # article_headline|tweet|tweet_reply
     text = db.Column(db.Text, nullable=False)
     rank = db.Column(db.Float, default=0.0)
-    meta_json = db.Column(db.Text, nullable=True)
+    meta_json = db.Column(JSONDocument, nullable=True)
     visibility = db.Column(db.String(20), default='subscriber')  # guest|subscriber
 
     report = db.relationship('Report', backref=db.backref('suggestions', lazy=True))
 
     @classmethod
-    def add(cls, report_id: str, source_type: str, kind: str, text: str, rank: float = 0.0, meta_json: str | None = None, visibility: str = 'subscriber'):
+    def add(cls, report_id: str, source_type: str, kind: str, text: str, rank: float = 0.0, meta: dict | None = None, visibility: str = 'subscriber'):
         rec = Suggestion(
             id=str(uuid4()),
             report_id=report_id,
@@ -24,9 +28,25 @@ class Suggestion(db.Model):
             kind=kind,
             text=text,
             rank=rank,
-            meta_json=meta_json,
+            meta_json=meta,
             visibility=visibility,
         )
         db.session.add(rec)
         db.session.commit()
+        publish_feed_event(report_id, 'suggestion', rec.to_dict())
         return rec
+
+    @classmethod
+    def merge_meta(cls, suggestion_id: str, updates: dict):
+        """Set keys of a suggestion's meta in place, without loading the row."""
+        update_json_keys(cls, suggestion_id, cls.meta_json, updates)
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'source_type': self.source_type,
+            'text': self.text,
+            'rank': self.rank,
+            'meta': self.meta_json or None,
+        }
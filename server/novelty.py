@@ -0,0 +1,162 @@
+from __future__ import annotations
+import io
+import json
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from cache import cache_store
+from config import logger
+
+# Hashed feature space for word unigrams and bigrams
+DIMENSIONS = 1024
+# Cosine similarity to a past suggestion of the same kind above which a candidate is not novel
+NOVELTY_THRESHOLD = 0.85
+# Oldest rows are dropped beyond this many per product
+MAX_ROWS = 2000
+# Recent texts per kind kept for "avoid" prompt hints
+RECENT_PER_KIND = 10
+# Suggestion kinds tracked; replies are tied to one tweet so they are not compared across feeds
+KINDS = ('tweet', 'article_headline', 'meme_concept', 'slop_concept')
+
+_KIND_CODES = {kind: i for i, kind in enumerate(KINDS)}
+_TOKEN_RE = re.compile(r'[a-z0-9#]+')
+
+
+def _features(text: str) -> List[str]:
+    words = _TOKEN_RE.findall((text or '').lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def vectorize(texts: Iterable[str]) -> np.ndarray:
+    """Signed hashing-trick term vectors, L2-normalised, as a float32 (n, DIMENSIONS) array."""
+    texts = list(texts)
+    out = np.zeros((len(texts), DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        feats = _features(text)
+        if not feats:
+            continue
+        hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in feats), dtype=np.uint32, count=len(feats))
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(out[row], (hashes % DIMENSIONS).astype(np.intp), signs)
+    # Sublinear term frequency, then unit length so dot products are cosines
+    out = np.sign(out) * np.log1p(np.abs(out))
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+
+class NoveltyIndex:
+    """Vectors of a product's past suggestions, persisted in Redis as one compressed blob.
+
+    Loaded once per report run to score candidates, and extended with the run's
+    stored suggestions when the report completes. A missing blob is rebuilt from
+    the product's past reports.
+    """
+
+    def __init__(self, product_id: str, vectors: Optional[np.ndarray] = None, kinds: Optional[np.ndarray] = None,
+                 report_ids: Optional[List[str]] = None, recent: Optional[Dict[str, List[str]]] = None):
+        self.product_id = product_id
+        self.vectors = vectors if vectors is not None else np.zeros((0, DIMENSIONS), dtype=np.float16)
+        self.kinds = kinds if kinds is not None else np.zeros(0, dtype=np.uint8)
+        self.report_ids = report_ids or []
+        self.recent = recent or {}
+
+    @staticmethod
+    def _key(product_id: str) -> str:
+        return f"novelty:{product_id}"
+
+    @classmethod
+    def load(cls, product_id: str) -> 'NoveltyIndex':
+        try:
+            raw = cache_store.get(cls._key(product_id))
+            if raw:
+                return cls._decode(product_id, raw)
+        except Exception as e:
+            logger.error(f"Failed to load novelty index for {product_id}: {e}")
+        index = cls.rebuild(product_id)
+        try:
+            index.save()
+        except Exception as e:
+            logger.error(f"Failed to save novelty index for {product_id}: {e}")
+        return index
+
+    @classmethod
+    def rebuild(cls, product_id: str) -> 'NoveltyIndex':
+        from models.report import Report
+        from models.suggestion import Suggestion
+        index = cls(product_id)
+        reports = (Report.query.filter(Report.product_id == product_id, Report.status.in_(('complete', 'partial_ready')))
+                   .order_by(Report.created_on.asc()).all())
+        # One query for live suggestions and one for archives, whatever the product's history
+        live_ids = [rep.id for rep in reports if not rep.archived_at]
+        by_report: Dict[str, List[Tuple[str, str]]] = {}
+        if live_ids:
+            rows = (Suggestion.query.with_entities(Suggestion.report_id, Suggestion.kind, Suggestion.text)
+                    .filter(Suggestion.report_id.in_(live_ids), Suggestion.kind.in_(KINDS)).all())
+            for report_id, kind, text in rows:
+                by_report.setdefault(report_id, []).append((kind, text))
+        # Archived suggestions stay part of the product's history
+        import retention
+        archives = retention.load_archives([rep.id for rep in reports if rep.archived_at])
+        for report_id, archive in archives.items():
+            by_report[report_id] = [(sug['kind'], sug['text']) for sug in archive.get('suggestions', [])]
+        for rep in reports:
+            index.add_report(rep.id, by_report.get(rep.id, []))
+        return index
+
+    @classmethod
+    def _decode(cls, product_id: str, raw: bytes) -> 'NoveltyIndex':
+        with np.load(io.BytesIO(raw)) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            return cls(product_id, data['vectors'], data['kinds'], meta.get('report_ids'), meta.get('recent'))
+
+    def save(self):
+        buf = io.BytesIO()
+        meta = json.dumps({'report_ids': self.report_ids, 'recent': self.recent}).encode('utf-8')
+        np.savez_compressed(buf, vectors=self.vectors, kinds=self.kinds, meta=np.frombuffer(meta, dtype=np.uint8))
+        cache_store.set(self._key(self.product_id), buf.getvalue())
+
+    def is_novel(self, kind: str, text: str, threshold: float = NOVELTY_THRESHOLD) -> bool:
+        code = _KIND_CODES.get(kind)
+        if code is None or not len(self.kinds):
+            return True
+        rows = self.vectors[self.kinds == code]
+        if not len(rows):
+            return True
+        sims = rows.astype(np.float32) @ vectorize([text])[0]
+        return float(sims.max()) < threshold
+
+    def add_report(self, report_id: str, items: Iterable[Tuple[str, str]]):
+        """Append a report's (kind, text) suggestions; a report already indexed is ignored."""
+        if report_id in self.report_ids:
+            return
+        items = [(k, t) for k, t in items if k in _KIND_CODES and t]
+        if items:
+            self.vectors = np.vstack([self.vectors, vectorize(t for _, t in items).astype(np.float16)])[-MAX_ROWS:]
+            self.kinds = np.concatenate([self.kinds, np.array([_KIND_CODES[k] for k, _ in items], dtype=np.uint8)])[-MAX_ROWS:]
+            for kind, text in items:
+                self.recent[kind] = (self.recent.get(kind, []) + [text])[-RECENT_PER_KIND:]
+        self.report_ids = (self.report_ids + [report_id])[-200:]
+
+    def avoid_hints(self) -> Dict[str, List[str]]:
+        """Most recent past suggestions per kind, newest first."""
+        return {kind: list(reversed(texts)) for kind, texts in self.recent.items()}
+
+
+def record_report(report, skip_ids: Optional[Set[str]] = None, entry_id: Optional[str] = None) -> None:
+    """Add a finished report's stored suggestions to its product's novelty index.
+
+    A top-up records only what it added: skip_ids are the suggestions indexed
+    before, and entry_id keeps the index from ignoring an already-indexed report.
+    """
+    from models.suggestion import Suggestion
+    try:
+        with cache_store.lock(f"novelty:{report.product_id}:lock", timeout=60, blocking_timeout=30):
+            index = NoveltyIndex.load(report.product_id)
+            rows = (Suggestion.query.with_entities(Suggestion.id, Suggestion.kind, Suggestion.text)
+                    .filter(Suggestion.report_id == report.id, Suggestion.kind.in_(KINDS)).all())
+            index.add_report(entry_id or report.id, [(kind, text) for sid, kind, text in rows if sid not in (skip_ids or ())])
+            index.save()
+    except Exception as e:
+        logger.error(f"Failed to update novelty index for {report.product_id}: {e}")
@@ -10,11 +10,94 @@ from models.db_utils import db
 from models.user import User
 from models.credit_ledger import CreditLedger
 from dataclasses import dataclass
+from functools import lru_cache
+from contextlib import contextmanager
+from rate_limiter import RateLimiter
+import resilience
+import hedging
+import model_routing
+import time
 import tiktoken
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None
 
 openai.api_key = config.openai_key
 
-openai_client = OpenAI(api_key=config.openai_key)
+# Retries are owned by the resilience layer so they share the openai circuit breaker
+openai_client = OpenAI(api_key=config.openai_key, max_retries=0)
+
+openai_limiter = RateLimiter('openai', config.openai_rate_limits, config.openai_default_limits)
+
+
+def _is_overload(e: Exception) -> bool:
+    """True for provider throttling or server-side failures that should shrink concurrency."""
+    if isinstance(e, (openai.RateLimitError, openai.InternalServerError, openai.APITimeoutError)):
+        return True
+    status = getattr(e, 'status_code', None)
+    return bool(status and (status == 429 or status >= 500))
+
+
+@contextmanager
+def limited(model: str, estimated_tokens: int = 0):
+    """Hold a cluster-wide rate-limit slot for one OpenAI call.
+
+    Callers may settle the lease with the real token usage; otherwise a clean exit
+    counts as success and an overload error as a throttle signal.
+    """
+    with openai_limiter.acquire(model, estimated_tokens) as lease:
+        try:
+            yield lease
+        except Exception as e:
+            if _is_overload(e):
+                lease.overloaded()
+            raise
+        if not lease.outcome_reported:
+            lease.settle()
+
+
+def _is_retryable(e: Exception) -> bool:
+    return _is_overload(e) or isinstance(e, openai.APIConnectionError)
+
+
+def call_openai(model: str, estimated_tokens: int, create):
+    """Run create(timeout) under the rate limiter, the openai circuit breaker and retry policy.
+
+    Each attempt holds its own rate-limit lease, settled with the response usage.
+    Raises resilience.ProviderUnavailable once retries or the deadline are spent.
+    """
+    def attempt(timeout: float):
+        with limited(model, estimated_tokens) as lease:
+            response = create(timeout)
+            usage = getattr(response, 'usage', None)
+            lease.settle(getattr(usage, 'total_tokens', None))
+            return response
+    return resilience.call('openai', attempt, is_retryable=_is_retryable)
+
+
+def _estimate_tokens(messages, completion_reserve: int | None = None) -> int:
+    prompt = sum(num_tokens(m.get('content') or '') for m in messages if isinstance(m.get('content'), str))
+    return prompt + (completion_reserve or config.openai_completion_reserve)
+
+
+def _route_kwargs(route: model_routing.Route) -> dict:
+    kwargs = {}
+    if route.reasoning_effort:
+        kwargs['reasoning_effort'] = route.reasoning_effort
+    if route.max_output_tokens:
+        kwargs['max_completion_tokens'] = route.max_output_tokens
+    return kwargs
+
+
+def _log_usage(user: User | None, prompt: str | None, route: model_routing.Route, started: float, usage):
+    """Record route latency/cost and debit the user's credits for one completion."""
+    prompts = getattr(usage, 'prompt_tokens', 0) or 0
+    completion = getattr(usage, 'completion_tokens', 0) or 0
+    cost = CreditLedger.calculate_cost(prompts/1000, completion/1000, route.model)
+    model_routing.record(prompt, route, time.monotonic() - started, prompts, completion, cost)
+    if usage and user and getattr(user, 'id', None):
+        CreditLedger.create(user.id, 0, cost, route.model)
 
 
 def generate_job_description(user:User, title, short_description):
@@ -38,79 +121,219 @@ Reply in following json format:
     response = get_reply_json(user, system_content, '')
     return response['content']
 
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str = 'gpt-4'):
+    """Return a cached tiktoken encoding for the model.
+
+    Building an encoding is expensive, so it is done once per model per process.
+    Models unknown to the installed tiktoken fall back to cl100k_base.
+    """
+    try:
+        return tiktoken.model.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
 def num_tokens(string: str, model_name: str = 'gpt-4') -> int:
     """Returns the number of tokens in a text string."""
-    encoding = tiktoken.model.encoding_for_model(model_name)
+    encoding = get_encoding(model_name)
     num_tokens = len(encoding.encode(string))
     return num_tokens
 
-def _extract_outer_brackets(text, startChar, endChar):
-    bracket_stack = []
-    matches = []
+_json_decoder = json.JSONDecoder()
 
-    for index, char in enumerate(text):
-        if char == startChar:
-            bracket_stack.append(index)
-        elif char == endChar:
-            if not bracket_stack:
-                continue
-            start = bracket_stack.pop()
-            if not bracket_stack:
-                matches.append(text[start:index + 1])
+_JSON_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+}
 
-    return matches
+def _parse_json(content: str, bracket_start='{'):
+    """Parse a JSON value from a completion.
+
+    Structured-output replies are pure JSON and parse directly. Free-form replies
+    are decoded with raw_decode from the first opening bracket, which stops at the
+    end of the value instead of scanning the whole text.
+    """
+    text = (content or '').strip()
+    try:
+        value = orjson.loads(text) if orjson is not None else json.loads(text)
+        if isinstance(value, (dict, list)):
+            return value
+    except ValueError:
+        pass
+    idx = text.find(bracket_start)
+    while idx != -1:
+        try:
+            value, _ = _json_decoder.raw_decode(text, idx)
+            return value
+        except ValueError:
+            idx = text.find(bracket_start, idx + 1)
+    raise ValueError("Error parsing json response")
+
+def _validate(value, schema: dict, path: str = '$'):
+    """Check a parsed value against the subset of JSON schema used by our prompts.
+
+    Supports type, properties, required and items. Raises ValueError describing
+    the first mismatch.
+    """
+    expected = schema.get('type')
+    if expected:
+        py_type = _JSON_TYPES.get(expected)
+        if py_type and (not isinstance(value, py_type) or (expected in ('integer', 'number') and isinstance(value, bool))):
+            raise ValueError(f"{path}: expected {expected}")
+    if isinstance(value, dict):
+        for key in schema.get('required') or []:
+            if key not in value:
+                raise ValueError(f"{path}: missing required key '{key}'")
+        for key, sub in (schema.get('properties') or {}).items():
+            if key in value and value[key] is not None:
+                _validate(value[key], sub, f"{path}.{key}")
+    elif isinstance(value, list) and schema.get('items'):
+        for i, item in enumerate(value):
+            _validate(item, schema['items'], f"{path}[{i}]")
+
+def _response_format(schema: dict, schema_name: str | None = None):
+    return {
+        'type': 'json_schema',
+        'json_schema': {
+            'name': schema_name or 'response',
+            'schema': schema,
+            'strict': True,
+        },
+    }
 
 # @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(4))
-def get_reply_json(user: User | None, system_content, user_msg, additional_messages=None, bracket_start='{', bracket_end='}'):
+def get_reply_json(user: User | None, system_content, user_msg, additional_messages=None, bracket_start='{', bracket_end='}', schema: dict | None = None, schema_name: str | None = None, prompt: str | None = None, hedge: bool = False, tier: str | None = None):
+  """Get a completion and parse it as JSON.
+
+  When a schema is given the provider's structured-output mode is requested and
+  the parsed value is validated against it. A parse or validation failure gets a
+  single repair attempt that shows the model its reply and the error.
+  `prompt`, `hedge` and `tier` are passed through to get_reply.
+  """
+  response_format = _response_format(schema, schema_name) if schema else None
   try:
-    content = get_reply(user, system_content, user_msg, additional_messages)
+    content = get_reply(user, system_content, user_msg, additional_messages, response_format=response_format, prompt=prompt, hedge=hedge, tier=tier)
   except Exception as e:
     logger.exception(e)
     raise e
-  json_match = _extract_outer_brackets(content, bracket_start, bracket_end)
-  if len(json_match) == 0:
+  try:
+    response = _parse_json(content, bracket_start)
+    if schema:
+      _validate(response, schema)
+    return response
+  except ValueError as e:
     logger.info(content)
-    raise Exception("Error parsing json response")
+    error = str(e)
+  repair_messages = list(additional_messages or []) + [
+    {"role": "assistant", "content": content or ''},
+    {"role": "user", "content": f"Your reply was invalid: {error}. Reply again with only the corrected JSON."},
+  ]
+  content = get_reply(user, system_content, user_msg, repair_messages, response_format=response_format, prompt=prompt, hedge=hedge, tier=tier)
   try:
-    response = json.loads(json_match[0])
+    response = _parse_json(content, bracket_start)
+    if schema:
+      _validate(response, schema)
     return response
-  except Exception as e:
+  except ValueError as e:
     logger.info(content)
-    raise e
+    raise Exception(f"Error parsing json response: {e}")
+
+def get_reply(user: User | None, system_content, user_msg, additional_messages=None, response_format=None, prompt: str | None = None, hedge: bool = False, tier: str | None = None):
+    """Get a chat completion's text.
 
-def get_reply(user: User | None, system_content, user_msg, additional_messages=None):
-    model = 'gpt-5-mini'
+    The model, reasoning effort and output cap come from the routing table for
+    `prompt` and the caller's plan `tier` (see model_routing.resolve). With `hedge`
+    set, the call is raced against a duplicate request once it outlasts the
+    prompt's observed p90 (see hedging.call).
+    """
+    route = model_routing.resolve(prompt, tier)
     messages = [
         {"role": "system", "content": system_content},
         {"role": "user", "content": user_msg},
     ]
     if additional_messages:
         messages += additional_messages
-    response = openai_client.chat.completions.create(
-        model=model,
-        messages=messages
-    )
-    if response.usage and user and getattr(user, 'id', None):
-        prompts = response.usage.prompt_tokens
-        completion = response.usage.completion_tokens
-        cost = CreditLedger.calculate_cost(prompts/1000, completion/1000, model)
-        CreditLedger.create(user.id, 0, cost, model)
+    kwargs = _route_kwargs(route)
+    if response_format:
+        kwargs['response_format'] = response_format
+    def complete():
+        return call_openai(route.model, _estimate_tokens(messages, route.max_output_tokens), lambda timeout: openai_client.chat.completions.create(
+            model=route.model,
+            messages=messages,
+            timeout=timeout,
+            **kwargs
+        ))
+    started = time.monotonic()
+    if hedge and prompt and config.enable_hedging:
+        response = hedging.call(prompt, complete)
+    else:
+        response = complete()
+    _log_usage(user, prompt, route, started, response.usage)
 
     return response.choices[0].message.content
 
 
+def stream_reply(user: User | None, system_content, user_msg, additional_messages=None, prompt: str | None = None, tier: str | None = None):
+    """Stream a chat completion, yielding text deltas as they arrive.
+
+    Routed like get_reply. Usage is requested in the final chunk so credits are
+    logged the same way.
+    """
+    route = model_routing.resolve(prompt, tier)
+    messages = [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": user_msg},
+    ]
+    if additional_messages:
+        messages += additional_messages
+    usage = None
+    started = time.monotonic()
+    with limited(route.model, _estimate_tokens(messages, route.max_output_tokens)) as lease:
+        def open_stream(timeout: float):
+            try:
+                return openai_client.chat.completions.create(
+                    model=route.model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    timeout=timeout,
+                    **_route_kwargs(route),
+                )
+            except Exception as e:
+                if _is_overload(e):
+                    lease.overloaded()
+                raise
+        # Only opening the stream is retried; a failure mid-stream cannot be replayed
+        stream = resilience.call('openai', open_stream, is_retryable=_is_retryable)
+        for chunk in stream:
+            if getattr(chunk, 'usage', None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+        lease.settle(usage.total_tokens if usage else None)
+    _log_usage(user, prompt, route, started, usage)
+
+
 def generate_image_base64(prompt: str, size: str = '1024x1024') -> str:
     """Generate an image with OpenAI image model and return base64 PNG string.
 
     Uses gpt-image-1 per product spec. May raise on failure.
     """
     try:
-        res = openai_client.images.generate(
+        res = call_openai('gpt-image-1', num_tokens(prompt), lambda timeout: openai_client.images.generate(
             model='gpt-image-1',
             prompt=prompt,
             size=size,
             quality="high",
-        )
+            timeout=timeout,
+        ))
         data = res.data[0].b64_json if getattr(res, 'data', None) else None
         if not data:
             raise RuntimeError('No image data returned')
@@ -0,0 +1,72 @@
+from __future__ import annotations
+import os
+import zlib
+from typing import Any, Optional, Tuple
+import msgpack
+import config
+from config import logger
+
+try:
+    import zstandard
+except ImportError:  # declared dependency; zlib keeps payloads writable where it is missing
+    zstandard = None
+
+# Codec names stored with each payload so either can be read back whatever is installed now
+CODEC_ZSTD = 'msgpack+zstd'
+CODEC_ZLIB = 'msgpack+zlib'
+
+
+def _pack(obj: Any) -> bytes:
+    # Anything msgpack cannot represent (dates, dataclasses without to_dict) is stored as its str()
+    return msgpack.packb(obj, use_bin_type=True, default=lambda o: o.to_dict() if hasattr(o, 'to_dict') else str(o))
+
+
+def encode(obj: Any) -> Tuple[str, bytes]:
+    raw = _pack(obj)
+    if zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=6).compress(raw)
+    return CODEC_ZLIB, zlib.compress(raw, 6)
+
+
+def decode(codec: str, data: bytes) -> Any:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read this payload')
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == CODEC_ZLIB:
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"Unknown payload codec {codec!r}")
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+def spill_path(report_id: str, step_id: str) -> str:
+    """Relative path (under config.step_payload_dir) of a spilled payload."""
+    return os.path.join(report_id, f"{step_id}.bin")
+
+
+def write_file(rel_path: str, data: bytes):
+    dest = os.path.join(config.step_payload_dir, rel_path)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, dest)
+
+
+def read_file(rel_path: str) -> Optional[bytes]:
+    """A spilled payload's bytes, or None if the file is not under config.step_payload_dir on this host."""
+    path = os.path.join(config.step_payload_dir, rel_path)
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        logger.warning(f"Spilled step payload {path} not found; is STEP_PAYLOAD_DIR shared with the workers?")
+        return None
+
+
+def delete_file(rel_path: str):
+    try:
+        os.remove(os.path.join(config.step_payload_dir, rel_path))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,92 @@
+"""Pipeline profiles: how much generate_report fetches and writes per report.
+
+Guests get the 'guest' profile, signed-in users the profile named after their
+plan. A report remembers the profile it was generated with; when its owner
+later has a heavier one, workers.topup_report adds the difference instead of
+regenerating the report.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class PipelineProfile:
+    name: str
+    # Sources: trending topics, prospect (group1) and expanded (group2) keywords, Medium tags, tech news
+    topics: int
+    g1_keywords: int
+    g2_keywords: int
+    medium_tags: int
+    tech_news: int
+    # SerpAPI autocomplete expansion of group2 (plus an LLM filter call)
+    expand_keywords: bool
+    # Suggestions requested per source
+    memes_per_topic: int
+    slops_per_topic: int
+    tweets_per_topic: int
+    replies_per_topic: int
+    memes_per_news: int
+    slops_per_news: int
+    tweets_per_news: int
+    headlines_per_keyword: int
+    replies_per_g1_keyword: int
+    replies_per_g2_keyword: int
+    headlines_per_tag: int
+    # Stop once visibility_cutoff + buffer suggestions are stored (None: no cap)
+    buffer: Optional[int] = None
+
+
+PROFILES = {
+    # Guests see visibility_cutoff suggestions; generate those plus a small buffer for dedupe losses
+    'guest': PipelineProfile(
+        name='guest', topics=1, g1_keywords=0, g2_keywords=1, medium_tags=0, tech_news=1, expand_keywords=False,
+        memes_per_topic=1, slops_per_topic=1, tweets_per_topic=2, replies_per_topic=1,
+        memes_per_news=0, slops_per_news=0, tweets_per_news=1,
+        headlines_per_keyword=1, replies_per_g1_keyword=0, replies_per_g2_keyword=0, headlines_per_tag=0,
+        buffer=3,
+    ),
+    'free': PipelineProfile(
+        name='free', topics=2, g1_keywords=1, g2_keywords=2, medium_tags=1, tech_news=2, expand_keywords=True,
+        memes_per_topic=2, slops_per_topic=1, tweets_per_topic=2, replies_per_topic=2,
+        memes_per_news=1, slops_per_news=1, tweets_per_news=2,
+        headlines_per_keyword=2, replies_per_g1_keyword=3, replies_per_g2_keyword=2, headlines_per_tag=2,
+    ),
+    # The full pipeline as it ran before profiles existed
+    'pro': PipelineProfile(
+        name='pro', topics=2, g1_keywords=2, g2_keywords=2, medium_tags=2, tech_news=2, expand_keywords=True,
+        memes_per_topic=4, slops_per_topic=3, tweets_per_topic=2, replies_per_topic=2,
+        memes_per_news=3, slops_per_news=3, tweets_per_news=2,
+        headlines_per_keyword=2, replies_per_g1_keyword=5, replies_per_g2_keyword=4, headlines_per_tag=2,
+    ),
+    'advanced': PipelineProfile(
+        name='advanced', topics=3, g1_keywords=2, g2_keywords=3, medium_tags=2, tech_news=3, expand_keywords=True,
+        memes_per_topic=4, slops_per_topic=3, tweets_per_topic=2, replies_per_topic=2,
+        memes_per_news=3, slops_per_news=3, tweets_per_news=2,
+        headlines_per_keyword=2, replies_per_g1_keyword=5, replies_per_g2_keyword=4, headlines_per_tag=2,
+    ),
+}
+# Lightest first; a report is topped up when its owner's profile comes later
+PROFILE_ORDER = ('guest', 'free', 'pro', 'advanced')
+
+
+def get_profile(name: Optional[str]) -> PipelineProfile:
+    """The named profile; reports created before profiles existed ran the 'pro' pipeline."""
+    return PROFILES.get(name or 'pro', PROFILES['pro'])
+
+
+def profile_name_for(user_id: Optional[str], plan_id: Optional[str] = None) -> str:
+    """'guest' without a user, else the profile of the user's plan (pass plan_id to skip the lookup)."""
+    if not user_id:
+        return 'guest'
+    if plan_id is None:
+        from plans import plan_id_for_user
+        plan_id = plan_id_for_user(user_id)
+    return plan_id if plan_id in PROFILES else 'free'
+
+
+def needs_topup(current: Optional[str], target: str) -> bool:
+    """Whether `target` generates more than `current`, the profile a report was generated with."""
+    if not current or current not in PROFILE_ORDER or target not in PROFILE_ORDER:
+        return False
+    return PROFILE_ORDER.index(target) > PROFILE_ORDER.index(current)
@@ -15,6 +15,7 @@ PLANS = [
             'articles_per_day': 1,
             'videos_per_day': 0,
             'guest_visibility_cutoff': 5,
+            'report_retention_days': 30,  # older reports are archived (see retention)
         },
     },
     {
@@ -27,6 +28,7 @@ PLANS = [
             'articles_per_day': 10,
             'videos_per_day': 2,
             'guest_visibility_cutoff': 5,
+            'report_retention_days': 180,
         },
     },
     {
@@ -39,6 +41,7 @@ PLANS = [
             'articles_per_day': -1,
             'videos_per_day': 10,
             'guest_visibility_cutoff': 5,
+            'report_retention_days': 365,
         },
     },
 ]
@@ -46,3 +49,16 @@ PLANS = [
 
 def get_plans():
     return PLANS
+
+
+def plan_id_for_user(user_id: str) -> str:
+    """Plan id from the user's latest stored subscription ('free' if none is current).
+
+    Unlike the quota helpers this does not sync the subscription with Stripe, so it
+    is cheap enough to call from workers.
+    """
+    from models.subscription import UserSubscription
+    sub = UserSubscription.query.filter_by(user_id=user_id).order_by(UserSubscription.current_period_end.desc()).first()
+    if sub and sub.status in ('active', 'trialing', 'past_due') and any(p['id'] == sub.plan_id for p in PLANS):
+        return sub.plan_id
+    return 'free'
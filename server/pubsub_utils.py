@@ -0,0 +1,67 @@
+from __future__ import annotations
+import json
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional
+from cache import cache_store
+from config import logger
+
+
+def job_channel(kind: str, job_id: str) -> str:
+    """Channel carrying status changes of one meme/slop/article job."""
+    return f"job_status:{kind}:{job_id}"
+
+
+def publish(channel: str, data: dict):
+    """Publish a JSON message; failures are logged, never raised into the caller."""
+    try:
+        cache_store.publish(channel, json.dumps(data))
+    except Exception as e:
+        logger.error(f"Publish to {channel} failed: {e}")
+
+
+def publish_job_status(kind: str, job_id: str, status: str, error: Optional[str] = None):
+    publish(job_channel(kind, job_id), {'kind': kind, 'id': job_id, 'status': status, 'error': error})
+
+
+@contextmanager
+def subscription(channels: Iterable[str]):
+    """Subscribe to channels for the duration of the block.
+
+    Subscribe before reading the state you wait on, so a change committed in
+    between is not missed.
+    """
+    ps = cache_store.pubsub(ignore_subscribe_messages=True)
+    ps.subscribe(*channels)
+    try:
+        yield ps
+    finally:
+        try:
+            ps.close()
+        except Exception:
+            pass
+
+
+def next_message(ps, timeout: float) -> Optional[dict]:
+    """The next decoded message on ps, or None once timeout seconds have passed."""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        msg = ps.get_message(timeout=remaining)
+        if not msg or msg.get('type') != 'message':
+            continue
+        try:
+            return json.loads(msg['data'])
+        except ValueError:
+            logger.warning(f"Ignoring malformed message on {msg.get('channel')}")
+
+
+def feed_channel(report_id: str) -> str:
+    """Channel carrying step, suggestion and status deltas of one report run."""
+    return f"feed_events:{report_id}"
+
+
+def publish_feed_event(report_id: str, event: str, data: dict):
+    publish(feed_channel(report_id), {'event': event, 'data': data})
@@ -0,0 +1,170 @@
+"""SQL capture and EXPLAIN checks for hot query paths.
+
+Run with `flask check_query_plans` against a migrated database (SQLite,
+Postgres or MySQL). Each hot path is executed under a QueryRecorder; the
+statements it issued are counted against a budget and EXPLAINed to confirm
+the expected composite index is used. On Postgres the EXPLAIN runs with
+enable_seqscan off, so near-empty tables still show whether the index is
+usable. MySQL may still prefer a scan on near-empty tables; check it against
+a copy with representative data.
+
+The hot paths are a fixed set of probes for the queries behind the busiest
+endpoints and workers (see _hot_paths), not a sweep of every endpoint.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import event, inspect
+from models.db_utils import db
+
+
+class QueryRecorder:
+    """Records every statement the engine executes while active."""
+
+    def __init__(self, engine=None):
+        self.engine = engine or db.engine
+        self.statements: List[Tuple[str, object]] = []
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __enter__(self) -> 'QueryRecorder':
+        event.listen(self.engine, 'before_cursor_execute', self._before_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_execute)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def matching(self, verb: str) -> List[Tuple[str, object]]:
+        return [(s, p) for s, p in self.statements if s.lstrip().upper().startswith(verb.upper())]
+
+
+@contextmanager
+def record_queries():
+    with QueryRecorder() as rec:
+        yield rec
+
+
+def explain(statement: str, parameters=None) -> str:
+    """The database's plan for a captured statement, as one lowercase string."""
+    dialect = db.engine.dialect.name
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    with db.engine.connect() as conn:
+        if dialect == 'postgresql':
+            # The planner picks Seq Scan on small tables even with the index present
+            conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        rows = conn.exec_driver_sql(prefix + statement, parameters if parameters is not None else ()).fetchall()
+    return '\n'.join(' '.join(str(v) for v in row) for row in rows).lower()
+
+
+@dataclass
+class HotPath:
+    name: str
+    run: Callable[[], object]
+    # Index the path's SELECT must use (None: only the budget is checked)
+    index: Optional[str] = None
+    # Most statements the path may issue
+    max_queries: int = 1
+    # Statement kinds the path must not issue (e.g. UPDATE on a no-op path)
+    forbidden: Tuple[str, ...] = ()
+    # Runs before recording starts, to put caches in the state the path expects
+    setup: Optional[Callable[[], object]] = None
+
+
+@dataclass
+class HotPathResult:
+    name: str
+    queries: int
+    ok: bool
+    problems: List[str] = field(default_factory=list)
+    plans: List[str] = field(default_factory=list)
+
+
+def _hot_paths() -> List[HotPath]:
+    from models.report import Report
+    from models.subscription import UsageQuota
+    from models.credit_ledger import CreditLedger
+    from email_utils import _find_top_suggestion
+    from views_reports import _job_statuses
+    import guest_merge
+
+    probe = '00000000-query-audit'
+
+    def latest_report_for_product():
+        return Report.query.filter_by(product_id=probe).order_by(Report.created_on.desc()).first()
+
+    def latest_complete_report_for_user():
+        return (Report.query
+                .filter(Report.user_id == probe, Report.status.in_(['complete', 'partial_ready']))
+                .order_by(Report.created_on.desc())
+                .first())
+
+    def usage_quota_for_today():
+        return UsageQuota.query.filter_by(user_id=probe, date=date.today()).first()
+
+    def monthly_debit():
+        start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        return (db.session.query(db.func.sum(CreditLedger.debit)).filter_by(user_id=probe)
+                .filter(CreditLedger.created_on >= start).scalar())
+
+    def batch_job_status():
+        ids = [f"{probe}-{i}" for i in range(20)]
+        return _job_statuses({'memes': ids, 'slops': ids, 'articles': ids}, probe, None)
+
+    def merge_probe_guest():
+        return guest_merge.merge_guest_into_user(probe, probe)
+
+    return [
+        HotPath('top_suggestion_by_kind', lambda: _find_top_suggestion(probe, 'tweet'), 'ix_suggestions_report_kind_rank'),
+        HotPath('latest_report_for_product', latest_report_for_product, 'ix_reports_product_created'),
+        HotPath('latest_report_for_user', latest_complete_report_for_user, 'ix_reports_user_status_created'),
+        HotPath('usage_quota_for_today', usage_quota_for_today, 'ix_usage_quotas_user_date'),
+        HotPath('monthly_credit_debit', monthly_debit, 'ix_credit_ledger_user_created'),
+        HotPath('batch_job_status', batch_job_status, max_queries=3),
+        # The second merge must be answered by the Redis marker alone
+        HotPath('repeat_guest_merge', merge_probe_guest, max_queries=0, forbidden=('UPDATE',), setup=merge_probe_guest),
+    ]
+
+
+def check_hot_paths() -> List[HotPathResult]:
+    """Run every hot path, then check its query budget and, where set, its index usage."""
+    results = []
+    for path in _hot_paths():
+        if path.setup:
+            path.setup()
+        with record_queries() as rec:
+            path.run()
+        db.session.rollback()
+        problems = []
+        if rec.count > path.max_queries:
+            problems.append(f"{rec.count} queries (budget {path.max_queries})")
+        for verb in path.forbidden:
+            if rec.matching(verb):
+                problems.append(f"issued {verb}")
+        plans = []
+        if path.index:
+            selects = rec.matching('SELECT')
+            plans = [explain(s, p) for s, p in selects]
+            if not any(path.index.lower() in plan for plan in plans):
+                problems.append(f"{path.index} not used")
+        results.append(HotPathResult(path.name, rec.count, not problems, problems, plans))
+    return results
+
+
+def index_names() -> List[str]:
+    """Names of the composite indexes the hot paths expect, for checking a database was migrated."""
+    return [p.index for p in _hot_paths() if p.index]
+
+
+def missing_indexes() -> List[str]:
+    inspector = inspect(db.engine)
+    present = set()
+    for table in ('suggestions', 'reports', 'usage_quotas', 'credit_ledger'):
+        present.update(ix['name'] for ix in inspector.get_indexes(table))
+    return [name for name in index_names() if name not in present]
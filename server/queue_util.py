@@ -2,11 +2,125 @@ from rq import Queue, Retry
 from cache import cache_store
 from rq.command import send_stop_job_command
 from config import logger
+import config
 from functools import wraps
-from rq.job import JobStatus
+from rq.job import Job, JobStatus
+from rq.exceptions import NoSuchJobError
+from hashlib import sha256
+import json
+import time
 
 q = Queue(name='content_dreamer', connection=cache_store)
 
+# Dedicated queues per job class so long renders never sit in front of quick jobs
+REPORTS_QUEUE = 'reports'
+MEDIA_FAST_QUEUE = 'media_fast'
+MEDIA_VIDEO_QUEUE = 'media_video'
+
+queues = {
+    name: Queue(name=name, connection=cache_store)
+    for name in (REPORTS_QUEUE, MEDIA_FAST_QUEUE, MEDIA_VIDEO_QUEUE)
+}
+queues[q.name] = q
+
+# Routing table: job function -> queue and timeout
+JOB_ROUTES = {
+    'workers.generate_report': {'queue': REPORTS_QUEUE, 'timeout': '30m'},
+    'workers.topup_report': {'queue': REPORTS_QUEUE, 'timeout': '30m'},
+    'workers.generate_article': {'queue': MEDIA_FAST_QUEUE, 'timeout': '15m'},
+    'workers.generate_meme': {'queue': MEDIA_FAST_QUEUE, 'timeout': '10m'},
+    'workers.generate_slop': {'queue': MEDIA_VIDEO_QUEUE, 'timeout': '30m'},
+    'workers.refresh_medium_tags': {'queue': REPORTS_QUEUE, 'timeout': '20m'},
+}
+
+# Queues each worker pool listens on, in priority order. Every pool drains its own
+# queue first; spare report/video capacity picks up quick media jobs, but the
+# media_fast pool never takes a long job.
+WORKER_POOLS = {
+    REPORTS_QUEUE: [REPORTS_QUEUE, MEDIA_FAST_QUEUE, q.name],
+    MEDIA_FAST_QUEUE: [MEDIA_FAST_QUEUE],
+    MEDIA_VIDEO_QUEUE: [MEDIA_VIDEO_QUEUE, MEDIA_FAST_QUEUE],
+}
+
+def enqueue_job(func_path: str, *args, job_id: str | None = None):
+    """Enqueue a worker function on the queue its job class is routed to."""
+    route = JOB_ROUTES.get(func_path, {'queue': q.name, 'timeout': '20m'})
+    queue = queues[route['queue']]
+    return queue.enqueue(func_path, *args, job_timeout=route['timeout'], job_id=job_id)
+
+PENDING_JOB_STATUSES = [JobStatus.STARTED, JobStatus.QUEUED, JobStatus.SCHEDULED, JobStatus.DEFERRED]
+
+def job_is_pending(job_id: str | None) -> bool:
+    if not job_id:
+        return False
+    try:
+        job = Job.fetch(job_id, connection=cache_store)
+    except NoSuchJobError:
+        return False
+    return job.get_status() in PENDING_JOB_STATUSES
+
+# How long a submission is remembered, how long a claim may be held while the
+# rows are created, and how long a duplicate waits for that claim to resolve
+IDEMPOTENCY_TTL = 60 * 60
+IDEMPOTENCY_CLAIM_TTL = 30
+IDEMPOTENCY_WAIT_SECONDS = 3
+
+class IdempotentSubmission:
+    """Redis-backed guard that turns repeated job submissions into one job.
+
+    With a client Idempotency-Key the stored response is replayed for the whole TTL.
+    Without one, a deterministic key built from the request is used and the stored
+    response is only replayed while its job is still pending, so a genuine re-run
+    after completion goes through.
+    """
+    def __init__(self, scope: str, principal: str | None, client_key: str | None = None, fallback: tuple = ()):
+        self.explicit = bool(client_key)
+        raw = client_key if client_key else json.dumps([str(p) for p in fallback])
+        digest = sha256(raw.encode('utf-8')).hexdigest()
+        self.key = f"idem:{scope}:{principal or 'anon'}:{'h' if self.explicit else 'f'}:{digest}"
+
+    def _load(self):
+        raw = cache_store.get(self.key)
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def existing(self):
+        """Return the stored response for a duplicate submission, or None."""
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            rec = self._load()
+            if rec is None:
+                return None
+            if rec.get('state') == 'done':
+                if self.explicit or job_is_pending(rec.get('job_id')):
+                    return rec.get('response')
+                cache_store.delete(self.key)
+                return None
+            # Another request holds the claim; give it a moment to finish
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.1)
+
+    def claim(self) -> bool:
+        return bool(cache_store.set(self.key, json.dumps({'state': 'claimed'}), nx=True, ex=IDEMPOTENCY_CLAIM_TTL))
+
+    def complete(self, response: dict, job_id: str):
+        cache_store.set(self.key, json.dumps({'state': 'done', 'response': response, 'job_id': job_id}), ex=IDEMPOTENCY_TTL)
+
+    def release(self):
+        cache_store.delete(self.key)
+
+def pool_args(pool: str) -> str:
+    """Arguments for `rq worker-pool` for the named pool (used by worker.sh)."""
+    if pool not in WORKER_POOLS:
+        raise ValueError(f"Unknown worker pool '{pool}'")
+    size = config.worker_pool_sizes.get(pool, 1)
+    return " ".join(WORKER_POOLS[pool] + ['-n', str(size)])
+
 def _handle_message(user_id):
     from app import create_app
     app = create_app()
@@ -59,7 +173,7 @@ class AsJob:
         q.enqueue(self.f, args=self.args, kwargs=self.kwargs, job_timeout=timeout, job_id=self.job_id, retry=Retry(max=3))
     
     def is_pending(self):
-        return self.get_status() in [JobStatus.STARTED, JobStatus.QUEUED, JobStatus.SCHEDULED]
+        return self.get_status() in PENDING_JOB_STATUSES
 
     def is_failed(self):
         if not self.get_status():
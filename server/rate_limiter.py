@@ -0,0 +1,192 @@
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from uuid import uuid4
+from cache import cache_store
+from config import logger
+
+# Refill both buckets for elapsed time and take one request plus `need` tokens if
+# available. Returns "0" on success or the seconds to wait as a string (Lua numbers
+# would be truncated to integers on the way back).
+_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rcap = tonumber(ARGV[1])
+local tcap = tonumber(ARGV[2])
+local need = math.min(tonumber(ARGV[3]), tcap)
+local function level(key, cap)
+  local b = redis.call('HMGET', key, 'level', 'ts')
+  local lv = tonumber(b[1]) or cap
+  local ts = tonumber(b[2]) or now
+  return math.min(cap, lv + (now - ts) * cap / 60.0)
+end
+local r = level(KEYS[1], rcap)
+local k = level(KEYS[2], tcap)
+local wait = 0
+if r < 1 then wait = math.max(wait, (1 - r) * 60.0 / rcap) end
+if k < need then wait = math.max(wait, (need - k) * 60.0 / tcap) end
+if wait == 0 then
+  r = r - 1
+  k = k - need
+end
+redis.call('HSET', KEYS[1], 'level', tostring(r), 'ts', tostring(now))
+redis.call('HSET', KEYS[2], 'level', tostring(k), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 300)
+redis.call('EXPIRE', KEYS[2], 300)
+return tostring(wait)
+"""
+
+# Distributed semaphore: drop expired leases, then admit if below the current limit.
+_LEASE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local limit = math.floor(tonumber(redis.call('GET', KEYS[2]) or ARGV[1]))
+if limit < 1 then limit = 1 end
+if redis.call('ZCARD', KEYS[1]) < limit then
+  redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+  redis.call('EXPIRE', KEYS[1], 3600)
+  return 1
+end
+return 0
+"""
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+class Lease:
+    """A held rate-limit slot. Report the outcome with settle() or overloaded()."""
+
+    def __init__(self, limiter: 'RateLimiter', model: str, lease_id: str, estimated_tokens: int):
+        self.limiter = limiter
+        self.model = model
+        self.lease_id = lease_id
+        self.estimated_tokens = estimated_tokens
+        self.outcome_reported = False
+
+    def settle(self, actual_tokens: Optional[int] = None):
+        """Mark the call successful and refund/charge the token estimate difference."""
+        self.outcome_reported = True
+        self.limiter._on_success(self.model, self.estimated_tokens, actual_tokens)
+
+    def overloaded(self):
+        """Mark the call as throttled by the provider (429/5xx)."""
+        self.outcome_reported = True
+        self.limiter._on_overload(self.model)
+
+
+class RateLimiter:
+    """Cluster-wide limiter shared through Redis by every web and worker process.
+
+    Each model gets two token buckets (requests/min and tokens/min) and a
+    concurrency limit adapted with AIMD: it grows by `increase` per limit's worth
+    of successful calls and is multiplied by `decrease` when the provider throttles.
+    Waiting time and throttle events are counted per model for stats().
+    """
+
+    def __init__(self, name: str, limits: Dict[str, dict], default_limits: dict,
+                 min_concurrency: int = 1, max_concurrency: int = 64, increase: float = 1.0,
+                 decrease: float = 0.5, lease_ttl: int = 600, max_wait: float = 300.0):
+        self.name = name
+        self.limits = limits
+        self.default_limits = default_limits
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        self.lease_ttl = lease_ttl
+        self.max_wait = max_wait
+        self._take = cache_store.register_script(_TAKE_SCRIPT)
+        self._lease = cache_store.register_script(_LEASE_SCRIPT)
+
+    def _key(self, model: str, part: str) -> str:
+        return f"ratelimit:{self.name}:{model}:{part}"
+
+    def _limits_for(self, model: str) -> dict:
+        return {**self.default_limits, **(self.limits.get(model) or {})}
+
+    def _concurrency(self, model: str) -> float:
+        raw = cache_store.get(self._key(model, 'limit'))
+        if raw is None:
+            return float(self._limits_for(model).get('concurrency', self.max_concurrency))
+        return float(raw)
+
+    @contextmanager
+    def acquire(self, model: str, estimated_tokens: int = 0):
+        """Block until the model has request, token and concurrency budget, then yield a Lease."""
+        limits = self._limits_for(model)
+        lease_id = uuid4().hex
+        stats_key = self._key(model, 'stats')
+        cache_store.sadd(f"ratelimit:{self.name}:models", model)
+        started = time.monotonic()
+        throttled = False
+        # Token buckets first, then a concurrency slot
+        while True:
+            wait = float(self._take(keys=[self._key(model, 'rpm'), self._key(model, 'tpm')],
+                                    args=[limits['rpm'], limits['tpm'], max(0, int(estimated_tokens))]))
+            if wait <= 0:
+                break
+            throttled = True
+            self._sleep(started, min(wait, 5.0), model)
+        while not self._lease(keys=[self._key(model, 'leases'), self._key(model, 'limit')],
+                              args=[limits.get('concurrency', self.max_concurrency), self.lease_ttl, lease_id]):
+            throttled = True
+            self._sleep(started, 0.2, model)
+        waited_ms = int((time.monotonic() - started) * 1000)
+        pipe = cache_store.pipeline()
+        pipe.hincrby(stats_key, 'requests', 1)
+        pipe.hincrby(stats_key, 'wait_ms_total', waited_ms)
+        if throttled:
+            pipe.hincrby(stats_key, 'throttled', 1)
+        pipe.execute()
+        lease = Lease(self, model, lease_id, estimated_tokens)
+        try:
+            yield lease
+        finally:
+            cache_store.zrem(self._key(model, 'leases'), lease_id)
+
+    def _sleep(self, started: float, seconds: float, model: str):
+        if time.monotonic() - started + seconds > self.max_wait:
+            cache_store.hincrby(self._key(model, 'stats'), 'timeouts', 1)
+            raise RateLimitTimeout(f"Rate limit wait for {model} exceeded {self.max_wait}s")
+        time.sleep(seconds)
+
+    def _on_success(self, model: str, estimated_tokens: int, actual_tokens: Optional[int]):
+        if actual_tokens is not None and actual_tokens != estimated_tokens:
+            # Positive difference refunds an overestimate, negative charges the shortfall
+            cache_store.hincrbyfloat(self._key(model, 'tpm'), 'level', estimated_tokens - actual_tokens)
+        current = self._concurrency(model)
+        ceiling = self._limits_for(model).get('concurrency', self.max_concurrency)
+        if current < ceiling:
+            cache_store.set(self._key(model, 'limit'), min(ceiling, current + self.increase / max(current, 1.0)))
+
+    def _on_overload(self, model: str):
+        stats_key = self._key(model, 'stats')
+        cache_store.hincrby(stats_key, 'overloaded', 1)
+        # Only back off once per cooldown window so a burst of 429s from calls that
+        # were already in flight does not collapse the limit to the floor
+        if cache_store.set(self._key(model, 'cooldown'), 1, nx=True, ex=2):
+            new_limit = max(float(self.min_concurrency), self._concurrency(model) * self.decrease)
+            cache_store.set(self._key(model, 'limit'), new_limit)
+            logger.warning(f"Rate limiter {self.name}:{model} backing off to concurrency {new_limit:.1f}")
+
+    def stats(self) -> Dict[str, dict]:
+        out = {}
+        for raw in cache_store.smembers(f"ratelimit:{self.name}:models"):
+            model = raw.decode() if isinstance(raw, bytes) else raw
+            counters = {
+                (k.decode() if isinstance(k, bytes) else k): int(v)
+                for k, v in cache_store.hgetall(self._key(model, 'stats')).items()
+            }
+            requests_ = counters.get('requests', 0)
+            out[model] = {
+                **counters,
+                'avg_wait_ms': (counters.get('wait_ms_total', 0) / requests_) if requests_ else 0,
+                'concurrency_limit': self._concurrency(model),
+                'in_flight': cache_store.zcard(self._key(model, 'leases')),
+                'limits': self._limits_for(model),
+            }
+        return out
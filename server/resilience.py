@@ -0,0 +1,192 @@
+from __future__ import annotations
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+import requests
+from cache import cache_store
+from config import logger
+
+
+class ProviderUnavailable(Exception):
+    """A provider could not serve the call: circuit open, deadline spent or retries exhausted."""
+
+    def __init__(self, provider: str, message: str):
+        super().__init__(message)
+        self.provider = provider
+
+
+class CircuitOpenError(ProviderUnavailable):
+    pass
+
+
+class RetryableStatus(Exception):
+    """An HTTP response that should be retried (429 or 5xx)."""
+
+    def __init__(self, response: requests.Response):
+        super().__init__(f"HTTP {response.status_code} from {response.url}")
+        self.response = response
+        self.status_code = response.status_code
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with state shared in Redis.
+
+    After `failure_threshold` failures in a row the circuit opens and calls fail
+    fast. Once `reset_timeout` seconds pass one probe call is let through
+    (half-open); its outcome closes or re-opens the circuit. If Redis itself is
+    unreachable the breaker lets calls through.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: int = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.key = f"breaker:{name}"
+
+    def _load(self) -> dict:
+        raw = cache_store.hgetall(self.key)
+        return {(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v) for k, v in raw.items()}
+
+    def state(self) -> str:
+        data = self._load()
+        if data.get('state') != 'open':
+            return 'closed'
+        if time.time() - float(data.get('opened_at') or 0) >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        try:
+            st = self.state()
+            if st == 'closed':
+                return True
+            if st == 'half_open':
+                # Only one process gets to probe the provider per reset window
+                return bool(cache_store.set(f"{self.key}:probe", 1, nx=True, ex=self.reset_timeout))
+            return False
+        except Exception as e:
+            logger.error(f"Circuit breaker {self.name} unavailable: {e}")
+            return True
+
+    def record_success(self):
+        try:
+            if self._load().get('failures', '0') != '0' or self.state() != 'closed':
+                pipe = cache_store.pipeline()
+                pipe.hset(self.key, mapping={'state': 'closed', 'failures': 0})
+                pipe.delete(f"{self.key}:probe")
+                pipe.execute()
+        except Exception as e:
+            logger.error(f"Circuit breaker {self.name} unavailable: {e}")
+
+    def record_failure(self):
+        try:
+            failures = cache_store.hincrby(self.key, 'failures', 1)
+            if self.state() == 'half_open' or failures >= self.failure_threshold:
+                pipe = cache_store.pipeline()
+                pipe.hset(self.key, mapping={'state': 'open', 'opened_at': time.time()})
+                pipe.hincrby(self.key, 'trips', 1)
+                pipe.delete(f"{self.key}:probe")
+                pipe.execute()
+                logger.warning(f"Circuit breaker {self.name} opened after {failures} failures")
+        except Exception as e:
+            logger.error(f"Circuit breaker {self.name} unavailable: {e}")
+
+    def reset(self):
+        cache_store.delete(self.key, f"{self.key}:probe")
+
+    def snapshot(self) -> dict:
+        data = self._load()
+        return {
+            'state': self.state(),
+            'failures': int(data.get('failures') or 0),
+            'trips': int(data.get('trips') or 0),
+            'opened_at': float(data['opened_at']) if data.get('opened_at') else None,
+            'failure_threshold': self.failure_threshold,
+            'reset_timeout': self.reset_timeout,
+        }
+
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential retry bounded by a per-call deadline.
+
+    `attempt_timeout` caps each attempt and `deadline` caps the whole call,
+    including backoff sleeps.
+    """
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    attempt_timeout: float = 20.0
+    deadline: float = 45.0
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter: uniform between zero and the exponential cap
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def _default_retryable(e: Exception) -> bool:
+    return isinstance(e, (RetryableStatus, requests.ConnectionError, requests.Timeout))
+
+
+PROVIDERS: Dict[str, tuple] = {
+    'twitter': (CircuitBreaker('twitter'), RetryPolicy(attempts=2, attempt_timeout=15, deadline=30)),
+    'medium': (CircuitBreaker('medium'), RetryPolicy(attempts=2, attempt_timeout=15, deadline=30)),
+    'serpapi': (CircuitBreaker('serpapi'), RetryPolicy(attempts=3, attempt_timeout=10, deadline=25)),
+    'gemini': (CircuitBreaker('gemini', failure_threshold=3, reset_timeout=120), RetryPolicy(attempts=2, attempt_timeout=60, deadline=90)),
+    'openai': (CircuitBreaker('openai', failure_threshold=10), RetryPolicy(attempts=3, base_delay=1.0, max_delay=20.0, attempt_timeout=180, deadline=300)),
+}
+
+
+def call(provider: str, fn: Callable[[float], object], is_retryable: Optional[Callable[[Exception], bool]] = None):
+    """Run fn(timeout) under the provider's circuit breaker and retry policy.
+
+    fn receives the timeout for the attempt (never more than what is left of the
+    deadline). Retryable failures count against the breaker; other exceptions mean
+    the provider answered and are re-raised as is.
+    """
+    breaker, policy = PROVIDERS[provider]
+    is_retryable = is_retryable or _default_retryable
+    started = time.monotonic()
+    last_error: Optional[Exception] = None
+    for attempt in range(policy.attempts):
+        if not breaker.allow():
+            raise CircuitOpenError(provider, f"{provider} circuit is open")
+        remaining = policy.deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        try:
+            result = fn(min(policy.attempt_timeout, remaining))
+        except Exception as e:
+            if not is_retryable(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            last_error = e
+            logger.warning(f"{provider} call failed (attempt {attempt + 1}/{policy.attempts}): {e}")
+            delay = policy.backoff(attempt)
+            if attempt + 1 >= policy.attempts or time.monotonic() - started + delay >= policy.deadline:
+                break
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+    raise ProviderUnavailable(provider, f"{provider} unavailable: {last_error or 'deadline exceeded'}") from last_error
+
+
+def request(provider: str, session: requests.Session, method: str, url: str, **kwargs) -> requests.Response:
+    """HTTP request through the provider's breaker and retry policy.
+
+    429 and 5xx responses are retried; other responses are returned for the
+    caller to inspect as before.
+    """
+    def attempt(timeout: float):
+        r = session.request(method, url, timeout=(min(3.05, timeout), timeout), **kwargs)
+        if r.status_code == 429 or r.status_code >= 500:
+            raise RetryableStatus(r)
+        return r
+    return call(provider, attempt)
+
+
+def breaker_states() -> Dict[str, dict]:
+    return {name: breaker.snapshot() for name, (breaker, _) in PROVIDERS.items()}
@@ -1,3 +1,3 @@
 #!/bin/bash
 sudo systemctl restart content-dreamer-server@{1..2}
-sudo systemctl restart content-dreamer-worker@{1..3}
\ No newline at end of file
+sudo systemctl restart content-dreamer-worker@{reports,media_fast,media_video}
@@ -0,0 +1,345 @@
+"""Retention: archive old reports, delete abandoned guest data, trim the credit ledger.
+
+Run from cron with `flask apply_retention` (add --dry-run to only count). Work
+is done in batches of --batch-size rows with a pause between batches so the
+primary is not saturated.
+"""
+from __future__ import annotations
+import os
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from config import logger
+import config
+import payload_store
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_BATCH_PAUSE = 0.5
+# Reports still being generated are never archived or deleted
+SETTLED_STATUSES = ('complete', 'partial_ready', 'failed')
+
+
+@dataclass
+class RetentionStats:
+    dry_run: bool = False
+    reports_archived: int = 0
+    suggestions_archived: int = 0
+    guest_reports_deleted: int = 0
+    guest_products_deleted: int = 0
+    files_deleted: int = 0
+    ledger_rows_deleted: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    return dt.isoformat() if dt else None
+
+
+def _static_path(rel: str) -> str:
+    # Media paths are stored relative to the static folder
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', rel)
+
+
+def _remove_file(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.error(f"Failed to delete {path}: {e}")
+        return False
+
+
+def retention_days_by_plan() -> Dict[str, int]:
+    from plans import get_plans
+    return {p['id']: p['limits'].get('report_retention_days') for p in get_plans()}
+
+
+# -------- Archival --------
+
+def _pack_report(rep) -> Tuple[dict, list]:
+    """(summary, steps): what get_report and the novelty index read, and the full steps with payloads."""
+    from models.suggestion import Suggestion
+    from models.report_step import ReportStep
+    suggestions = Suggestion.query.filter_by(report_id=rep.id).all()
+    steps = ReportStep.query.filter_by(report_id=rep.id).order_by(ReportStep.started_at.asc()).all()
+    summary = {
+        'suggestions': [dict(s.to_dict(), visibility=s.visibility) for s in suggestions],
+        'steps': [{'step_name': st.step_name, 'status': st.status} for st in steps],
+        # suggestion ids of generated media, restored with the suggestions
+        'links': {
+            kind: {row.id: row.suggestion_id for row in model.query.filter(model.report_id == rep.id, model.suggestion_id.isnot(None))}
+            for kind, model in _media_models().items()
+        },
+    }
+    full_steps = [{
+        'id': st.id,
+        'step_name': st.step_name,
+        'status': st.status,
+        'started_at': _iso(st.started_at),
+        'finished_at': _iso(st.finished_at),
+        'error': st.error_message,
+        'payload': st.payload,
+        'payload_path': st.payload_path,
+    } for st in steps]
+    return summary, full_steps
+
+
+def _media_models() -> dict:
+    from models.article import Article
+    from models.meme import Meme
+    from models.slop import Slop
+    return {'articles': Article, 'memes': Meme, 'slops': Slop}
+
+
+def archive_report(rep) -> int:
+    """Move a report's suggestions and steps into a ReportArchive row.
+
+    Suggestions (with step names and statuses) and the full steps with their
+    payloads are compressed separately, so serving an archived report does not
+    unpack the payloads. Returns the number of suggestions archived. Media rows
+    keep existing; their suggestion links are kept in the archive and restored
+    with it.
+    """
+    from models.db_utils import db
+    from models.report_archive import ReportArchive
+    from models.suggestion import Suggestion
+    from models.report_step import ReportStep
+    summary, full_steps = _pack_report(rep)
+    codec, data = payload_store.encode(summary)
+    steps_codec, steps_data = payload_store.encode(full_steps)
+    try:
+        for model in _media_models().values():
+            model.query.filter(model.report_id == rep.id).update({model.suggestion_id: None}, synchronize_session=False)
+        Suggestion.query.filter_by(report_id=rep.id).delete(synchronize_session=False)
+        ReportStep.query.filter_by(report_id=rep.id).delete(synchronize_session=False)
+        db.session.add(ReportArchive(report_id=rep.id, codec=codec, data=data, steps_codec=steps_codec, steps_data=steps_data,
+                                     suggestion_count=len(summary['suggestions']), step_count=len(full_steps)))
+        rep.archived_at = datetime.utcnow()
+        db.session.add(rep)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    # Spilled step payloads now live in the archive
+    for st in full_steps:
+        if st.get('payload_path'):
+            payload_store.delete_file(st['payload_path'])
+    return len(summary['suggestions'])
+
+
+def load_archive(report_id: str) -> Optional[dict]:
+    """An archived report's suggestions, step names/statuses and media links, or None if it is not archived.
+
+    Step payloads are not included (see load_archived_steps).
+    """
+    from models.report_archive import ReportArchive
+    arc = ReportArchive.query.get(report_id)
+    if arc is None:
+        return None
+    return payload_store.decode(arc.codec, arc.data)
+
+
+def load_archives(report_ids: List[str]) -> Dict[str, dict]:
+    """load_archive for many reports with one query; reports without an archive are left out."""
+    from sqlalchemy.orm import undefer
+    from models.report_archive import ReportArchive
+    if not report_ids:
+        return {}
+    rows = ReportArchive.query.options(undefer(ReportArchive.data)).filter(ReportArchive.report_id.in_(report_ids)).all()
+    return {arc.report_id: payload_store.decode(arc.codec, arc.data) for arc in rows}
+
+
+def load_archived_steps(arc) -> list:
+    """Full archived steps of a ReportArchive row, payloads included."""
+    return payload_store.decode(arc.steps_codec, arc.steps_data)
+
+
+def restore_report(report_id: str) -> bool:
+    """Put an archived report's suggestions and steps back into their tables."""
+    from models.db_utils import db
+    from models.report import Report
+    from models.report_archive import ReportArchive
+    from models.suggestion import Suggestion
+    from models.report_step import ReportStep
+    rep = Report.query.get(report_id)
+    arc = ReportArchive.query.get(report_id)
+    if rep is None or arc is None:
+        return False
+    summary = payload_store.decode(arc.codec, arc.data)
+    try:
+        for s in summary.get('suggestions', []):
+            db.session.add(Suggestion(id=s['id'], report_id=report_id, source_type=s['source_type'], kind=s['kind'],
+                                      text=s['text'], rank=s.get('rank'), meta_json=s.get('meta'),
+                                      visibility=s.get('visibility')))
+        for st in load_archived_steps(arc):
+            step = ReportStep(id=st['id'], report_id=report_id, step_name=st['step_name'], status=st['status'],
+                              started_at=datetime.fromisoformat(st['started_at']) if st.get('started_at') else None,
+                              finished_at=datetime.fromisoformat(st['finished_at']) if st.get('finished_at') else None,
+                              error_message=st.get('error'))
+            step.payload = st.get('payload')
+            db.session.add(step)
+        db.session.flush()
+        for kind, model in _media_models().items():
+            for media_id, suggestion_id in (summary.get('links', {}).get(kind) or {}).items():
+                model.query.filter(model.id == media_id).update({model.suggestion_id: suggestion_id}, synchronize_session=False)
+        db.session.delete(arc)
+        rep.archived_at = None
+        db.session.add(rep)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return True
+
+
+def archive_old_reports(stats: RetentionStats, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = DEFAULT_BATCH_PAUSE):
+    """Archive signed-in users' reports older than their plan's report_retention_days."""
+    from models.db_utils import db
+    from models.report import Report
+    from plans import plan_id_for_user
+    horizons = {plan: days for plan, days in retention_days_by_plan().items() if days and days > 0}
+    if not horizons:
+        return
+    now = datetime.utcnow()
+    # Anything newer than the shortest horizon is safe for every plan
+    oldest_cutoff = now - timedelta(days=min(horizons.values()))
+    plan_of: Dict[str, str] = {}
+    after = None
+    while True:
+        q = (Report.query
+             .filter(Report.user_id.isnot(None), Report.archived_at.is_(None),
+                     Report.status.in_(SETTLED_STATUSES), Report.created_on < oldest_cutoff)
+             .order_by(Report.id))
+        if after:
+            q = q.filter(Report.id > after)
+        batch = q.limit(batch_size).all()
+        if not batch:
+            break
+        after = batch[-1].id
+        for rep in batch:
+            if rep.user_id not in plan_of:
+                plan_of[rep.user_id] = plan_id_for_user(rep.user_id)
+            days = horizons.get(plan_of[rep.user_id])
+            if not days or rep.created_on >= now - timedelta(days=days):
+                continue
+            if stats.dry_run:
+                stats.reports_archived += 1
+                continue
+            try:
+                stats.suggestions_archived += archive_report(rep)
+                stats.reports_archived += 1
+            except Exception as e:
+                logger.error(f"Failed to archive report {rep.id}: {e}")
+        db.session.expunge_all()
+        time.sleep(pause)
+
+
+# -------- Guest cleanup --------
+
+def _delete_report_rows(report_ids: List[str]) -> int:
+    """Delete reports with their steps, suggestions and media (rows and files); returns files deleted."""
+    from models.db_utils import db
+    from models.report import Report
+    from models.report_archive import ReportArchive
+    from models.suggestion import Suggestion
+    from models.report_step import ReportStep
+    from models.meme import Meme
+    from models.slop import Slop
+    from models.article import Article
+    files = []
+    files += [_static_path(p) for (p,) in db.session.query(Meme.image_path).filter(Meme.report_id.in_(report_ids), Meme.image_path.isnot(None))]
+    files += [_static_path(p) for (p,) in db.session.query(Slop.video_path).filter(Slop.report_id.in_(report_ids), Slop.video_path.isnot(None))]
+    files += [os.path.join(config.step_payload_dir, p) for (p,) in
+              db.session.query(ReportStep.payload_path).filter(ReportStep.report_id.in_(report_ids), ReportStep.payload_path.isnot(None))]
+    try:
+        for model in (Meme, Slop, Article, Suggestion, ReportStep, ReportArchive):
+            model.query.filter(model.report_id.in_(report_ids)).delete(synchronize_session=False)
+        Report.query.filter(Report.id.in_(report_ids)).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return sum(1 for path in files if _remove_file(path))
+
+
+def purge_guest_data(stats: RetentionStats, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = DEFAULT_BATCH_PAUSE):
+    """Delete guest reports older than config.guest_retention_days, then guest products left without reports."""
+    from models.db_utils import db
+    from models.report import Report
+    from models.product import Product
+    from cache import cache_store
+    cutoff = datetime.utcnow() - timedelta(days=config.guest_retention_days)
+    after = None
+    while True:
+        q = (db.session.query(Report.id)
+             .filter(Report.user_id.is_(None), Report.guest_id.isnot(None),
+                     Report.status.in_(SETTLED_STATUSES), Report.created_on < cutoff)
+             .order_by(Report.id))
+        if stats.dry_run and after:
+            # Nothing is deleted in a dry run, so page past what was counted
+            q = q.filter(Report.id > after)
+        ids = [rid for (rid,) in q.limit(batch_size)]
+        if not ids:
+            break
+        after = ids[-1]
+        stats.guest_reports_deleted += len(ids)
+        if not stats.dry_run:
+            stats.files_deleted += _delete_report_rows(ids)
+        time.sleep(pause)
+
+    has_reports = db.session.query(Report.id).filter(Report.product_id == Product.id).exists()
+    after = None
+    while True:
+        q = (db.session.query(Product.id)
+             .filter(Product.user_id.is_(None), Product.guest_id.isnot(None),
+                     Product.created_on < cutoff, ~has_reports)
+             .order_by(Product.id))
+        if stats.dry_run and after:
+            q = q.filter(Product.id > after)
+        ids = [pid for (pid,) in q.limit(batch_size)]
+        if not ids:
+            break
+        after = ids[-1]
+        stats.guest_products_deleted += len(ids)
+        if not stats.dry_run:
+            Product.query.filter(Product.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            cache_store.delete(*[f"novelty:{pid}" for pid in ids])
+        time.sleep(pause)
+
+
+# -------- Credit ledger --------
+
+def purge_ledger(stats: RetentionStats, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = DEFAULT_BATCH_PAUSE):
+    """Delete credit ledger rows older than config.ledger_retention_days (totals are per month)."""
+    from models.db_utils import db
+    from models.credit_ledger import CreditLedger
+    cutoff = datetime.utcnow() - timedelta(days=config.ledger_retention_days)
+    old = CreditLedger.query.filter(CreditLedger.created_on < cutoff)
+    if stats.dry_run:
+        stats.ledger_rows_deleted += old.count()
+        return
+    # Larger batches: ledger rows are small and have no dependents
+    batch_size *= 10
+    while True:
+        ids = [i for (i,) in db.session.query(CreditLedger.id).filter(CreditLedger.created_on < cutoff).limit(batch_size)]
+        if not ids:
+            break
+        CreditLedger.query.filter(CreditLedger.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        stats.ledger_rows_deleted += len(ids)
+        time.sleep(pause)
+
+
+def run(dry_run: bool = False, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = DEFAULT_BATCH_PAUSE) -> RetentionStats:
+    stats = RetentionStats(dry_run=dry_run)
+    archive_old_reports(stats, batch_size, pause)
+    purge_guest_data(stats, batch_size, pause)
+    purge_ledger(stats, batch_size, pause)
+    logger.info(f"Retention {'dry run' if dry_run else 'run'}: {stats.to_dict()}")
+    return stats
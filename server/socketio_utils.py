@@ -1,2 +1,13 @@
 from flask_socketio import SocketIO
-socketio = SocketIO()
\ No newline at end of file
+from config import logger
+socketio = SocketIO()
+
+
+def emit_to_user(user_id, event: str, data: dict):
+    """Emit an event to a user's room; rooms are joined by string user id on connect."""
+    if not user_id:
+        return
+    try:
+        socketio.emit(event, data, to=str(user_id))
+    except Exception as e:
+        logger.error(f"Socket emit {event} failed: {e}")
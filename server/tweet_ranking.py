@@ -0,0 +1,89 @@
+from __future__ import annotations
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from context_utils import clean_tweet_text, engagement_score
+
+# Feature weights for the pre-rank score; spam is subtracted
+WEIGHTS = {'engagement': 0.5, 'recency': 0.25, 'length': 0.15, 'base': 0.1, 'spam': 0.6}
+# Hours for the recency score to decay by 1/e
+RECENCY_HOURS = 24.0
+# Cleaned length (chars) at which the length score saturates, and below which a tweet is too thin to reply to
+IDEAL_LENGTH = 140
+MIN_LENGTH = 20
+# Languages we write replies in; "und"/missing is allowed through
+REPLY_LANGUAGES = ('en',)
+
+_SPAM_RE = re.compile(r'\b(giveaway|airdrop|promo code|dm me|follow back|f4f|click the link|link in bio|onlyfans|whitelist|presale)\b', re.IGNORECASE)
+_HASHTAG_RE = re.compile(r'#\w+')
+_URL_RE = re.compile(r'https?://\S+')
+_MENTION_RE = re.compile(r'(?<!\w)@\w+')
+
+
+def _field(tweet, name):
+    v = getattr(tweet, name, None)
+    if v is None and isinstance(tweet, dict):
+        v = tweet.get(name)
+    return v
+
+
+def _age_hours(created_at: Optional[str], now: datetime) -> float:
+    if not created_at:
+        return np.nan
+    try:
+        ts = datetime.strptime(created_at, '%a %b %d %H:%M:%S %z %Y')
+    except ValueError:
+        return np.nan
+    return max(0.0, (now - ts).total_seconds() / 3600)
+
+
+def _spam_score(text: str) -> float:
+    hashtags = len(_HASHTAG_RE.findall(text))
+    links = len(_URL_RE.findall(text))
+    mentions = len(_MENTION_RE.findall(text))
+    letters = [c for c in text if c.isalpha()]
+    caps = (sum(c.isupper() for c in letters) / len(letters)) if len(letters) >= 20 else 0.0
+    score = 0.0
+    if _SPAM_RE.search(text):
+        score += 0.6
+    score += 0.15 * max(0, hashtags - 2) + 0.2 * max(0, links - 1) + 0.1 * max(0, mentions - 3)
+    if caps > 0.6:
+        score += 0.3
+    return min(1.0, score)
+
+
+def score_tweets(tweets: Sequence, now: Optional[datetime] = None) -> np.ndarray:
+    """Pre-rank scores in [0, 1] for TweetSummary objects or dicts.
+
+    Combines batch-normalised engagement, recency, cleaned length and spam
+    heuristics. Tweets in other languages or too short to reply to score 0.
+    """
+    if not tweets:
+        return np.zeros(0)
+    now = now or datetime.now(timezone.utc)
+    raw_texts = [_field(t, 'text') or '' for t in tweets]
+    lengths = np.array([len(clean_tweet_text(t)) for t in raw_texts], dtype=np.float64)
+    engagement = np.array([engagement_score(t) for t in tweets], dtype=np.float64)
+    ages = np.array([_age_hours(_field(t, 'created_at'), now) for t in tweets], dtype=np.float64)
+    spam = np.array([_spam_score(t) for t in raw_texts], dtype=np.float64)
+    langs = [(_field(t, 'lang') or 'und') for t in tweets]
+    allowed = np.array([lang in REPLY_LANGUAGES or lang == 'und' for lang in langs])
+
+    top = engagement.max()
+    engagement = engagement / top if top > 0 else engagement
+    recency = np.where(np.isnan(ages), 0.5, np.exp(-np.nan_to_num(ages) / RECENCY_HOURS))
+    length = np.clip(lengths / IDEAL_LENGTH, 0.0, 1.0)
+
+    score = (WEIGHTS['engagement'] * engagement + WEIGHTS['recency'] * recency
+             + WEIGHTS['length'] * length + WEIGHTS['base'] - WEIGHTS['spam'] * spam)
+    score[(lengths < MIN_LENGTH) | ~allowed] = 0.0
+    return np.clip(score, 0.0, 1.0)
+
+
+def top_tweets(tweets: Sequence, k: int, now: Optional[datetime] = None) -> List[Tuple[float, object]]:
+    """The k best (score, tweet) pairs with a positive score, best first."""
+    tweets = list(tweets or [])
+    scores = score_tweets(tweets, now)
+    order = np.argsort(-scores, kind='stable')[:k]
+    return [(float(scores[i]), tweets[i]) for i in order if scores[i] > 0]
@@ -0,0 +1,137 @@
+from __future__ import annotations
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from cache import cache_store
+from config import logger
+
+# User columns cached for the identity path (/api/me included); anything else loads the row
+HOT_COLUMNS = ('id', 'name', 'email', 'avatar_url', 'guest_id', 'created_on')
+# Datetime columns, cached as ISO strings
+DATETIME_COLUMNS = ('created_on',)
+# Cached values that are not User columns
+DERIVED_FIELDS = ('plan_id',)
+# Short TTLs: the in-process tier bounds staleness in other processes after an invalidation
+LOCAL_TTL_SECONDS = 30
+REDIS_TTL_SECONDS = 300
+LOCAL_MAX_ENTRIES = 10000
+
+_local: Dict[str, Tuple[float, dict]] = {}
+_local_lock = threading.Lock()
+
+
+def _key(user_id: str) -> str:
+    return f"user:hot:{user_id}"
+
+
+def _load_fields(user_id: str) -> Optional[dict]:
+    from models.db_utils import db
+    from models.user import User
+    from plans import plan_id_for_user
+    row = db.session.query(*[getattr(User, c) for c in HOT_COLUMNS]).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    fields = dict(zip(HOT_COLUMNS, row))
+    for col in DATETIME_COLUMNS:
+        fields[col] = fields[col].isoformat() if fields[col] else None
+    fields['plan_id'] = plan_id_for_user(user_id)
+    return fields
+
+
+def _hydrate(fields: dict) -> dict:
+    """Cached fields as the User row would return them (ISO strings back to datetimes)."""
+    fields = dict(fields)
+    for col in DATETIME_COLUMNS:
+        if isinstance(fields.get(col), str):
+            fields[col] = datetime.fromisoformat(fields[col])
+    return fields
+
+
+def get_fields(user_id: str) -> Optional[dict]:
+    """Hot fields of a user from the in-process cache, then Redis, then the DB; None if the user does not exist."""
+    if not user_id:
+        return None
+    now = time.monotonic()
+    hit = _local.get(user_id)
+    if hit and hit[0] > now:
+        return hit[1]
+    fields = None
+    try:
+        raw = cache_store.get(_key(user_id))
+        fields = json.loads(raw) if raw else None
+    except Exception as e:
+        logger.error(f"User cache read failed for {user_id}: {e}")
+    if fields is None:
+        fields = _load_fields(user_id)
+        if fields is None:
+            return None
+        try:
+            cache_store.set(_key(user_id), json.dumps(fields), ex=REDIS_TTL_SECONDS)
+        except Exception as e:
+            logger.error(f"User cache write failed for {user_id}: {e}")
+    fields = _hydrate(fields)
+    with _local_lock:
+        if len(_local) >= LOCAL_MAX_ENTRIES:
+            _local.clear()
+        _local[user_id] = (now + LOCAL_TTL_SECONDS, fields)
+    return fields
+
+
+def invalidate(user_id: str):
+    """Drop a user's cached fields after changing a hot column or their plan."""
+    if not user_id:
+        return
+    with _local_lock:
+        _local.pop(user_id, None)
+    try:
+        cache_store.delete(_key(user_id))
+    except Exception as e:
+        logger.error(f"User cache invalidation failed for {user_id}: {e}")
+
+
+class LazyUser:
+    """Stands in for the request's User.
+
+    id, the hot columns and plan_id are served from the cache; touching any
+    other attribute, or assigning one, loads the row once for the request.
+    Use _get_current_object() where a mapped instance is required
+    (db.session.add).
+    """
+
+    __slots__ = ('id', '_fields', '_row')
+
+    def __init__(self, user_id: str, fields: Optional[dict] = None):
+        object.__setattr__(self, 'id', user_id)
+        object.__setattr__(self, '_fields', fields or {})
+        object.__setattr__(self, '_row', None)
+
+    def _get_current_object(self):
+        if self._row is None:
+            from models.user import User
+            object.__setattr__(self, '_row', User.query.get(self.id))
+        return self._row
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name in self._fields and (self._row is None or name in DERIVED_FIELDS):
+            return self._fields[name]
+        return getattr(self._get_current_object(), name)
+
+    def __setattr__(self, name, value):
+        if name in self.__slots__:
+            raise AttributeError(f"{name} is read-only on LazyUser")
+        setattr(self._get_current_object(), name, value)
+
+    def __repr__(self):
+        return f"<LazyUser({self.id}) loaded={self._row is not None}>"
+
+
+def lazy_user(user_id: str) -> Optional[LazyUser]:
+    """A LazyUser for user_id, or None if no such user exists."""
+    fields = get_fields(user_id)
+    if fields is None:
+        return None
+    return LazyUser(user_id, fields)
@@ -25,6 +25,7 @@ from config import (
     logger,
 )
 import config
+import user_cache
 from hashlib import md5
 import phonenumbers
 import re
@@ -130,18 +131,11 @@ app_views = Blueprint("app_views", __name__)
 @requires_auth
 def current_plan(current_user: User, **kwargs):
   from plans import get_plans
-  from models.subscription import UserSubscription
   plans = get_plans()
   default_plan = next((p for p in plans if p['id'] == 'free'), plans[0])
-  sub = UserSubscription.query.filter_by(user_id=current_user.id).order_by(UserSubscription.current_period_end.desc()).first()
-  plan_id = default_plan['id']
-  limits = default_plan['limits']
-  if sub and sub.status in ('active','trialing','past_due') and sub.plan_id:
-    p = next((pp for pp in plans if pp['id'] == sub.plan_id), None)
-    if p:
-      plan_id = p['id']
-      limits = p['limits']
-  return jsonify({'plan_id': plan_id, 'limits': limits}), 200
+  # plan_id is a cached hot field (see user_cache), so this needs no subscription query
+  p = next((pp for pp in plans if pp['id'] == current_user.plan_id), default_plan)
+  return jsonify({'plan_id': p['id'], 'limits': p['limits']}), 200
 
 
 @app_views.route('/api/external', methods=['GET'])
@@ -195,8 +189,9 @@ def update_profile(current_user: User, **kwargs):
     current_user.avatar_url = avatar_url
   if new_password:
     current_user.set_password(new_password)
-  db.session.add(current_user)
+  db.session.add(current_user._get_current_object())
   db.session.commit()
+  user_cache.invalidate(current_user.id)
   return jsonify({'ok': True, 'user': {
     'id': current_user.id,
     'name': current_user.name,
@@ -236,7 +231,7 @@ def confirm_phone_change(current_user: User, **kwargs):
   if U.query.filter_by(phone=new_phone).first():
     abort(400, 'Phone already in use')
   current_user.phone = new_phone
-  db.session.add(current_user)
+  db.session.add(current_user._get_current_object())
   from models.db_utils import db as _db
   _db.session.delete(rec)
   _db.session.commit()
@@ -277,8 +272,9 @@ def upload_avatar(current_user: User, **kwargs):
       path_rel, _, _ = _save_file_to_local(fs, f"uploads/avatars/{current_user.id}")
       stored = path_rel
     current_user.avatar_url = stored
-    db.session.add(current_user)
+    db.session.add(current_user._get_current_object())
     db.session.commit()
+    user_cache.invalidate(current_user.id)
     return jsonify({'ok': True, 'avatar_url': _avatar_public_url(stored)}), 200
   except Exception as e:
     logger.error(f"Avatar upload failed: {e}")
@@ -5,6 +5,7 @@ from models.user import User
 from models.product import Product
 from models.report import Report
 from models.report_step import ReportStep
+from models.report_archive import ReportArchive
 from models.suggestion import Suggestion
 from models.article import Article
 from models.meme import Meme
@@ -15,12 +16,16 @@ from stripe_util import stripe
 from datetime import datetime, timedelta
 from datetime import date
 from uuid import uuid4
-from queue_util import q
+from typing import Optional
+from queue_util import enqueue_job, IdempotentSubmission
 import os
 from stripe_util import webhook_secret
 import json
 from config import logger
 import config as config
+import user_cache
+import guest_merge
+import pipeline_profiles
 from markdown import markdown as md_to_html
 
 bp_reports = Blueprint('bp_reports', __name__)
@@ -32,7 +37,7 @@ def _current_user_or_none():
         uid = get_jwt_identity()
         if not uid:
             return None
-        return User.query.get(uid)
+        return user_cache.lazy_user(uid)
     except Exception:
         return None
 
@@ -42,6 +47,37 @@ def _request_guest_id():
     return (request.headers.get('X-Guest-Id') or request.args.get('guest_id') or '').strip() or None
 
 
+def _submission(scope: str, principal, *fallback) -> IdempotentSubmission:
+    """Idempotency guard from the Idempotency-Key header, or a key derived from fallback."""
+    client_key = (request.headers.get('Idempotency-Key') or '').strip() or None
+    return IdempotentSubmission(scope, principal or request.remote_addr, client_key, fallback)
+
+
+def _submit_once(sub: IdempotentSubmission, create):
+    """Run create() at most once per submission key.
+
+    create returns (payload, status_code, job_id); a falsy job_id (e.g. quota refusal)
+    is not remembered. Duplicates get the original payload back.
+    """
+    existing = sub.existing()
+    if existing is not None:
+        resp = jsonify(existing)
+        resp.headers['Idempotent-Replayed'] = 'true'
+        return resp, 200
+    if not sub.claim():
+        return jsonify({'error': 'A matching request is already in progress'}), 409
+    try:
+        payload, status, job_id = create()
+    except Exception:
+        sub.release()
+        raise
+    if job_id:
+        sub.complete(payload, job_id)
+    else:
+        sub.release()
+    return jsonify(payload), status
+
+
 @bp_reports.route('/api/plans', methods=['GET'])
 def list_plans():
     plans = get_plans()
@@ -120,13 +156,18 @@ def create_billing_portal():
     return jsonify({'url': portal.url}), 200
 
 
-@bp_reports.route('/api/admin/sync_plans', methods=['POST'])
-def admin_sync_plans():
-    # Light admin guard: require header token if set
-    admin_token = request.headers.get('X-Admin-Token')
+def _require_admin_token():
+    """403 unless X-Admin-Token matches ADMIN_SYNC_TOKEN; admin views are closed while the token is unset."""
+    import hmac
     expected = os.getenv('ADMIN_SYNC_TOKEN')
-    if expected and admin_token != expected:
+    admin_token = request.headers.get('X-Admin-Token') or ''
+    if not expected or not hmac.compare_digest(admin_token, expected):
         abort(403)
+
+
+@bp_reports.route('/api/admin/sync_plans', methods=['POST'])
+def admin_sync_plans():
+    _require_admin_token()
     plans = get_plans()
     for p in plans:
         rec = SubscriptionPlan.query.get(p['id'])
@@ -144,6 +185,67 @@ def admin_sync_plans():
     return jsonify({'synced': len(plans)}), 200
 
 
+@bp_reports.route('/api/admin/rate_limits', methods=['GET'])
+def admin_rate_limits():
+    """Queueing delay, throttle counts and adaptive concurrency per OpenAI model, plus hedging stats per prompt."""
+    _require_admin_token()
+    from openai_utils import openai_limiter
+    import hedging
+    return jsonify({'openai': openai_limiter.stats(), 'hedging': hedging.stats()}), 200
+
+
+@bp_reports.route('/api/admin/model_routes', methods=['GET'])
+def admin_model_routes():
+    """Resolved model route per prompt and tier, with observed latency and cost per route."""
+    _require_admin_token()
+    import model_routing
+    tiers = ['guest'] + [p['id'] for p in get_plans()]
+    routes = {
+        prompt: {tier: model_routing.resolve(prompt, tier).to_dict() for tier in tiers}
+        for prompt in model_routing.ROUTES
+    }
+    return jsonify({'routes': routes, 'stats': model_routing.stats()}), 200
+
+
+@bp_reports.route('/api/admin/breakers', methods=['GET'])
+def admin_breakers():
+    """Circuit breaker state per external provider."""
+    _require_admin_token()
+    import resilience
+    return jsonify(resilience.breaker_states()), 200
+
+
+@bp_reports.route('/api/admin/breakers/<provider>/reset', methods=['POST'])
+def admin_reset_breaker(provider):
+    """Force a provider's circuit closed, e.g. after an upstream incident is resolved."""
+    _require_admin_token()
+    import resilience
+    if provider not in resilience.PROVIDERS:
+        return jsonify({'error': 'Unknown provider'}), 404
+    breaker, _ = resilience.PROVIDERS[provider]
+    breaker.reset()
+    return jsonify({provider: breaker.snapshot()}), 200
+
+
+@bp_reports.route('/api/admin/reports/<rid>/steps', methods=['GET'])
+def admin_report_steps(rid):
+    """Steps of a report with their full payloads, for debugging a run."""
+    _require_admin_token()
+    steps = ReportStep.query.filter_by(report_id=rid).order_by(ReportStep.started_at.asc()).all()
+    if not steps and not Report.query.get(rid):
+        abort(404)
+    return jsonify({'steps': [{
+        'step_name': st.step_name,
+        'status': st.status,
+        'started_at': st.started_at.isoformat() if st.started_at else None,
+        'finished_at': st.finished_at.isoformat() if st.finished_at else None,
+        'error': st.error_message,
+        'payload': payload,
+        # Spilled to a file this host cannot read (see config.step_payload_dir)
+        'payload_missing': payload is None and bool(st.payload_path),
+    } for st, payload in ((st, st.payload) for st in steps)]}), 200
+
+
 @bp_reports.route('/api/reports/initiate', methods=['POST'])
 @bp_reports.route('/api/feeds/initiate', methods=['POST'])  # alias path using feed terminology
 def initiate_report():
@@ -162,21 +264,65 @@ def initiate_report():
         if existing:
             return jsonify({'report_id': existing.id, 'prompt_login': True}), 200
 
-    # Enforce daily quotas for authenticated users
-    if user_id:
-        enforce_ok, reason = _enforce_quota(user_id, kind='content')
-        if not enforce_ok:
-            return jsonify({'error': reason, 'upgrade_required': True}), 402
+    def create():
+        # Enforce daily quotas for authenticated users
+        if user_id:
+            enforce_ok, reason = _enforce_quota(user_id, kind='content')
+            if not enforce_ok:
+                return {'error': reason, 'upgrade_required': True}, 402, None
+
+        prod = Product.create(name=name, description=desc, user_id=user_id, guest_id=guest_id)
+        # Visibility cutoff from plan config (basic default for guests)
+        visibility_cutoff = 5
+        rep = Report.create(product_id=prod.id, user_id=user_id, guest_id=guest_id, visibility_cutoff=visibility_cutoff,
+                            pipeline_profile=pipeline_profiles.profile_name_for(user_id))
+        if not user_id:
+            guest_merge.forget(guest_id)
 
-    prod = Product.create(name=name, description=desc, user_id=user_id, guest_id=guest_id)
-    # Visibility cutoff from plan config (basic default for guests)
-    visibility_cutoff = 5
-    rep = Report.create(product_id=prod.id, user_id=user_id, guest_id=guest_id, visibility_cutoff=visibility_cutoff)
+        # Enqueue background job
+        enqueue_job('workers.generate_report', rep.id, job_id=rep.id)
+        return {'report_id': rep.id}, 200, rep.id
 
-    # Enqueue background job
-    q.enqueue('workers.generate_report', rep.id, job_timeout='30m')
+    return _submit_once(_submission('initiate_report', user_id or guest_id, name, desc), create)
 
-    return jsonify({'report_id': rep.id}), 200
+
+# Report status a top-up may start from; partial_ready is still being written by generate_report
+TOPUP_FROM_STATUSES = ('complete',)
+
+
+def _topup_target(rep: Report, plan_id: Optional[str] = None) -> Optional[str]:
+    """The profile rep should be topped up to, or None when it already got at least its owner's plan."""
+    if not rep.user_id or rep.archived_at:
+        return None
+    target = pipeline_profiles.profile_name_for(rep.user_id, plan_id)
+    return target if pipeline_profiles.needs_topup(rep.pipeline_profile, target) else None
+
+
+def _queue_topup(rep: Report):
+    """Queue workers.topup_report for rep; returns (body, status_code).
+
+    The report goes back to 'queued' with a conditional UPDATE, so concurrent
+    requests queue one job. Quota rule: a report generated as a guest is
+    brought up to the owner's plan for free, since signing up is what unlocks
+    it; topping up a report after a plan upgrade is new paid LLM work and uses
+    one of the owner's daily content generations.
+    """
+    if not _topup_target(rep):
+        return {'queued': False}, 200
+    claimed = (Report.query.filter(Report.id == rep.id, Report.status.in_(TOPUP_FROM_STATUSES))
+               .update({Report.status: 'queued'}, synchronize_session=False))
+    db.session.commit()
+    if not claimed:
+        return {'error': 'Report is not complete'}, 409
+    if rep.pipeline_profile != 'guest':
+        ok, reason = _enforce_quota(rep.user_id, kind='content')
+        if not ok:
+            Report.query.filter(Report.id == rep.id, Report.status == 'queued').update({Report.status: 'complete'}, synchronize_session=False)
+            db.session.commit()
+            return {'error': reason, 'upgrade_required': True}, 402
+    enqueue_job('workers.topup_report', rep.id, job_id=f"topup-{rep.id}")
+    rep._publish_status()
+    return {'queued': True}, 200
 
 
 @bp_reports.route('/api/reports/<rid>', methods=['GET'])
@@ -193,33 +339,25 @@ def get_report(rid):
     req_guest_id = request.args.get('guest_id') or (request.headers.get('X-Guest-Id'))
     is_guest_owner = (rep.guest_id and req_guest_id and rep.guest_id == req_guest_id and not rep.user_id)
 
+    # Archived reports are served read-only from their archive row
+    if rep.archived_at:
+        import retention
+        archive = retention.load_archive(rep.id) or {}
+        all_suggestions = archive.get('suggestions', [])
+        steps = [{'step_name': st['step_name'], 'status': st['status']} for st in archive.get('steps', [])]
+    else:
+        all_suggestions = [dict(s.to_dict(), visibility=s.visibility) for s in rep.suggestions]
+        steps = [{'step_name': st.step_name, 'status': st.status} for st in rep.steps]
+
     # suggestions selection
     if is_owner:
-        suggestions = [
-            {
-                'id': s.id,
-                'kind': s.kind,
-                'source_type': s.source_type,
-                'text': s.text,
-                'rank': s.rank,
-                'meta': (json.loads(s.meta_json) if s.meta_json else None),
-            } for s in rep.suggestions
-        ]
+        selected = all_suggestions
         partial = False
     elif is_guest_owner:
         # Return partial set for guests
-        all_guest = [s for s in rep.suggestions if s.visibility in ('guest', 'subscriber')]
-        all_guest.sort(key=lambda x: x.rank or 0, reverse=True)
-        suggestions = [
-            {
-                'id': s.id,
-                'kind': s.kind,
-                'source_type': s.source_type,
-                'text': s.text,
-                'rank': s.rank,
-                'meta': (json.loads(s.meta_json) if s.meta_json else None),
-            } for s in all_guest[: (rep.visibility_cutoff or 5)]
-        ]
+        all_guest = [s for s in all_suggestions if s.get('visibility') in ('guest', 'subscriber')]
+        all_guest.sort(key=lambda x: x.get('rank') or 0, reverse=True)
+        selected = all_guest[: (rep.visibility_cutoff or 5)]
         partial = True
     else:
         # Not allowed to see details, return status only
@@ -228,8 +366,9 @@ def get_report(rid):
             'status': rep.status,
             'partial': True,
             'suggestions': [],
-            'steps': [{'step_name': st.step_name, 'status': st.status} for st in rep.steps],
+            'steps': steps,
         }), 200
+    suggestions = [{k: v for k, v in s.items() if k != 'visibility'} for s in selected]
 
     return jsonify({
         'id': rep.id,
@@ -240,11 +379,75 @@ def get_report(rid):
         },
         'status': rep.status,
         'partial': partial,
+        'archived': bool(rep.archived_at),
+        # Generated lighter than the owner's plan (as a guest, or on a lower plan): POST .../topup to fill it in
+        'topup_available': bool(current_user and rep.user_id == current_user.id and rep.status in TOPUP_FROM_STATUSES
+                                and _topup_target(rep, current_user.plan_id)),
     'suggestions': suggestions,
-        'steps': [{'step_name': st.step_name, 'status': st.status} for st in rep.steps],
+        'steps': steps,
     }), 200
 
 
+# Report statuses after which a feed stream ends
+FEED_TERMINAL_STATUSES = ('complete', 'failed')
+# Seconds between SSE keepalive comments, and before a stream is closed for the client to reconnect
+FEED_KEEPALIVE_SECONDS = 15
+FEED_STREAM_SECONDS = 600
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@bp_reports.route('/api/reports/<rid>/events', methods=['GET'])
+@bp_reports.route('/api/feeds/<rid>/events', methods=['GET'])
+def feed_events(rid):
+    """Server-sent events for a report run, for clients that cannot use websockets.
+
+    Sends a "snapshot" event with the same body as GET /api/feeds/<rid>, then
+    "step", "suggestion" and "status" deltas as the worker commits them, with
+    keepalive comments in between. The stream ends once the report is complete
+    or failed; EventSource reconnects after FEED_STREAM_SECONDS and gets a
+    fresh snapshot.
+    """
+    import time
+    from flask import Response, stream_with_context
+    from pubsub_utils import feed_channel, subscription, next_message
+    if not Report.query.get(rid):
+        abort(404)
+
+    def stream():
+        # Subscribe before the snapshot so nothing committed in between is lost
+        with subscription([feed_channel(rid)]) as ps:
+            body, _ = get_report(rid)
+            snapshot = body.get_json()
+            # Deltas only come from Redis; give the DB connection back for the life of the stream
+            db.session.remove()
+            yield f"retry: 2000\n{_sse('snapshot', snapshot)}"
+            if snapshot.get('status') in FEED_TERMINAL_STATUSES:
+                return
+            partial = snapshot.get('partial')
+            deadline = time.monotonic() + FEED_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                msg = next_message(ps, min(FEED_KEEPALIVE_SECONDS, deadline - time.monotonic()))
+                if msg is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event, data = msg.get('event'), msg.get('data') or {}
+                if event == 'suggestion' and partial:
+                    # Guest views are a ranked cut of the finished report; they get it from the next snapshot
+                    continue
+                yield _sse(event, data)
+                if event == 'status' and data.get('status') in FEED_TERMINAL_STATUSES:
+                    return
+
+    resp = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies (nginx) from buffering the stream
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+
 @bp_reports.route('/api/reports/<rid>/regenerate', methods=['POST'])
 @jwt_required()
 def regenerate_report(rid):
@@ -252,12 +455,29 @@ def regenerate_report(rid):
     rep = Report.query.get(rid)
     if not rep or (rep.user_id != current_user_id):
         abort(404)
-    ok, reason = _enforce_quota(current_user_id, kind='content')
-    if not ok:
-        return jsonify({'error': reason, 'upgrade_required': True}), 402
-    new_rep = Report.create(product_id=rep.product_id, user_id=current_user_id, visibility_cutoff=rep.visibility_cutoff)
-    q.enqueue('workers.generate_report', new_rep.id, job_timeout='30m')
-    return jsonify({'report_id': new_rep.id}), 200
+
+    def create():
+        ok, reason = _enforce_quota(current_user_id, kind='content')
+        if not ok:
+            return {'error': reason, 'upgrade_required': True}, 402, None
+        new_rep = Report.create(product_id=rep.product_id, user_id=current_user_id, visibility_cutoff=rep.visibility_cutoff,
+                                pipeline_profile=pipeline_profiles.profile_name_for(current_user_id))
+        enqueue_job('workers.generate_report', new_rep.id, job_id=new_rep.id)
+        return {'report_id': new_rep.id}, 200, new_rep.id
+
+    return _submit_once(_submission('regenerate_report', current_user_id, rid), create)
+
+
+@bp_reports.route('/api/reports/<rid>/topup', methods=['POST'])
+@bp_reports.route('/api/feeds/<rid>/topup', methods=['POST'])
+@jwt_required()
+def topup_report(rid):
+    current_user_id = get_jwt_identity()
+    rep = Report.query.get(rid)
+    if not rep or (rep.user_id != current_user_id):
+        abort(404)
+    body, code = _queue_topup(rep)
+    return jsonify(body), code
 
 
 @bp_reports.route('/api/articles', methods=['POST'])
@@ -275,23 +495,23 @@ def create_article():
     guest_id = _request_guest_id()
     if (not rep.user_id and not rep.guest_id) or (rep.user_id and rep.user_id != current_user_id) or  (not rep.user_id and rep.guest_id and rep.guest_id != guest_id):
         abort(403)
-    ok, reason = _enforce_quota(current_user_id, kind='article')
-    if not ok:
-        return jsonify({'error': reason, 'upgrade_required': True}), 402
-    meta = json.loads(sug.meta_json) if sug.meta_json else {}
-    art = Article.create(report_id=rep.id, title=sug.text, description=meta.get('description'), suggestion_id=sug.id)
-    # persist article_id into suggestion meta for future quick access on the client
-    try:
-        meta = meta or {}
-        meta['article_id'] = art.id
-        sug.meta_json = json.dumps(meta)
-        db.session.add(sug)
-        db.session.commit()
-    except Exception:
-        logger.exception("Failed to persist article_id into suggestion meta")
-    # enqueue article generation
-    q.enqueue('workers.generate_article', art.id, job_timeout='15m')
-    return jsonify({'article_id': art.id, 'status': art.status}), 200
+
+    def create():
+        ok, reason = _enforce_quota(current_user_id, kind='article')
+        if not ok:
+            return {'error': reason, 'upgrade_required': True}, 402, None
+        meta = sug.meta_json or {}
+        art = Article.create(report_id=rep.id, title=sug.text, description=meta.get('description'), suggestion_id=sug.id)
+        # persist article_id into suggestion meta for future quick access on the client
+        try:
+            Suggestion.merge_meta(sug.id, {'article_id': art.id})
+        except Exception:
+            logger.exception("Failed to persist article_id into suggestion meta")
+        # enqueue article generation
+        enqueue_job('workers.generate_article', art.id, job_id=art.id)
+        return {'article_id': art.id, 'status': art.status}, 200, art.id
+
+    return _submit_once(_submission('create_article', current_user_id, sug.id), create)
 
 
 @bp_reports.route('/api/slops', methods=['POST'])
@@ -309,15 +529,18 @@ def create_slop():
     guest_id = _request_guest_id()
     if (not rep.user_id and not rep.guest_id) or (rep.user_id and rep.user_id != current_user_id) or  (not rep.user_id and rep.guest_id and rep.guest_id != guest_id):
         abort(403)
-    ok, reason = _enforce_quota(current_user_id, kind='video')
-    if not ok:
-        return jsonify({'error': reason, 'upgrade_required': True}), 402
-    meta = json.loads(sug.meta_json) if sug.meta_json else {}
-    concept = sug.text
-    instructions_json = json.dumps(meta.get('instructions') or {})
-    sl = Slop.create(report_id=rep.id, suggestion_id=sug.id, concept=concept, instructions_json=instructions_json)
-    q.enqueue('workers.generate_slop', sl.id, job_timeout='30m')
-    return jsonify({'slop_id': sl.id, 'status': sl.status}), 200
+
+    def create():
+        ok, reason = _enforce_quota(current_user_id, kind='video')
+        if not ok:
+            return {'error': reason, 'upgrade_required': True}, 402, None
+        meta = sug.meta_json or {}
+        concept = sug.text
+        sl = Slop.create(report_id=rep.id, suggestion_id=sug.id, concept=concept, instructions=meta.get('instructions') or {})
+        enqueue_job('workers.generate_slop', sl.id, job_id=sl.id)
+        return {'slop_id': sl.id, 'status': sl.status}, 200, sl.id
+
+    return _submit_once(_submission('create_slop', current_user_id, sug.id), create)
 
 
 @bp_reports.route('/api/slops/<sid>', methods=['GET'])
@@ -367,17 +590,20 @@ def create_meme():
     guest_id = _request_guest_id()
     if (not rep.user_id and not rep.guest_id) or (rep.user_id and rep.user_id != current_user_id) or  (not rep.user_id and rep.guest_id and rep.guest_id != guest_id):
         abort(403)
-    # reuse article quota for meme generation to keep it simple
-    ok, reason = _enforce_quota(current_user_id, kind='article')
-    if not ok:
-        return jsonify({'error': reason, 'upgrade_required': True}), 402
-    meta = json.loads(sug.meta_json) if sug.meta_json else {}
-    concept = sug.text
-    instructions_json = json.dumps(meta.get('instructions') or {})
-    mem = Meme.create(report_id=rep.id, suggestion_id=sug.id, concept=concept, instructions_json=instructions_json)
-    # enqueue meme generation
-    q.enqueue('workers.generate_meme', mem.id, job_timeout='10m')
-    return jsonify({'meme_id': mem.id, 'status': mem.status}), 200
+
+    def create():
+        # reuse article quota for meme generation to keep it simple
+        ok, reason = _enforce_quota(current_user_id, kind='article')
+        if not ok:
+            return {'error': reason, 'upgrade_required': True}, 402, None
+        meta = sug.meta_json or {}
+        concept = sug.text
+        mem = Meme.create(report_id=rep.id, suggestion_id=sug.id, concept=concept, instructions=meta.get('instructions') or {})
+        # enqueue meme generation
+        enqueue_job('workers.generate_meme', mem.id, job_id=mem.id)
+        return {'meme_id': mem.id, 'status': mem.status}, 200, mem.id
+
+    return _submit_once(_submission('create_meme', current_user_id, sug.id), create)
 
 
 @bp_reports.route('/api/memes/<mid>', methods=['GET'])
@@ -453,6 +679,70 @@ def get_article(aid):
     }), 200
 
 
+# Kinds accepted by the batch job-status endpoint
+JOB_STATUS_MODELS = {'memes': Meme, 'slops': Slop, 'articles': Article}
+# Per-request bounds: ids per kind and seconds a long-poll may block
+MAX_JOB_STATUS_IDS = 100
+MAX_JOB_STATUS_WAIT = 25
+
+
+def _job_statuses(requested: dict, current_user_id, guest_id) -> dict:
+    """Status/error of the requested ids, one IN query per kind; ids not found or not owned are omitted."""
+    out = {}
+    for kind, model in JOB_STATUS_MODELS.items():
+        out[kind] = {}
+        ids = requested.get(kind)
+        if not ids:
+            continue
+        rows = (db.session.query(model.id, model.status, model.error_message, Report.user_id, Report.guest_id)
+                .join(Report, model.report_id == Report.id)
+                .filter(model.id.in_(ids)).all())
+        for job_id, status, error, owner_id, owner_guest_id in rows:
+            if (not owner_id and not owner_guest_id) or (owner_id and owner_id != current_user_id) or (not owner_id and owner_guest_id and owner_guest_id != guest_id):
+                continue
+            out[kind][job_id] = {'status': status, 'error': error}
+    return out
+
+
+@bp_reports.route('/api/jobs/status', methods=['POST'])
+@jwt_required()
+def jobs_status():
+    """Batch status of meme/slop/article jobs.
+
+    Body: {"memes": [...], "slops": [...], "articles": [...], "wait": seconds}.
+    With wait > 0 and every found job still generating, the request blocks until
+    one of them changes or wait elapses.
+    """
+    from pubsub_utils import job_channel, subscription, next_message
+    data = request.get_json(force=True, silent=True) or {}
+    requested = {}
+    for kind in JOB_STATUS_MODELS:
+        ids = data.get(kind) or []
+        if not isinstance(ids, list):
+            abort(400, f'{kind} must be a list of ids')
+        requested[kind] = list(dict.fromkeys(str(i) for i in ids if i))[:MAX_JOB_STATUS_IDS]
+    try:
+        wait = min(max(float(data.get('wait') or 0), 0.0), MAX_JOB_STATUS_WAIT)
+    except (TypeError, ValueError):
+        abort(400, 'wait must be a number of seconds')
+    current_user_id = get_jwt_identity()
+    guest_id = _request_guest_id()
+
+    if not wait or not any(requested.values()):
+        return jsonify(_job_statuses(requested, current_user_id, guest_id)), 200
+    channels = [job_channel(kind, i) for kind, ids in requested.items() for i in ids]
+    with subscription(channels) as ps:
+        result = _job_statuses(requested, current_user_id, guest_id)
+        pending = any(v['status'] == 'generating' for items in result.values() for v in items.values())
+        settled = any(v['status'] != 'generating' for items in result.values() for v in items.values())
+        if pending and not settled:
+            # Release the connection while blocked; the re-query checks out a fresh one
+            db.session.remove()
+            if next_message(ps, wait) is not None:
+                result = _job_statuses(requested, current_user_id, guest_id)
+    return jsonify(result), 200
+
+
 @bp_reports.route('/api/articles/<aid>', methods=['PUT'])
 @jwt_required()
 def update_article(aid):
@@ -500,21 +790,9 @@ def merge_guest_reports():
     if not guest_id:
         abort(400, 'guest_id required')
     uid = get_jwt_identity()
-    # move products
-    from models.product import Product
-    from models.report import Report
-    products = Product.query.filter_by(guest_id=guest_id).all()
-    for p in products:
-        p.user_id = uid
-        p.guest_id = None
-        db.session.add(p)
-    reports = Report.query.filter_by(guest_id=guest_id).all()
-    for r in reports:
-        r.user_id = uid
-        r.guest_id = None
-        db.session.add(r)
-    db.session.commit()
-    return jsonify({'merged': True}), 200
+    # An explicit merge request always runs; list_products relies on the marker
+    counts = guest_merge.merge_guest_into_user(guest_id, uid, force=True)
+    return jsonify({'merged': True, 'products': counts['products'], 'reports': counts['reports']}), 200
 
 
 @bp_reports.route('/api/me/limits', methods=['GET'])
@@ -538,25 +816,9 @@ def list_products():
     current_user = _current_user_or_none()
     guest_id = _request_guest_id()
     # If user is logged in and a guest_id is provided, merge guest-owned items into the user
+    # (bulk UPDATEs, skipped entirely once this guest has been merged into this user)
     if current_user and guest_id:
-        uid = current_user.id
-        # Move products
-        guest_products = Product.query.filter_by(guest_id=guest_id).all()
-        changed = False
-        for p in guest_products:
-            p.user_id = uid
-            p.guest_id = None
-            db.session.add(p)
-            changed = True
-        # Move reports
-        guest_reports = Report.query.filter_by(guest_id=guest_id).all()
-        for r in guest_reports:
-            r.user_id = uid
-            r.guest_id = None
-            db.session.add(r)
-            changed = True
-        if changed:
-            db.session.commit()
+        guest_merge.merge_guest_into_user(guest_id, current_user.id)
 
     q = None
     if current_user:
@@ -598,6 +860,8 @@ def create_product():
     guest_id = _request_guest_id()
     user_id = current_user.id if current_user else None
     prod = Product.create(name=name, description=desc, user_id=user_id, guest_id=(None if user_id else guest_id))
+    if not user_id:
+        guest_merge.forget(guest_id)
     return jsonify({
         'id': prod.id,
         'name': prod.name,
@@ -623,15 +887,22 @@ def _ensure_product_access(pid: str):
 def initiate_feed_for_product(pid):
     """Create a new feed (report) for an existing product."""
     p, user_id, guest_id = _ensure_product_access(pid)
-    # Visibility cutoff: default 5 for guests, else from plan (simplified)
-    if user_id:
-        ok, reason = _enforce_quota(user_id, kind='content')
-        if not ok:
-            return jsonify({'error': reason, 'upgrade_required': True}), 402
-    visibility_cutoff = 5
-    rep = Report.create(product_id=p.id, user_id=user_id, guest_id=guest_id, visibility_cutoff=visibility_cutoff)
-    q.enqueue('workers.generate_report', rep.id, job_timeout='30m')
-    return jsonify({'report_id': rep.id}), 200
+
+    def create():
+        # Visibility cutoff: default 5 for guests, else from plan (simplified)
+        if user_id:
+            ok, reason = _enforce_quota(user_id, kind='content')
+            if not ok:
+                return {'error': reason, 'upgrade_required': True}, 402, None
+        visibility_cutoff = 5
+        rep = Report.create(product_id=p.id, user_id=user_id, guest_id=guest_id, visibility_cutoff=visibility_cutoff,
+                            pipeline_profile=pipeline_profiles.profile_name_for(user_id))
+        if not user_id:
+            guest_merge.forget(guest_id)
+        enqueue_job('workers.generate_report', rep.id, job_id=rep.id)
+        return {'report_id': rep.id}, 200, rep.id
+
+    return _submit_once(_submission('initiate_feed', user_id or guest_id, p.id), create)
 
 
 @bp_reports.route('/api/products/<pid>/feeds', methods=['GET'])
@@ -729,6 +1000,7 @@ def stripe_webhook():
             sub.plan_id = plan_id_hint
         db.session.add(sub)
         db.session.commit()
+        user_cache.invalidate(sub.user_id)
 
     if et in ('checkout.session.completed', 'customer.subscription.created', 'customer.subscription.updated'):
         # Extract fields
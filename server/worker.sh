@@ -1 +1,7 @@
-DISABLE_GEVENT_PATCH=1 rq worker content_dreamer --with-scheduler
\ No newline at end of file
+#!/bin/bash
+# Usage: ./worker.sh [reports|media_fast|media_video]
+# Queue order per pool lives in queue_util.WORKER_POOLS; sizes come from WORKER_POOL_<POOL>.
+export DISABLE_GEVENT_PATCH=1
+POOL=${1:-reports}
+ARGS=$(python -c "import sys, queue_util; print(queue_util.pool_args(sys.argv[1]))" "$POOL") || exit 1
+exec rq worker-pool $ARGS
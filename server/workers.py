@@ -5,578 +5,790 @@ from models.suggestion import Suggestion
 from models.article import Article
 from models.product import Product
 from openai_utils import get_reply_json, generate_image_base64
-from config import logger, serpapi_key, rapidapi_key, enable_twitter, enable_medium
+from config import logger, serpapi_key, rapidapi_key, enable_twitter, enable_medium, enable_keyword_expansion, stream_articles, article_checkpoint_seconds
+from socketio_utils import emit_to_user
+from pubsub_utils import publish_job_status
 import json
-from clients.twitter_client import TwitterClient, TweetSummary
-from clients.medium_client import MediumClient
+from clients.twitter_client import TwitterClient, TweetSummary, TwitterSearchResult
+from clients.medium_client import MediumClient, MediumArticle
 from clients.serp_client import SerpApiClient, TechNewsArticle
 from clients.thinking_client import ThinkingClient
+from context_utils import build_tweet_context
+from dedup import SuggestionDeduper
+from tweet_ranking import top_tweets
+from novelty import NoveltyIndex, record_report as record_novelty
+from pipeline_profiles import PipelineProfile, get_profile, profile_name_for, needs_topup
 import random
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import asdict, dataclass, field
 from models.meme import Meme
 from models.slop import Slop
 from clients.gemini_client import GeminiClient, VideoResult
 
 
+# Minimum seconds between streamed article chunks pushed over Socket.IO
+ARTICLE_EMIT_INTERVAL = 0.25
+# witty_reply calls allowed per wanted reply before top_replies_for stops trying
+REPLY_ATTEMPTS_PER_SLOT = 2
+
+
 def _app_context():
     from app import create_app
     app = create_app()
     return app.app_context()
 
 
-def generate_report(report_id: str):
-    with _app_context():
-        rep: Report | None = Report.query.get(report_id)
-        if not rep:
-            logger.error(f"Report {report_id} not found")
+# Steps whose payloads hold a report's sources, read back by topup_report
+SOURCE_STEPS = ('initial_keywords', 'serpapi_expand', 'twitter_trends_and_tweets',
+                'medium_tags_and_articles', 'tech_news_articles', 'topup_sources')
+# Steps whose payloads hold the cumulative per-source request counts ("generated")
+GENERATION_STEPS = ('dedupe_suggestions', 'topup_suggestions')
+
+
+@dataclass
+class ReportSources:
+    """What a report's suggestions are written about; the pools keep unused candidates for top-ups."""
+    prospect_keywords: List[str] = field(default_factory=list)
+    expanded_group2: List[str] = field(default_factory=list)
+    topics: List[str] = field(default_factory=list)
+    tweets_by_topic: Dict[str, TwitterSearchResult] = field(default_factory=dict)
+    tweets_by_kw_g1: Dict[str, TwitterSearchResult] = field(default_factory=dict)
+    tweets_by_kw_g2: Dict[str, TwitterSearchResult] = field(default_factory=dict)
+    medium_tags: List[str] = field(default_factory=list)
+    trending_by_tag: Dict[str, List[MediumArticle]] = field(default_factory=dict)
+    tech_news: List[TechNewsArticle] = field(default_factory=list)
+    group1_pool: List[str] = field(default_factory=list)
+    group2_pool: List[str] = field(default_factory=list)
+    topic_pool: List[str] = field(default_factory=list)
+    tag_pool: List[str] = field(default_factory=list)
+
+    def merge(self, other: 'ReportSources'):
+        self.prospect_keywords += other.prospect_keywords
+        self.expanded_group2 += other.expanded_group2
+        self.topics += other.topics
+        self.tweets_by_topic.update(other.tweets_by_topic)
+        self.tweets_by_kw_g1.update(other.tweets_by_kw_g1)
+        self.tweets_by_kw_g2.update(other.tweets_by_kw_g2)
+        self.medium_tags += other.medium_tags
+        self.trending_by_tag.update(other.trending_by_tag)
+        self.tech_news += other.tech_news
+        self.tag_pool = self.tag_pool or other.tag_pool
+        # An expanded pool from a top-up replaces the raw LLM group2 list
+        self.group2_pool = other.group2_pool or self.group2_pool
+
+    def to_payload(self) -> dict:
+        """Payload of a topup_sources step (see _load_sources)."""
+        return {
+            "prospect_keywords": self.prospect_keywords,
+            "expanded_group2": self.expanded_group2,
+            "trends": self.topics,
+            "by_trend": {k: v.to_dict() for k, v in self.tweets_by_topic.items()},
+            "g1": {k: v.to_dict() for k, v in self.tweets_by_kw_g1.items()},
+            "g2": {k: v.to_dict() for k, v in self.tweets_by_kw_g2.items()},
+            "tags": self.medium_tags,
+            "tag_pool": self.tag_pool,
+            "group2_pool": self.group2_pool,
+            "articles": {k: [asdict(a) for a in v] for k, v in self.trending_by_tag.items()},
+            "tech_news": [asdict(a) for a in self.tech_news],
+        }
+
+
+def _search_tweets(tw: TwitterClient, queries: List[str], into: Dict[str, TwitterSearchResult]):
+    for q in queries:
+        if q not in into:
+            into[q] = tw.search(q, count=5)
+
+
+def _medium_tag_pool(md: MediumClient, thinker: ThinkingClient, product: Product):
+    """(local shortlist, LLM-filtered tags) for a product."""
+    # Shortlist tags locally from the tag index, then let the LLM pick from the few closest
+    shortlist = md.shortlist_tags(f"{product.name} {product.description or ''}", limit=20)
+    return shortlist, (thinker.filter_keywords(product.name, product.description or "", shortlist, limit=5) if shortlist else [])
+
+
+def _expand_group2(product: Product, thinker: ThinkingClient, pool: List[str]):
+    """(SerpAPI-expanded count, LLM-filtered keywords) for a raw group2 pool."""
+    sa = SerpApiClient(api_key=serpapi_key)
+    expanded = sa.expand_keywords(pool, limit=100, per_kw_limit=10)
+    return len(expanded), thinker.filter_keywords(product.name, product.description or "", expanded, limit=5)
+
+
+def _gather_sources(rep: Report, product: Product, thinker: ThinkingClient, profile: PipelineProfile) -> ReportSources:
+    src = ReportSources()
+
+    # Step 1: initial keyword groups via LLM
+    s1 = ReportStep.start(rep.id, 'initial_keywords')
+    resp = thinker.initial_keywords(product.name, product.description or "")
+    src.group1_pool = list(resp.get('group1') or [])
+    src.prospect_keywords = random.sample(src.group1_pool, min(profile.g1_keywords, len(src.group1_pool)))
+    s1.done({**resp, "prospect_keywords": src.prospect_keywords})
+
+    # Step 2: Expand group2 with SerpAPI autocomplete
+    src.group2_pool = list(resp.get('group2') or [])
+    src.expanded_group2 = src.group2_pool[:profile.g2_keywords]
+    s2 = ReportStep.start(rep.id, 'serpapi_expand')
+    try:
+        if serpapi_key:
+            expanded_group2 = src.group2_pool
+            expanded_count = len(expanded_group2)
+            if enable_keyword_expansion and profile.expand_keywords and expanded_group2:
+                expanded_count, expanded_group2 = _expand_group2(product, thinker, expanded_group2)
+            src.group2_pool = expanded_group2
+            src.expanded_group2 = random.sample(expanded_group2, min(profile.g2_keywords, len(expanded_group2)))
+            s2.done({"expanded_group2": src.expanded_group2, "pool": src.group2_pool, "expanded_count": expanded_count})
+        else:
+            s2.done({"warning": "SERPAPI_KEY missing", "expanded_group2": src.expanded_group2, "pool": src.group2_pool})
+    except Exception as e:
+        # Ensure we clear failed state before attempting to persist failure
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        s2.fail(str(e))
+
+    # Step 3-4: Twitter via RapidAPI (twttr)
+    s3 = ReportStep.start(rep.id, 'twitter_trends_and_tweets')
+    try:
+        if enable_twitter and rapidapi_key:
+            tw = TwitterClient(api_key=rapidapi_key)
+            if profile.topics:
+                trend_names = tw.get_trending_topics(limit=30)
+                # Filter topics with LLM for relevance
+                src.topic_pool = thinker.filter_topics(product.name, product.description or "", trend_names, limit=10)
+                if not src.topic_pool:
+                    # take random trends if filtering finds nothing relevant
+                    src.topic_pool = random.sample(trend_names, min(profile.topics, len(trend_names)))
+                src.topics = random.sample(src.topic_pool, min(profile.topics, len(src.topic_pool)))
+            _search_tweets(tw, src.topics, src.tweets_by_topic)
+            _search_tweets(tw, src.prospect_keywords, src.tweets_by_kw_g1)
+            _search_tweets(tw, src.expanded_group2, src.tweets_by_kw_g2)
+            # Full search results; the step payload is compressed and spills to a file when large
+            payload = {
+                "trends": src.topics,
+                "topic_pool": src.topic_pool,
+                "by_trend": {k: v.to_dict() for k, v in src.tweets_by_topic.items()},
+                "g1": {k: v.to_dict() for k, v in src.tweets_by_kw_g1.items()},
+                "g2": {k: v.to_dict() for k, v in src.tweets_by_kw_g2.items()},
+            }
+            s3.done(payload)
+        else:
+            s3.done({"warning": "Twitter disabled or RAPIDAPI_KEY missing"})
+    except Exception as e:
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        s3.fail(str(e))
+
+    # Step 5: Medium tags and trending articles via RapidAPI
+    s5 = ReportStep.start(rep.id, 'medium_tags_and_articles')
+    try:
+        if not profile.medium_tags:
+            s5.done({"skipped": f"'{profile.name}' profile"})
+        elif enable_medium and rapidapi_key:
+            md = MediumClient(api_key=rapidapi_key)
+            shortlist, src.tag_pool = _medium_tag_pool(md, thinker, product)
+            src.medium_tags = random.sample(src.tag_pool, min(profile.medium_tags, len(src.tag_pool)))
+            # Fetch trending articles per tag
+            for tg in src.medium_tags:
+                src.trending_by_tag[tg] = md.get_trending_articles(tg, limit=2)
+            s5.done({"shortlist": shortlist, "tags": src.medium_tags, "pool": src.tag_pool,
+                     "articles": {k: [asdict(a) for a in v] for k, v in src.trending_by_tag.items()}})
+        else:
+            s5.done({"warning": "Medium disabled or RAPIDAPI_KEY missing"})
+    except Exception as e:
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        s5.fail(str(e))
+
+    s6 = ReportStep.start(rep.id, 'tech_news_articles')
+    try:
+        if profile.tech_news:
+            src.tech_news = SerpApiClient().get_top_tech_news(limit=profile.tech_news)
+        s6.done({"articles": [asdict(article) for article in src.tech_news]})
+    except Exception as e:
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        s6.fail(str(e))
+    return src
+
+
+def _load_sources(rep: Report) -> ReportSources:
+    """Rebuild a report's sources from the payloads of its finished source steps."""
+    src = ReportSources()
+    steps = (ReportStep.query
+             .filter(ReportStep.report_id == rep.id, ReportStep.step_name.in_(SOURCE_STEPS), ReportStep.status == 'done')
+             .order_by(ReportStep.started_at.asc()).all())
+
+    def searches(d) -> Dict[str, TwitterSearchResult]:
+        return {k: TwitterSearchResult.from_dict(v) for k, v in (d or {}).items()}
+
+    def articles(d) -> Dict[str, List[MediumArticle]]:
+        return {k: [MediumArticle(**a) for a in v] for k, v in (d or {}).items()}
+
+    for st in steps:
+        p = st.payload or {}
+        if st.step_name == 'initial_keywords':
+            src.group1_pool = list(p.get('group1') or [])
+            src.group2_pool = list(p.get('group2') or [])
+            src.prospect_keywords = list(p.get('prospect_keywords') or [])
+        elif st.step_name == 'serpapi_expand':
+            src.expanded_group2 = list(p.get('expanded_group2') or [])
+            src.group2_pool = list(p.get('pool') or src.group2_pool)
+        elif st.step_name == 'twitter_trends_and_tweets':
+            src.topics = list(p.get('trends') or [])
+            src.topic_pool = list(p.get('topic_pool') or src.topics)
+            src.tweets_by_topic = searches(p.get('by_trend'))
+            src.tweets_by_kw_g1 = searches(p.get('g1'))
+            src.tweets_by_kw_g2 = searches(p.get('g2'))
+        elif st.step_name == 'medium_tags_and_articles':
+            src.medium_tags = list(p.get('tags') or [])
+            src.tag_pool = list(p.get('pool') or src.medium_tags)
+            src.trending_by_tag = articles(p.get('articles'))
+        elif st.step_name == 'tech_news_articles':
+            src.tech_news = [TechNewsArticle(**a) for a in p.get('articles') or []]
+        else:
+            src.merge(ReportSources(
+                prospect_keywords=list(p.get('prospect_keywords') or []),
+                expanded_group2=list(p.get('expanded_group2') or []),
+                topics=list(p.get('trends') or []),
+                tweets_by_topic=searches(p.get('by_trend')),
+                tweets_by_kw_g1=searches(p.get('g1')),
+                tweets_by_kw_g2=searches(p.get('g2')),
+                medium_tags=list(p.get('tags') or []),
+                trending_by_tag=articles(p.get('articles')),
+                tech_news=[TechNewsArticle(**a) for a in p.get('tech_news') or []],
+                tag_pool=list(p.get('tag_pool') or []),
+                group2_pool=list(p.get('group2_pool') or []),
+            ))
+    return src
+
+
+def _load_generated(rep: Report) -> Dict[str, int]:
+    """Per-source request counts of a report's latest generation run."""
+    st = (ReportStep.query
+          .filter(ReportStep.report_id == rep.id, ReportStep.step_name.in_(GENERATION_STEPS), ReportStep.status == 'done')
+          .order_by(ReportStep.started_at.desc()).first())
+    return dict((st.payload or {}).get('generated') or {}) if st else {}
+
+
+def _extend_sources(src: ReportSources, product: Product, thinker: ThinkingClient, profile: PipelineProfile,
+                    source_profile: PipelineProfile) -> ReportSources:
+    """Add sources from the stored candidate pools up to the profile's counts; returns what was added."""
+    def more(chosen: List[str], pool: List[str], n: int) -> List[str]:
+        return [x for x in pool if x not in chosen][:max(0, n - len(chosen))]
+
+    added = ReportSources()
+    added.prospect_keywords = more(src.prospect_keywords, src.group1_pool, profile.g1_keywords)
+    g2_pool = src.group2_pool
+    if (len(src.expanded_group2) < profile.g2_keywords and profile.expand_keywords and not source_profile.expand_keywords
+            and enable_keyword_expansion and serpapi_key and g2_pool):
+        # The report skipped expansion (guest profile); expand now so new group2 keywords match a full run's
+        _, added.group2_pool = _expand_group2(product, thinker, g2_pool)
+        g2_pool = added.group2_pool or g2_pool
+    added.expanded_group2 = more(src.expanded_group2, g2_pool, profile.g2_keywords)
+    added.topics = more(src.topics, src.topic_pool, profile.topics)
+    if enable_twitter and rapidapi_key and (added.topics or added.prospect_keywords or added.expanded_group2):
+        tw = TwitterClient(api_key=rapidapi_key)
+        _search_tweets(tw, added.topics, added.tweets_by_topic)
+        _search_tweets(tw, added.prospect_keywords, added.tweets_by_kw_g1)
+        _search_tweets(tw, added.expanded_group2, added.tweets_by_kw_g2)
+    if enable_medium and rapidapi_key and len(src.medium_tags) < profile.medium_tags:
+        md = MediumClient(api_key=rapidapi_key)
+        if not src.tag_pool:
+            # Lighter profiles skip Medium entirely, so there is no pool yet
+            _, added.tag_pool = _medium_tag_pool(md, thinker, product)
+        added.medium_tags = more(src.medium_tags, src.tag_pool or added.tag_pool, profile.medium_tags)
+        for tg in added.medium_tags:
+            added.trending_by_tag[tg] = md.get_trending_articles(tg, limit=2)
+    if len(src.tech_news) < profile.tech_news:
+        seen = {a.link for a in src.tech_news}
+        fresh = [a for a in SerpApiClient().get_top_tech_news(limit=profile.tech_news) if a.link not in seen]
+        added.tech_news = fresh[:profile.tech_news - len(src.tech_news)]
+    src.merge(added)
+    return added
+
+
+def _generate_suggestions(rep: Report, product: Product, thinker: ThinkingClient, novelty: NoveltyIndex,
+                          src: ReportSources, profile: PipelineProfile,
+                          deduper: Optional[SuggestionDeduper] = None, generated: Optional[Dict[str, int]] = None) -> dict:
+    """Write suggestions for every source up to the profile's per-source counts.
+
+    `generated` holds how many items earlier runs already requested per source
+    (a top-up only asks for the rest); the returned payload carries the updated
+    counts under "generated".
+    """
+    # Near-duplicates (per kind) are dropped before insert; counts go in the dedupe step payload
+    deduper = deduper or SuggestionDeduper()
+    not_novel: Dict[str, int] = {}
+    ledger: Dict[str, int] = dict(generated or {})
+    cap = (rep.visibility_cutoff or 5) + profile.buffer if profile.buffer is not None else None
+    stored = 0
+
+    def remaining(key: str, n: int) -> Tuple[int, int]:
+        """(already requested, still to request) for a source; nothing more once the cap is reached."""
+        done = ledger.get(key, 0)
+        if cap is not None and stored >= cap:
+            return done, 0
+        return done, max(0, n - done)
+
+    def admit(kind: str, text: Optional[str]) -> bool:
+        if not text:
+            return False
+        if not novelty.is_novel(kind, text):
+            not_novel[kind] = not_novel.get(kind, 0) + 1
+            return False
+        return deduper.admit(kind, text)
+
+    # Helper to add suggestion safely
+    def add_suggestion(kind: str, text, source_type, visibility='subscriber', rank=0.0, meta=None):
+        nonlocal stored
+        if not admit(kind, text):
             return
         try:
-            rep.mark_running()
-
-            # Step 1: initial keyword groups via LLM
-            s1 = ReportStep.start(rep.id, 'initial_keywords')
-            product = rep.product
-            thinker = ThinkingClient(user=getattr(product, 'user', None))
-            resp = thinker.initial_keywords(product.name, product.description or "")
-            s1.done(json.dumps(resp))
-            prospect_keywords = random.sample(resp.get('group1') or [], min(2, len(resp.get('group1') or [])))
-
-            # Step 2: Expand group2 with SerpAPI autocomplete
-            expanded_group2 = list(resp.get('group2') or [])
-            s2 = ReportStep.start(rep.id, 'serpapi_expand')
+            Suggestion.add(rep.id, source_type, kind, text, rank, meta or {}, visibility)
+            stored += 1
+        except Exception as e:
+            logger.error(f"add {kind} failed: {e}")
+
+    def top_replies_for(items, k, source_key, source_label=None):
+        """Reply to the k best-scoring tweets (see tweet_ranking); rank follows the tweet score."""
+        candidates = []
+        attempts = 0
+        for score, tw in top_tweets(items or [], len(items or [])):
+            # Failed or empty replies still cost an LLM call; give up after REPLY_ATTEMPTS_PER_SLOT per slot
+            if len(candidates) >= k or attempts >= k * REPLY_ATTEMPTS_PER_SLOT:
+                break
             try:
-                if serpapi_key:
-                    # sa = SerpApiClient(api_key=serpapi_key)
-                    # expanded_group2 = sa.expand_keywords(expanded_group2, limit=100, per_kw_limit=10)
-                    # expanded_group2 = thinker.filter_keywords(product.name, product.description or "", expanded_group2, limit=5)
-                    # take random 2
-                    if len(expanded_group2) >= 2:
-                        expanded_group2 = random.sample(expanded_group2, 2)
-                    s2.done(json.dumps({"expanded_group2": expanded_group2}))
-                else:
-                    s2.done(json.dumps({"warning": "SERPAPI_KEY missing", "expanded_group2": expanded_group2}))
-            except Exception as e:
-                # Ensure we clear failed state before attempting to persist failure
-                try:
-                    db.session.rollback()
-                except Exception:
-                    pass
-                s2.fail(str(e))
-
-            # Step 3-4: Twitter via RapidAPI (twttr)
-            topics = []
-            tweets_by_topic = {}
-            tweets_by_kw_g1 = {}
-            tweets_by_kw_g2 = {}
-            s3 = ReportStep.start(rep.id, 'twitter_trends_and_tweets')
+                base_text = getattr(tw, 'text', None) or (tw.get('text') if isinstance(tw, dict) else None)
+                # Skip tweets already replied to in this report (same tweet under several searches, retweets)
+                if not base_text or not deduper.admit('source_tweet', base_text):
+                    continue
+                attempts += 1
+                rep_text = thinker.witty_reply(product.name, product.description or "", base_text)
+                if rep_text:
+                    candidates.append((score, rep_text, tw))
+            except Exception:
+                continue
+        for score, r, tw in candidates:
+            # Build meta with original tweet details
             try:
-                if enable_twitter and rapidapi_key:
-                    tw = TwitterClient(api_key=rapidapi_key)
-                    trend_names = tw.get_trending_topics(limit=30)
-                    # expanded_trends = sa.expand_keywords(trend_names, limit=100, per_kw_limit=5) if serpapi_key else trend_names
-                    expanded_trends = trend_names
-                    
-                    # Filter topics with LLM for relevance
-                    topics = thinker.filter_topics(product.name, product.description or "", expanded_trends, limit=10)
-                    if len(topics) == 0:
-                        # take 2 random trends if expansion fails
-                        topics = random.sample(trend_names, min(2, len(trend_names)))
-                    if len(topics) >= 3:
-                        # take random 3 if too many
-                        topics = random.sample(topics, 2)
-                    # Fetch tweets for each topic
-                    for tp in topics:
-                        res = tw.search(tp, count=5)
-                        tweets_by_topic[tp] = res
-                    # Fetch tweets for kw group1
-                    for kw in (prospect_keywords or [])[:15]:
-                        res = tw.search(kw, count=5)
-                        tweets_by_kw_g1[kw] = res
-                    # Fetch tweets for kw group2 (expanded)
-                    for kw in expanded_group2[:20]:
-                        res = tw.search(kw, count=5)
-                        tweets_by_kw_g2[kw] = res
-                    # Keep payload compact to avoid exceeding DB TEXT limits
-                    def pack_res(r):
-                        try:
-                            topc = len(r.top or [])
-                            latc = len(r.latest or [])
-                            sample = (r.top[0].text if (r.top or []) else ((r.latest or [None])[0].text if (r.latest or []) else None))
-                            if sample:
-                                sample = sample[:200]
-                            return {"top_count": topc, "latest_count": latc, "sample": sample}
-                        except Exception:
-                            return {"top_count": 0, "latest_count": 0, "sample": None}
-                    payload = {
-                        "trends": topics,
-                        "by_trend": {k: pack_res(v) for k, v in tweets_by_topic.items()},
-                        "g1": {k: pack_res(v) for k, v in tweets_by_kw_g1.items()},
-                        "g2": {k: pack_res(v) for k, v in tweets_by_kw_g2.items()},
+                if hasattr(tw, 'to_dict'):
+                    st = tw.to_dict()
+                elif isinstance(tw, TweetSummary):
+                    st = {
+                        "text": tw.text,
+                        "user_name": tw.user_name,
+                        "like_count": tw.like_count,
+                        "retweet_count": tw.retweet_count,
+                        "reply_count": tw.reply_count,
                     }
-                    s3.done(json.dumps(payload))
+                elif isinstance(tw, dict):
+                    st = tw
                 else:
-                    s3.done(json.dumps({"warning": "Twitter disabled or RAPIDAPI_KEY missing"}))
-            except Exception as e:
-                try:
-                    db.session.rollback()
-                except Exception:
-                    pass
-                s3.fail(str(e))
-
-            # Step 5: Medium tags and trending articles via RapidAPI
-            medium_tags = []
-            trending_by_tag = {}
-            # s5 = ReportStep.start(rep.id, 'medium_tags_and_articles')
-            # try:
-            #     if enable_medium and rapidapi_key:
-            #         md = MediumClient(api_key=rapidapi_key)
-            #         # Select relevant tags via LLM using thinking client
-            #         medium_tags = md.get_all_available_tags(limit=200)
-            #         medium_tags = thinker.filter_keywords(product.name, product.description or "", medium_tags, limit=20)
-            #         if len(medium_tags) >= 2:
-            #             medium_tags = random.sample(medium_tags, 2)
-            #         # Fetch trending articles per tag
-            #         for tg in medium_tags:
-            #             trending_by_tag[tg] = md.get_trending_articles(tg, limit=2)
-            #         s5.done(json.dumps({"tags": medium_tags, "counts": {k: len(v) for k, v in trending_by_tag.items()}}))
-            #     else:
-            #         s5.done(json.dumps({"warning": "Medium disabled or RAPIDAPI_KEY missing"}))
-            # except Exception as e:
-            #     try:
-            #         db.session.rollback()
-            #     except Exception:
-            #         pass
-            #     s5.fail(str(e))
-
-            s6 = ReportStep.start(rep.id, 'tech_news_articles')
-            tech_news: List[TechNewsArticle] = []
-            try:
-                serp = SerpApiClient()
-                tech_news = serp.get_top_tech_news(limit=2)
-                s6.done(json.dumps({"articles": [article.title for article in tech_news]}))
-            except Exception as e:
-                try:
-                    db.session.rollback()
-                except Exception:
-                    pass
-                s6.fail(str(e))
+                    st = {"text": getattr(tw, 'text', None)}
+            except Exception:
+                st = {"text": getattr(tw, 'text', None)}
+            add_suggestion(
+                'tweet_reply',
+                r,
+                source_key,
+                'subscriber',
+                round(score, 3),
+                {
+                    "reason": f"Reply crafted for a tweet under '{source_label}'" if source_label else f"Reply crafted for a tweet",
+                    "source_label": source_label,
+                    "source_tweet": st,
+                },
+            )
+
+    def replies(source_key: str, label: str, ctx: Optional[TwitterSearchResult], k: int):
+        key = f"{source_key}_replies:{label}"
+        done, want = remaining(key, k)
+        if ctx and want:
+            top_replies_for((ctx.top or []) + (ctx.latest or []), want, source_key, label)
+            ledger[key] = done + want
+
+    # Memes, slops and tweets: the first item per source is guest-visible where noted
+    # 7b. Meme concepts per trending topic
+    for tp in src.topics:
+        key = f"topic_memes:{tp}"
+        done, want = remaining(key, profile.memes_per_topic)
+        if not want:
+            continue
+        try:
+            context = build_tweet_context(src.tweets_by_topic.get(tp), thinker.context_budget('meme_ideas_from_twitter'))
+            memes = thinker.meme_ideas_from_twitter(product.name, product.description or "", tp, context, n=want)
+            ledger[key] = done + want
+            for i, m in enumerate(memes, done):
+                add_suggestion(
+                    'meme_concept',
+                    m.get('concept') or 'Meme idea',
+                    'trending_topic',
+                    'guest' if i < 1 else 'subscriber',
+                    rank=0.55 - i*0.05,
+                    meta={
+                        "topic": tp,
+                        "instructions": m.get('instructions'),
+                        "reason": f"Meme idea based on trending topic '{tp}'",
+                    }
+                )
+        except Exception as e:
+            logger.error(e)
+
+    # meme concepts from tech news articles
+    for tn in src.tech_news:
+        key = f"news_memes:{tn.link}"
+        done, want = remaining(key, profile.memes_per_news)
+        if not want:
+            continue
+        try:
+            memes = thinker.meme_ideas_from_medium(product.name, product.description or "", tn.title or "", tn.summary or "", n=want)
+            ledger[key] = done + want
+            for m in memes:
+                add_suggestion(
+                    'meme_concept',
+                    m.get('concept') or 'Meme idea',
+                    'tech_news',
+                    'subscriber',
+                    rank=0.5,
+                    meta={
+                        "title": tn.title,
+                        "link": tn.link,
+                        "instructions": m.get('instructions'),
+                        "reason": f"Meme idea inspired by tech news '{tn.title}'",
+                    }
+                )
+        except Exception as e:
+            logger.error(e)
+
+    # Top replies for group1 keywords
+    for kw in src.prospect_keywords:
+        replies('kw_g1', kw, src.tweets_by_kw_g1.get(kw), profile.replies_per_g1_keyword)
+
+    # slop concepts from tech news articles
+    for tn in src.tech_news:
+        key = f"news_slops:{tn.link}"
+        done, want = remaining(key, profile.slops_per_news)
+        if not want:
+            continue
+        try:
+            slops = thinker.slop_ideas_from_medium(product.name, product.description or "", tn.title or "", tn.summary or "", n=want)
+            ledger[key] = done + want
+            for m in slops:
+                add_suggestion(
+                    'slop_concept',
+                    m.get('concept') or 'Slop idea',
+                    'tech_news',
+                    'subscriber',
+                    rank=0.45,
+                    meta={
+                        "title": tn.title,
+                        "link": tn.link,
+                        "instructions": m.get('instructions'),
+                        "reason": f"AI slop idea inspired by tech news '{tn.title}'",
+                    }
+                )
+        except Exception as e:
+            logger.error(e)
+
+    # tweet ideas from tech news articles
+    for tn in src.tech_news:
+        key = f"news_tweets:{tn.link}"
+        done, want = remaining(key, profile.tweets_per_news)
+        if not want:
+            continue
+        try:
+            tweets = thinker.tweets_for_topic(product.name, product.description or "", tn.title or "", tn.summary or "", n=want)
+            ledger[key] = done + want
+            for i, t in enumerate(tweets, done):
+                add_suggestion(
+                    'tweet',
+                    t,
+                    'tech_news',
+                    'subscriber' if i >= 1 else 'guest',
+                    rank=0.6 - i*0.1,
+                    meta={
+                        "title": tn.title,
+                        "link": tn.link,
+                        "reason": f"Tweet idea based on tech news '{tn.title}'",
+                    },
+                )
+        except Exception as e:
+            logger.error(e)
+
+    # Headlines per expanded group2 keyword
+    for kw in src.expanded_group2:
+        key = f"kw_headlines:{kw}"
+        done, want = remaining(key, profile.headlines_per_keyword)
+        if not want:
+            continue
+        try:
+            articles = thinker.articles_for_topic(product.name, product.description or "", kw, None, n=want)
+            ledger[key] = done + want
+            for h in articles:
+                add_suggestion(
+                    'article_headline',
+                    h.get('title'),
+                    'kw_g2',
+                    'subscriber',
+                    0.7,
+                    {
+                        "title": h.get('title'),
+                        "description": h.get('description'),
+                         "keyword": kw, "with_tweets": False, "reason": f"From keyword '{kw}'"}
+                )
+        except Exception as e:
+            logger.error(e)
+
+    # 7. Potential tweets per trending topic
+    for tp in src.topics:
+        key = f"topic_tweets:{tp}"
+        done, want = remaining(key, profile.tweets_per_topic)
+        if not want:
+            continue
+        try:
+            context = build_tweet_context(src.tweets_by_topic.get(tp), thinker.context_budget('tweets_for_topic'))
+            tweets = thinker.tweets_for_topic(product.name, product.description or "", tp, context, n=want)
+            ledger[key] = done + want
+            for i, t in enumerate(tweets, done):
+                add_suggestion(
+                    'tweet',
+                    t,
+                    'trending_topic',
+                    'guest' if i < 1 else 'subscriber',
+                    rank=1.0 - i*0.1,
+                    meta={
+                        "topic": tp,
+                        "reason": f"Tweet idea based on trending topic '{tp}'",
+                    },
+                )
+        except Exception as e:
+            logger.error(e)
+
+    # 7c. Slop concepts per trending topic
+    for tp in src.topics:
+        key = f"topic_slops:{tp}"
+        done, want = remaining(key, profile.slops_per_topic)
+        if not want:
+            continue
+        try:
+            context = build_tweet_context(src.tweets_by_topic.get(tp), thinker.context_budget('slop_ideas_from_twitter'))
+            slops = thinker.slop_ideas_from_twitter(product.name, product.description or "", tp, context, n=want)
+            ledger[key] = done + want
+            for i, m in enumerate(slops, done):
+                add_suggestion(
+                    'slop_concept',
+                    m.get('concept') or 'Slop idea',
+                    'trending_topic',
+                    'guest' if i < 1 else 'subscriber',
+                    rank=0.5 - i*0.05,
+                    meta={
+                        "topic": tp,
+                        "instructions": m.get('instructions'),
+                        "reason": f"AI slop idea based on trending topic '{tp}'",
+                    }
+                )
+        except Exception as e:
+            logger.error(e)
+
+    # 8. Headlines per keyword in expanded group2, with tweets
+    for kw in src.expanded_group2:
+        key = f"kw_tweet_headlines:{kw}"
+        done, want = remaining(key, profile.headlines_per_keyword)
+        if not want:
+            continue
+        tweets_text = build_tweet_context(src.tweets_by_kw_g2.get(kw), thinker.context_budget('articles_for_topic'))
+        try:
+            articles = thinker.articles_for_topic(product.name, product.description or "", kw, tweets_text, n=want)
+            ledger[key] = done + want
+            for h in articles:
+                add_suggestion(
+                    'article_headline',
+                    h.get('title'),
+                    'kw_g2',
+                    'subscriber',
+                    0.8,
+                    {
+                        "title": h.get('title'),
+                        "description": h.get('description'),
+                        "keyword": kw, "with_tweets": True, "reason": f"From keyword '{kw}'"}
+                )
+        except Exception as e:
+            logger.error(e)
+
+    # 9. Headlines per Medium tag using trending articles
+    for tg in src.medium_tags:
+        key = f"tag_headlines:{tg}"
+        done, want = remaining(key, profile.headlines_per_tag)
+        if not want:
+            continue
+        arts = src.trending_by_tag.get(tg) or []
+        titles = "\n".join([(getattr(a, 'title', '') or '') + '\n' + (getattr(a, 'subtitle', '') or '') for a in arts[:10]])
+        try:
+            heads = thinker.articles_for_topic(product.name, product.description or "", tg, titles, n=want)
+            ledger[key] = done + want
+            for h in heads:
+                add_suggestion(
+                    'article_headline',
+                    h.get('title'),
+                    'medium_tag',
+                    'subscriber',
+                    0.75,
+                    {
+                        "title": h.get('title'),
+                        "description": h.get('description'),
+                        "tag": tg, "reason": f"Inspired by trending articles under Medium tag '{tg}'"
+                    }
+                )
+        except Exception as e:
+            logger.error(e)
 
-            # Steps 6-10: LLM-generated suggestions
-            # Helper to add suggestion safely
-            def add_headline(text, source_type, visibility='subscriber', rank=0.0, meta=None):
-                try:
-                    Suggestion.add(rep.id, source_type, 'article_headline', text, rank, json.dumps(meta or {}), visibility)
-                except Exception as e:
-                    logger.error(f"add_headline failed: {e}")
+    # 10. Witty replies to the best-scoring tweets per topic and group2 keyword
+    for tp in src.topics:
+        replies('trending_topic', tp, src.tweets_by_topic.get(tp), profile.replies_per_topic)
+    for kw in src.expanded_group2:
+        replies('kw_g2', kw, src.tweets_by_kw_g2.get(kw), profile.replies_per_g2_keyword)
 
-            def add_tweet(text, source_type, visibility='subscriber', rank=0.0, meta=None):
-                try:
-                    Suggestion.add(rep.id, source_type, 'tweet', text, rank, json.dumps(meta or {}), visibility)
-                except Exception as e:
-                    logger.error(f"add_tweet failed: {e}")
+    return {**deduper.summary(), 'not_novel': not_novel, 'generated': ledger}
 
-            def add_reply(text, source_type, visibility='subscriber', rank=0.0, meta=None):
-                try:
-                    Suggestion.add(rep.id, source_type, 'tweet_reply', text, rank, json.dumps(meta or {}), visibility)
-                except Exception as e:
-                    logger.error(f"add_reply failed: {e}")
 
-            def add_meme_concept(concept: str, source_type: str, visibility='subscriber', rank: float = 0.5, meta: Optional[dict] = None):
-                try:
-                    m = meta or {}
-                    # kind: 'meme_concept' to distinguish in UI
-                    Suggestion.add(rep.id, source_type, 'meme_concept', concept, rank, json.dumps(m), visibility)
-                except Exception as e:
-                    logger.error(f"add_meme_concept failed: {e}")
+def generate_report(report_id: str):
+    with _app_context():
+        rep: Report | None = Report.query.get(report_id)
+        if not rep:
+            logger.error(f"Report {report_id} not found")
+            return
+        try:
+            rep.mark_running()
+            profile = get_profile(rep.pipeline_profile)
+            product = rep.product
+            # Past suggestions for this product: candidates too close to them are not stored,
+            # and the most recent ones are passed to prompts as ideas to avoid
+            novelty = NoveltyIndex.load(product.id)
+            thinker = ThinkingClient(user=getattr(product, 'user', None), avoid=novelty.avoid_hints())
+            src = _gather_sources(rep, product, thinker, profile)
 
-            def add_slop_concept(concept: str, source_type: str, visibility='subscriber', rank: float = 0.45, meta: Optional[dict] = None):
-                try:
-                    m = meta or {}
-                    # kind: 'slop_concept' for AI slop video ideas
-                    Suggestion.add(rep.id, source_type, 'slop_concept', concept, rank, json.dumps(m), visibility)
-                except Exception as e:
-                    logger.error(f"add_slop_concept failed: {e}")
-            
-            def top_replies_for(items, source_key, source_label=None):
-                candidates = []
-                for tw in items or []:
-                    try:
-                        base_text = getattr(tw, 'text', None) or (tw.get('text') if isinstance(tw, dict) else None)
-                        if not base_text:
-                            continue
-                        rep_text = thinker.witty_reply(product.name, product.description or "", base_text)
-                        if rep_text:
-                            score = min(1.0, max(0.1, len(rep_text) / 280))
-                            candidates.append((score, rep_text, tw))
-                    except Exception:
-                        continue
-                candidates.sort(key=lambda x: x[0], reverse=True)
-                for i, (_, r, tw) in enumerate(candidates[:10]):
-                    # Build meta with original tweet details
-                    try:
-                        if hasattr(tw, 'to_dict'):
-                            st = tw.to_dict()
-                        elif isinstance(tw, TweetSummary):
-                            st = {
-                                "text": tw.text,
-                                "user_name": tw.user_name,
-                                "like_count": tw.like_count,
-                                "retweet_count": tw.retweet_count,
-                                "reply_count": tw.reply_count,
-                            }
-                        elif isinstance(tw, dict):
-                            st = tw
-                        else:
-                            st = {"text": getattr(tw, 'text', None)}
-                    except Exception:
-                        st = {"text": getattr(tw, 'text', None)}
-                    add_reply(
-                        r,
-                        source_key,
-                        'subscriber',
-                        0.9 - i*0.1,
-                        {
-                            "reason": f"Reply crafted for a tweet under '{source_label}'" if source_label else f"Reply crafted for a tweet",
-                            "source_label": source_label,
-                            "source_tweet": st,
-                        },
-                    )
-
-
-            # 7b. Meme concepts per trending topic
-            for tp in topics[:10]:
-                try:
-                    twts = tweets_by_topic.get(tp)
-                    context = None
-                    if twts:
-                        context = "\n".join([
-                            *(t.text for t in (twts.top or [])[:5]),
-                            *(t.text for t in (twts.latest or [])[:5])
-                        ])
-                    memes = thinker.meme_ideas_from_twitter(product.name, product.description or "", tp, context, n=4)
-                    for i, m in enumerate(memes):
-                        add_meme_concept(
-                            m.get('concept') or 'Meme idea',
-                            'trending_topic',
-                            'guest' if i < 1 else 'subscriber',
-                            rank=0.55 - i*0.05,
-                            meta={
-                                "topic": tp,
-                                "instructions": m.get('instructions'),
-                                "reason": f"Meme idea based on trending topic '{tp}'",
-                            }
-                        )
-                except Exception as e:
-                    logger.error(e)
-            
-            # meme concepts from tech news articles
-            for tn in tech_news:
-                try:
-                    memes = thinker.meme_ideas_from_medium(product.name, product.description or "", tn.title or "", tn.summary or "", n=3)
-                    for m in memes:
-                        add_meme_concept(
-                            m.get('concept') or 'Meme idea',
-                            'tech_news',
-                            'subscriber',
-                            rank=0.5,
-                            meta={
-                                "title": tn.title,
-                                "link": tn.link,
-                                "instructions": m.get('instructions'),
-                                "reason": f"Meme idea inspired by tech news '{tn.title}'",
-                            }
-                        )
-                except Exception as e:
-                    logger.error(e)
-
-            # Top replies for group1 keywords
-            for kw in (prospect_keywords or [])[:10]:
-                ctx = tweets_by_kw_g1.get(kw)
-                if ctx:
-                    tws = (ctx.top or []) + (ctx.latest or [])
-                    random_tweets = random.sample(tws, 5) if len(tws) > 5 else tws
-                    top_replies_for(random_tweets, 'kw_g1', kw)
-
-            # slop concepts from tech news articles
-            for tn in tech_news:
-                try:
-                    slops = thinker.slop_ideas_from_medium(product.name, product.description or "", tn.title or "", tn.summary or "", n=3)
-                    for m in slops:
-                        add_slop_concept(
-                            m.get('concept') or 'Slop idea',
-                            'tech_news',
-                            'subscriber',
-                            rank=0.45,
-                            meta={
-                                "title": tn.title,
-                                "link": tn.link,
-                                "instructions": m.get('instructions'),
-                                "reason": f"AI slop idea inspired by tech news '{tn.title}'",
-                            }
-                        )
-                except Exception as e:
-                    logger.error(e)
-
-            
-            # tweet ideas from tech news articles
-            for tn in tech_news:
-                try:
-                    tweets = thinker.tweets_for_topic(product.name, product.description or "", tn.title or "", tn.summary or "", n=2)
-                    for i, t in enumerate(tweets):
-                        add_tweet(
-                            t,
-                            'tech_news',
-                            'subscriber' if i >= 1 else 'guest',
-                            rank=0.6 - i*0.1,
-                            meta={
-                                "title": tn.title,
-                                "link": tn.link,
-                                "reason": f"Tweet idea based on tech news '{tn.title}'",
-                            },
-                        )
-                except Exception as e:
-                    logger.error(e)
-
-            # # 6. Headlines per trending topic
-            # for tp in topics[:10]:
-            #     if tp not in tweets_by_topic:
-            #         continue
-            #     tweets_ctx = tweets_by_topic.get(tp)
-            #     tweets_text = "\n".join([
-            #         *(t.text for t in (tweets_ctx.top or [])[:5]),
-            #         *(t.text for t in (tweets_ctx.latest or [])[:5])
-            #     ])
-            #     try:
-            #         articles = thinker.articles_for_topic(product.name, product.description or "", tp, tweets_text, n=2)
-            #         for i, h in enumerate(articles):
-            #             add_headline(
-            #                 h.get('title'),
-            #                 'trending_topic',
-            #                 'guest' if i < (rep.visibility_cutoff or 5) else 'subscriber',
-            #                 rank=1.0 - i*0.1,
-            #                 meta={
-            #                     "title": h.get('title'),
-            #                     "description": h.get('description'),
-            #                     "topic": tp,
-            #                     "reason": f"From trending topic '{tp}' likely relevant to your audience",
-            #                 },
-            #             )
-            #     except Exception as e:
-            #         logger.error(e)
-
-            # Headlines per expanded group1 keywords
-            for kw in expanded_group2[:15]:
-                try:
-                    articles = thinker.articles_for_topic(product.name, product.description or "", kw, None, n=2)
-                    for h in articles:
-                        add_headline(
-                            h.get('title'),
-                            'kw_g2',
-                            'subscriber',
-                            0.7,
-                            {
-                                "title": h.get('title'),
-                                "description": h.get('description'),
-                                 "keyword": kw, "with_tweets": False, "reason": f"From keyword '{kw}'"}
-                        )
-                except Exception as e:
-                    logger.error(e)
-
-            # 7. Potential tweets per trending topic
-            for tp in topics[:10]:
-                try:
-                    twts = tweets_by_topic.get(tp)
-                    if twts:
-                        context = "\n".join([
-                            *(t.text for t in (twts.top or [])[:5]),
-                            *(t.text for t in (twts.latest or [])[:5])
-                        ])
-                    else:
-                        context = None
-                    tweets = thinker.tweets_for_topic(product.name, product.description or "", tp, context, n=2)
-                    for i, t in enumerate(tweets):
-                        add_tweet(
-                            t,
-                            'trending_topic',
-                            'guest' if i < 1 else 'subscriber',
-                            rank=1.0 - i*0.1,
-                            meta={
-                                "topic": tp,
-                                "reason": f"Tweet idea based on trending topic '{tp}'",
-                            },
-                        )
-                except Exception as e:
-                    logger.error(e)
-
-            # 7c. Slop concepts per trending topic
-            for tp in topics[:10]:
-                try:
-                    twts = tweets_by_topic.get(tp)
-                    context = None
-                    if twts:
-                        context = "\n".join([
-                            *(t.text for t in (twts.top or [])[:5]),
-                            *(t.text for t in (twts.latest or [])[:5])
-                        ])
-                    slops = thinker.slop_ideas_from_twitter(product.name, product.description or "", tp, context, n=3)
-                    for i, m in enumerate(slops):
-                        add_slop_concept(
-                            m.get('concept') or 'Slop idea',
-                            'trending_topic',
-                            'guest' if i < 1 else 'subscriber',
-                            rank=0.5 - i*0.05,
-                            meta={
-                                "topic": tp,
-                                "instructions": m.get('instructions'),
-                                "reason": f"AI slop idea based on trending topic '{tp}'",
-                            }
-                        )
-                except Exception as e:
-                    logger.error(e)
-
-            # 8. Headlines per keyword in expanded group2, with tweets
-
-            for kw in expanded_group2[:15]:
-                kw_tweets = tweets_by_kw_g2.get(kw)
-                tweets_text = "\n".join([
-                    *(t.text for t in (kw_tweets.top or [])[:5]),
-                    *(t.text for t in (kw_tweets.latest or [])[:5])
-                ])
-                try:
-                    articles = thinker.articles_for_topic(product.name, product.description or "", kw, tweets_text, n=2)
-                    for h in articles:
-                        add_headline(
-                            h.get('title'),
-                            'kw_g2',
-                            'subscriber',
-                            0.8,
-                            {
-                                "title": h.get('title'),
-                                "description": h.get('description'),
-                                "keyword": kw, "with_tweets": True, "reason": f"From keyword '{kw}'"}
-                        )
-                    
-                except Exception as e:
-                    logger.error(e)
-
-            # 9. Headlines per Medium tag using trending articles
-            # for tg in medium_tags[:10]:
-            #     arts = trending_by_tag.get(tg) or []
-            #     titles = "\n".join([getattr(a, 'title')+'\n'+getattr(a, 'subtitle') or '' for a in arts[:10]])
-            #     try:
-            #         heads = thinker.articles_for_topic(product.name, product.description or "", tg, titles, n=2)
-            #         for h in heads:
-            #             add_headline(
-            #                 h.get('title'),
-            #                 'medium_tag',
-            #                 'subscriber',
-            #                 0.75,
-            #                 {
-            #                     "title": h.get('title'),
-            #                     "description": h.get('description'),
-            #                     "tag": tg, "reason": f"Inspired by trending articles under Medium tag '{tg}'"
-            #                 }
-            #             )
-            #     except Exception as e:
-            #         logger.error(e)
-
-            # generate tweets from trending articles too
-            # for tg in medium_tags[:10]:
-            #     arts = trending_by_tag.get(tg) or []
-            #     titles = "\n".join([getattr(a, 'title')+'\n'+getattr(a, 'subtitle') or '' for a in arts[:10]])
-            #     try:
-            #         tweets = thinker.tweets_for_topic(product.name, product.description or "", tg, titles, n=2)
-            #         for i, t in enumerate(tweets):
-            #             add_tweet(
-            #                 t,
-            #                 'medium_tag',
-            #                 'subscriber' if i >= 1 else 'guest',
-            #                 rank=0.6 - i*0.1,
-            #                 meta={
-            #                     "tag": tg,
-            #                     "reason": f"Tweet idea based on trending articles under Medium tag '{tg}'",
-            #                 },
-            #             )
-            #     except Exception as e:
-            #         logger.error(e)
-
-            # 9b. Meme concepts based on Medium tags/titles
-            # for tg in medium_tags[:10]:
-            #     arts = trending_by_tag.get(tg) or []
-            #     for a in arts[:3]:
-            #         title = getattr(a, 'title', '')
-            #         subtitle = getattr(a, 'subtitle', '')
-            #         try:
-            #             memes = thinker.meme_ideas_from_medium(product.name, product.description or "", title, subtitle, n=1)
-            #             for m in memes:
-            #                 add_meme_concept(
-            #                     m.get('concept') or 'Meme idea',
-            #                     'medium_tag',
-            #                     'subscriber',
-            #                     rank=0.5,
-            #                     meta={
-            #                         "tag": tg,
-            #                         "title": title,
-            #                         "subtitle": subtitle,
-            #                         "instructions": m.get('instructions'),
-            #                         "reason": f"Meme idea inspired by Medium article '{title}'",
-            #                     }
-            #                 )
-            #         except Exception as e:
-            #             logger.error(e)
-
-            # 9c. Slop concepts based on Medium tags/titles
-            # for tg in medium_tags[:10]:
-            #     arts = trending_by_tag.get(tg) or []
-            #     for a in arts[:2]:
-            #         title = getattr(a, 'title', '')
-            #         subtitle = getattr(a, 'subtitle', '')
-            #         try:
-            #             slops = thinker.slop_ideas_from_medium(product.name, product.description or "", title, subtitle, n=1)
-            #             for m in slops:
-            #                 add_slop_concept(
-            #                     m.get('concept') or 'Slop idea',
-            #                     'medium_tag',
-            #                     'subscriber',
-            #                     rank=0.45,
-            #                     meta={
-            #                         "tag": tg,
-            #                         "title": title,
-            #                         "subtitle": subtitle,
-            #                         "instructions": m.get('instructions'),
-            #                         "reason": f"AI slop idea inspired by Medium article '{title}'",
-            #                     }
-            #                 )
-            #         except Exception as e:
-            #             logger.error(e)
-
-            # 10. Witty replies for every fetched tweet (rank and keep top 5 per source)
-
-            # from topics
-            for tp in topics[:10]:
-                ctx = tweets_by_topic.get(tp)
-                #pick random 2 tweets from top+latest
-                if ctx:
-                    tws = (ctx.top or []) + (ctx.latest or [])
-                    random_tweets = random.sample(tws, 2) if len(tws) > 2 else tws
-                    top_replies_for(random_tweets, 'trending_topic', tp)
-            # from kw groups
-            for kw in expanded_group2[:10]:
-                ctx = tweets_by_kw_g2.get(kw)
-                if ctx:
-                    tws = (ctx.top or []) + (ctx.latest or [])
-                    random_tweets = random.sample(tws, 4) if len(tws) > 4 else tws
-                    top_replies_for(random_tweets, 'kw_g2', kw)
+            # Steps 6-10: LLM-generated suggestions
+            summary = _generate_suggestions(rep, product, thinker, novelty, src, profile)
+            s_dedupe = ReportStep.start(rep.id, 'dedupe_suggestions')
+            s_dedupe.done({**summary, 'profile': profile.name})
 
             rep.mark_partial()  # as soon as some suggestions exist
 
             # On complete
             rep.mark_complete()
+            record_novelty(rep)
         except Exception as e:
             logger.exception(e)
             rep.mark_failed(str(e))
 
 
+def topup_report(report_id: str):
+    """Add what the owner's current pipeline profile generates beyond the report's own profile.
+
+    Sources and per-source counts of earlier runs are read back from the step
+    payloads, so only new sources are fetched and only the missing items are
+    requested from the LLM. Existing suggestions are kept.
+    """
+    with _app_context():
+        rep: Report | None = Report.query.get(report_id)
+        if not rep:
+            logger.error(f"Report {report_id} not found")
+            return
+        target = get_profile(profile_name_for(rep.user_id))
+        if not needs_topup(rep.pipeline_profile, target.name):
+            if rep.status == 'queued':
+                rep.mark_complete()
+            return
+        existing_ids = set()
+        try:
+            rep.mark_running()
+            product = rep.product
+            novelty = NoveltyIndex.load(product.id)
+            thinker = ThinkingClient(user=getattr(product, 'user', None), avoid=novelty.avoid_hints())
+            src = _load_sources(rep)
+            s_src = ReportStep.start(rep.id, 'topup_sources')
+            try:
+                added = _extend_sources(src, product, thinker, target, get_profile(rep.pipeline_profile))
+                s_src.done({"profile": target.name, **added.to_payload()})
+            except Exception as e:
+                try:
+                    db.session.rollback()
+                except Exception:
+                    pass
+                s_src.fail(str(e))
+
+            # Seed the deduper so nothing already in the report is suggested or replied to again
+            deduper = SuggestionDeduper()
+            for s in Suggestion.query.filter_by(report_id=rep.id).all():
+                existing_ids.add(s.id)
+                deduper.admit(s.kind, s.text)
+                source_tweet = (s.meta_json or {}).get('source_tweet') or {}
+                if s.kind == 'tweet_reply' and source_tweet.get('text'):
+                    deduper.admit('source_tweet', source_tweet['text'])
+            summary = _generate_suggestions(rep, product, thinker, novelty, src, target,
+                                            deduper=deduper, generated=_load_generated(rep))
+            s_top = ReportStep.start(rep.id, 'topup_suggestions')
+            s_top.done({**summary, 'from': rep.pipeline_profile, 'profile': target.name})
+        except Exception as e:
+            logger.exception(e)
+            try:
+                db.session.rollback()
+            except Exception:
+                pass
+        # Recorded after a failure too: the report keeps what it has and is no longer offered a top-up
+        rep.pipeline_profile = target.name
+        rep.mark_complete()
+        # Only the suggestions this top-up added; the rest were indexed by earlier runs
+        if existing_ids:
+            record_novelty(rep, skip_ids=existing_ids, entry_id=f"{rep.id}:{target.name}")
+
+
+def _stream_article_content(art: Article, thinker: ThinkingClient):
+    """Consume the article stream, pushing chunks to the owner and checkpointing content_md.
+
+    Token deltas are coalesced into chunks of ARTICLE_EMIT_INTERVAL seconds so the
+    socket message queue is not hit once per token. content_html is left for the
+    caller to render once the stream completes.
+    """
+    owner_id = art.report.user_id
+    parts: List[str] = []
+    pending: List[str] = []
+    offset = 0
+    last_emit = last_checkpoint = time.monotonic()
+
+    def flush():
+        nonlocal offset, last_emit
+        if pending:
+            chunk = ''.join(pending)
+            emit_to_user(owner_id, 'article_chunk', {'article_id': art.id, 'offset': offset, 'delta': chunk})
+            offset += len(chunk)
+            pending.clear()
+        last_emit = time.monotonic()
+
+    for delta in thinker.article_content_stream(art.title, art.description or ""):
+        parts.append(delta)
+        pending.append(delta)
+        now = time.monotonic()
+        if now - last_emit >= ARTICLE_EMIT_INTERVAL:
+            flush()
+        if now - last_checkpoint >= article_checkpoint_seconds:
+            art.content_md = ''.join(parts)
+            db.session.add(art)
+            db.session.commit()
+            last_checkpoint = now
+    flush()
+    content_md = ''.join(parts).strip()
+    if not content_md:
+        raise RuntimeError('Article generation returned no content')
+    art.content_md = content_md
+
 def generate_article(article_id: str):
     with _app_context():
         from markdown import markdown
@@ -586,35 +798,43 @@ def generate_article(article_id: str):
             logger.error(f"Article {article_id} not found")
             return
         try:
-            # Minimal content placeholder until full prompt designed
-            content = thinker.article_content(art.title, art.description or "")
-            art.content_md = content.get('content_md')
-            art.content_html = markdown(content.get('content_md', ''))
+            if stream_articles:
+                _stream_article_content(art, thinker)
+            else:
+                content = thinker.article_content(art.title, art.description or "")
+                if not content:
+                    raise RuntimeError('Article generation returned no content')
+                art.content_md = content.get('content_md')
+            art.content_html = markdown(art.content_md or '')
             art.status = 'ready'
             db.session.add(art)
             db.session.commit()
-            # fetch suggestion and add article details to its meta
+            publish_job_status('articles', art.id, art.status)
+            emit_to_user(art.report.user_id, 'article_ready', {
+                'article_id': art.id,
+                'title': art.title,
+                'content_md': art.content_md,
+                'content_html': art.content_html,
+            })
+            # add article details to the suggestion's meta
             if art.suggestion_id:
-                sug = Suggestion.query.get(art.suggestion_id)
-                if sug:
-                    try:
-                        meta = json.loads(sug.meta_json or '{}')
-                    except Exception:
-                        meta = {}
-                    meta.update({
-                        "article_id": art.id,
-                        "article_title": art.title,
-                        "article_description": art.description,
-                    })
-                    sug.meta_json = json.dumps(meta)
-                    db.session.add(sug)
-                    db.session.commit()
+                Suggestion.merge_meta(art.suggestion_id, {
+                    "article_id": art.id,
+                    "article_title": art.title,
+                    "article_description": art.description,
+                })
         except Exception as e:
             logger.exception(e)
+            try:
+                db.session.rollback()
+            except Exception:
+                pass
             art.status = 'failed'
             art.error_message = str(e)
             db.session.add(art)
             db.session.commit()
+            publish_job_status('articles', art.id, art.status, art.error_message)
+            emit_to_user(art.report.user_id, 'article_failed', {'article_id': art.id, 'error': art.error_message})
 
 
 def generate_meme(meme_id: str):
@@ -628,10 +848,7 @@ def generate_meme(meme_id: str):
             prompt_parts = []
             if mem.concept:
                 prompt_parts.append(f"Concept: {mem.concept}")
-            try:
-                instr = json.loads(mem.instructions_json or '{}')
-            except Exception:
-                instr = {}
+            instr = mem.instructions_json or {}
             template = instr.get('template')
             scene_description = instr.get('scene_description')
             style = instr.get('style')
@@ -669,24 +886,17 @@ def generate_meme(meme_id: str):
             mem.model_used = 'gpt-image-1'
             db.session.add(mem)
             db.session.commit()
+            publish_job_status('memes', mem.id, mem.status)
             # backfill suggestion meta with meme_id
             if mem.suggestion_id:
-                sug = Suggestion.query.get(mem.suggestion_id)
-                if sug:
-                    try:
-                        meta = json.loads(sug.meta_json or '{}')
-                    except Exception:
-                        meta = {}
-                    meta.update({"meme_id": mem.id})
-                    sug.meta_json = json.dumps(meta)
-                    db.session.add(sug)
-                    db.session.commit()
+                Suggestion.merge_meta(mem.suggestion_id, {"meme_id": mem.id})
         except Exception as e:
             logger.exception(e)
             mem.status = 'failed'
             mem.error_message = str(e)
             db.session.add(mem)
             db.session.commit()
+            publish_job_status('memes', mem.id, mem.status, mem.error_message)
 
 
 def generate_slop(slop_id: str):
@@ -700,10 +910,7 @@ def generate_slop(slop_id: str):
             prompt_parts = []
             if sl.concept:
                 prompt_parts.append(f"Concept: {sl.concept}")
-            try:
-                instr = json.loads(sl.instructions_json or '{}')
-            except Exception:
-                instr = {}
+            instr = sl.instructions_json or {}
             scene = instr.get('scene_description')
             weird = instr.get('weirdness_level')
             motifs = instr.get('visual_motifs') or []
@@ -748,21 +955,25 @@ def generate_slop(slop_id: str):
             sl.model_used = getattr(res, 'model', 'gemini-veo-3')
             db.session.add(sl)
             db.session.commit()
+            publish_job_status('slops', sl.id, sl.status)
             # Persist slop_id into suggestion meta
             if sl.suggestion_id:
-                sug = Suggestion.query.get(sl.suggestion_id)
-                if sug:
-                    try:
-                        meta = json.loads(sug.meta_json or '{}')
-                    except Exception:
-                        meta = {}
-                    meta.update({"slop_id": sl.id})
-                    sug.meta_json = json.dumps(meta)
-                    db.session.add(sug)
-                    db.session.commit()
+                Suggestion.merge_meta(sl.suggestion_id, {"slop_id": sl.id})
         except Exception as e:
             logger.exception(e)
             sl.status = 'failed'
             sl.error_message = str(e)
             db.session.add(sl)
             db.session.commit()
+            publish_job_status('slops', sl.id, sl.status, sl.error_message)
+
+
+def refresh_medium_tags():
+    """Re-crawl the Medium tag graph into the stored tag index (queued by medium_tags.load_index)."""
+    import medium_tags
+    if not (enable_medium and rapidapi_key):
+        return
+    try:
+        medium_tags.refresh(MediumClient(api_key=rapidapi_key))
+    except Exception as e:
+        logger.exception(e)